@@ -0,0 +1,165 @@
+import os
+import time
+import multiprocessing
+from multiprocessing.connection import wait
+from news_sources import SOURCES
+from news_orchestrator import FETCH_MAX_WORKERS, FETCH_AGENCY_TIMEOUT, agency_lock
+from process_utils import tree_rss_kb, kill_tree
+
+# اجرای دریافت هر خبرگزاری در یک پروسه جداگانه با مهلت قطعی و سقف حافظه
+# اگر driver.get یا WebDriverWait گیر کند، پروسه worker همراه با chromedriver و Chrome
+# آن kill می‌شود و نتیجه timeout گزارش می‌شود؛ thread یا مرورگر رها شده‌ای باقی نمی‌ماند
+
+# کدام خبرگزاری‌ها در پروسه جدا اجرا شوند: browser (فقط منابع Selenium) / all / none
+# پیش‌فرض browser است تا driver.get گیر کرده و Chrome آن در پروسه سرور انباشته نشوند؛
+# هزینه آن راه‌اندازی دوباره Chrome در هر دریافت ایرنا و ایسنا است (browser_pool در worker گرم نمی‌ماند).
+# none فقط برای اجرای محلی و اشکال‌زدایی مناسب است: مهلت قطعی، سقف حافظه و پاک‌سازی Chrome اجرا نمی‌شوند.
+AGENCY_ISOLATION = os.getenv('AGENCY_ISOLATION', 'browser')
+# زمان اضافه (ثانیه) پس از FETCH_AGENCY_TIMEOUT برای اینکه worker خودش نتیجه timeout را گزارش کند
+AGENCY_WORKER_GRACE = float(os.getenv('AGENCY_WORKER_GRACE', '30'))
+# سقف حافظه (مجموع RSS worker و مرورگرهای آن، مگابایت)؛ 0 یعنی بدون سقف
+AGENCY_WORKER_MAX_RSS_MB = float(os.getenv('AGENCY_WORKER_MAX_RSS_MB', '2048'))
+
+def should_isolate(name, isolation=None):
+    """آیا دریافت این خبرگزاری باید در پروسه جدا انجام شود"""
+    isolation = isolation or AGENCY_ISOLATION
+    if isolation == 'all':
+        return True
+    if isolation == 'browser':
+        return SOURCES.get(name, {}).get('transport') == 'browser'
+    return False
+
+def _worker_main(name, timeout, connection):
+    """اجرای دریافت یک خبرگزاری داخل پروسه worker"""
+    if hasattr(os, 'setsid'):
+        # گروه پروسه جدا تا supervisor بتواند worker و همه Chromeهای آن را با هم kill کند
+        os.setsid()
+    from news_orchestrator import fetch_all_news, inherit_agency_lock
+    # پروسه اصلی قفل این خبرگزاری را تا پایان worker نگه می‌دارد
+    inherit_agency_lock(name)
+    try:
+        # پاک‌سازی‌ها در پروسه اصلی انجام می‌شود، نه هم‌زمان در هر worker
+        summary = fetch_all_news(agencies=[name], timeout=timeout, isolation='none', prune=False)
+        info = summary['agencies'].get(name, {})
+        connection.send({
+            'agency': name,
+            'status': info.get('status', 'error'),
+            'news': [],
+            'count': info.get('count', 0),
+            'error': info.get('error'),
+            'elapsed': info.get('elapsed', 0.0)
+        })
+    except Exception as e:
+        connection.send({'agency': name, 'status': 'error', 'news': [], 'count': 0, 'error': str(e), 'elapsed': 0.0})
+    finally:
+        connection.close()
+
+class _Worker:
+    def __init__(self, context, name, timeout):
+        self.name = name
+        # قفل خبرگزاری در پروسه اصلی نگه داشته می‌شود تا scheduler یا /fetch-news هم‌زمان آن را اجرا نکنند
+        self.lock = agency_lock(name)
+        self.receiver, sender = context.Pipe(duplex=False)
+        self.process = context.Process(
+            target=_worker_main,
+            args=(name, timeout, sender),
+            name=f'agency-{name}',
+            daemon=False
+        )
+        self.process.start()
+        sender.close()
+        self.started = time.monotonic()
+        self.deadline = self.started + timeout + AGENCY_WORKER_GRACE
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def exited(self):
+        # از sentinel استفاده می‌شود نه is_alive تا پروسه تا پایان پاک‌سازی reap نشود
+        # (pid پروسه reap نشده به پروسه دیگری داده نمی‌شود و kill آن امن است)
+        return bool(wait([self.process.sentinel], timeout=0))
+
+    def cleanup(self, wait_exit=0.0):
+        """kill کردن worker (اگر هنوز زنده است) و Chromeهای باقی‌مانده در گروه پروسه آن"""
+        if wait_exit:
+            wait([self.process.sentinel], timeout=wait_exit)
+        kill_tree(self.process.pid)
+        self.process.join(timeout=5)
+        self.receiver.close()
+        self.lock.release()
+
+def run_isolated(agencies, max_workers=None, timeout=None, on_result=None):
+    """دریافت خبرگزاری‌ها هر کدام در پروسه جدا و برگرداندن نتیجه‌ها
+
+    worker پس از مهلت FETCH_AGENCY_TIMEOUT (به علاوه AGENCY_WORKER_GRACE) یا عبور از
+    سقف حافظه همراه با همه پروسه‌های زیرمجموعه‌اش kill می‌شود.
+    """
+    max_workers = max_workers or FETCH_MAX_WORKERS
+    timeout = timeout or FETCH_AGENCY_TIMEOUT
+    # spawn: fork کردن پروسه‌ای که thread دارد (uvicorn، scheduler) ممکن است قفل‌ها را در حالت گرفته کپی کند
+    context = multiprocessing.get_context('spawn')
+    queue = list(agencies)
+    running = []
+    results = []
+
+    def report(result):
+        results.append(result)
+        if on_result:
+            on_result(result)
+
+    while queue or running:
+        while queue and len(running) < max_workers:
+            name = queue.pop(0)
+            if not agency_lock(name).acquire(blocking=False):
+                report({
+                    'agency': name, 'status': 'error', 'news': [], 'count': 0,
+                    'error': 'دریافت قبلی این خبرگزاری هنوز در حال اجراست', 'elapsed': 0.0
+                })
+                continue
+            running.append(_Worker(context, name, timeout))
+
+        for worker in list(running):
+            result = None
+            if worker.receiver.poll():
+                try:
+                    result = worker.receiver.recv()
+                except EOFError:
+                    result = None
+                # فرصت برای خروج عادی و بستن مرورگرها؛ سپس پاک‌سازی پروسه‌های باقی‌مانده
+                worker.cleanup(wait_exit=10)
+            elif worker.exited():
+                if worker.receiver.poll():
+                    # نتیجه درست پیش از خروج ارسال شده است
+                    result = worker.receiver.recv()
+                worker.cleanup()
+                if result is None:
+                    result = {
+                        'agency': worker.name, 'status': 'error', 'news': [], 'count': 0,
+                        'error': f'پروسه worker با کد {worker.process.exitcode} متوقف شد', 'elapsed': worker.elapsed()
+                    }
+            elif time.monotonic() >= worker.deadline:
+                print(f"⏱️ worker {worker.name} از مهلت گذشت و kill شد")
+                worker.cleanup()
+                result = {
+                    'agency': worker.name, 'status': 'timeout', 'news': [], 'count': 0,
+                    'error': f'مهلت {timeout:.0f} ثانیه‌ای تمام شد (پروسه kill شد)', 'elapsed': worker.elapsed()
+                }
+            elif AGENCY_WORKER_MAX_RSS_MB and tree_rss_kb(worker.process.pid) > AGENCY_WORKER_MAX_RSS_MB * 1024:
+                print(f"💾 worker {worker.name} از سقف حافظه {AGENCY_WORKER_MAX_RSS_MB:.0f} MB گذشت و kill شد")
+                worker.cleanup()
+                result = {
+                    'agency': worker.name, 'status': 'error', 'news': [], 'count': 0,
+                    'error': f'عبور از سقف حافظه {AGENCY_WORKER_MAX_RSS_MB:.0f} MB (پروسه kill شد)', 'elapsed': worker.elapsed()
+                }
+            else:
+                continue
+            running.remove(worker)
+            if result is None:
+                result = {
+                    'agency': worker.name, 'status': 'error', 'news': [], 'count': 0,
+                    'error': 'worker نتیجه‌ای برنگرداند', 'elapsed': worker.elapsed()
+                }
+            report(result)
+        if running:
+            time.sleep(0.5)
+    return results
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+backfill آرشیو خبرگزاری‌ها برای یک بازه تاریخ شمسی
+صفحه‌های آرشیو هر روز به صورت هم‌زمان دریافت می‌شوند و مکان‌نمای هر روز در جدول
+backfill_cursors ذخیره می‌شود تا اجرای بعدی از همان صفحه ادامه دهد. اگر همه خبرهای
+چند صفحه پشت سر هم قبلاً ذخیره شده باشند (رسیدن به high-water mark) بقیه صفحه‌های آن روز
+دریافت نمی‌شوند.
+
+اجرا:
+    python backfill.py IRNA 1404/05/01 1404/05/10 [--pages N]
+"""
+
+import os
+import sys
+import datetime
+from datetime import timezone
+from concurrent.futures import ThreadPoolExecutor
+import jdatetime
+from database import SessionLocal, BackfillCursor
+from news_sources import SOURCES
+from news_fetcher import get_known_urls, normalize_url, save_news
+from extraction_pool import map_in_order
+from http_cache import NotModified
+from host_guard import CircuitOpenError
+from scraper_engine import load_listing, read_listing, process_item
+
+# تعداد صفحه‌های آرشیو که هم‌زمان دریافت می‌شوند
+BACKFILL_CONCURRENCY = int(os.getenv('BACKFILL_CONCURRENCY', '4'))
+# پس از این تعداد صفحه پشت سر هم بدون خبر جدید، بقیه صفحه‌های روز دریافت نمی‌شوند
+# (یک صفحه کافی نیست: پس از قطعی، خبرهای جدیدتر روز ذخیره شده‌اند و فاصله خالی در صفحه‌های بعدی است)
+BACKFILL_KNOWN_PAGES_STOP = int(os.getenv('BACKFILL_KNOWN_PAGES_STOP', '2'))
+
+# ساعت رسمی ایران؛ خبرهای آرشیو بدون ساعت دقیق، ظهر همان روز در نظر گرفته می‌شوند
+_TEHRAN = timezone(datetime.timedelta(hours=3, minutes=30))
+
+def parse_jalali(value):
+    """تبدیل '1404/05/03' (یا 1404-05-03) به jdatetime.date"""
+    year, month, day = (int(part) for part in value.replace('-', '/').split('/'))
+    return jdatetime.date(year, month, day)
+
+def iter_days(date_from, date_to):
+    """روزهای بازه از جدیدترین به قدیمی‌ترین"""
+    day = date_to
+    while day >= date_from:
+        yield day
+        day -= datetime.timedelta(days=1)
+
+def today_jalali():
+    """تاریخ شمسی امروز به ساعت تهران"""
+    return jdatetime.date.fromgregorian(date=datetime.datetime.now(_TEHRAN).date())
+
+def archive_url(source, day, page):
+    return source['archive']['url'].format(page=page, year=day.year, month=day.month, day=day.day)
+
+def _get_cursor(db, agency, day_key):
+    cursor = db.query(BackfillCursor).filter(
+        BackfillCursor.agency == agency,
+        BackfillCursor.day == day_key
+    ).first()
+    if cursor is None:
+        cursor = BackfillCursor(agency=agency, day=day_key, next_page=1, done=False, saved_count=0)
+        db.add(cursor)
+        db.commit()
+    return cursor
+
+def _load_page(source, day, page):
+    """دریافت یک صفحه آرشیو و برگرداندن خبرهای آن"""
+    html, soup, _ = load_listing(source, archive_url(source, day, page))
+    return read_listing(source, html, soup)
+
+def backfill_day(source, day, max_pages=None):
+    """دریافت همه صفحه‌های آرشیو یک روز از محل مکان‌نما؛ خروجی تعداد خبرهای ذخیره شده"""
+    agency = source['agency']
+    archive = source['archive']
+    max_pages = max_pages or archive.get('max_pages', 50)
+    # صفحه آرشیو بیش از 15 خبر فهرست اصلی دارد
+    page_source = dict(source, max_items=archive.get('page_size', 100))
+    day_key = day.strftime('%Y/%m/%d')
+    published_at = datetime.datetime(*day.togregorian().timetuple()[:3], 12, tzinfo=_TEHRAN).astimezone(timezone.utc)
+
+    db = SessionLocal()
+    try:
+        cursor = _get_cursor(db, agency, day_key)
+        if cursor.done:
+            print(f"⏭️ {agency} {day_key}: قبلاً کامل دریافت شده است")
+            return 0
+        saved = 0
+        known_pages = 0
+        # فقط با رسیدن به پایان آرشیو یا خبرهای ذخیره شده (نه سقف max_pages) روز کامل است
+        finished = False
+        page = cursor.next_page
+        with ThreadPoolExecutor(max_workers=BACKFILL_CONCURRENCY, thread_name_prefix='backfill') as executor:
+            while page <= max_pages:
+                pages = list(range(page, min(page + BACKFILL_CONCURRENCY, max_pages + 1)))
+                futures = [executor.submit(_load_page, page_source, day, p) for p in pages]
+                stop = False
+                for p, future in zip(pages, futures):
+                    try:
+                        items = future.result()
+                    except (NotModified, CircuitOpenError) as e:
+                        print(f"⛔ {agency} {day_key} صفحه {p}: {e}")
+                        return saved
+                    except Exception as e:
+                        print(f"خطا در دریافت آرشیو {agency} {day_key} صفحه {p}: {e}")
+                        return saved
+                    if not items:
+                        # پایان آرشیو این روز
+                        finished = stop = True
+                        break
+
+                    known = get_known_urls(item['url'] for item in items)
+                    new_items = [item for item in items if normalize_url(item['url']) not in known]
+                    for item in new_items:
+                        item.setdefault('published_at', published_at)
+                    news_list = [news for news in map_in_order(lambda i, item: _process(page_source, item), new_items) if news]
+                    if news_list:
+                        save_news(news_list)
+                    saved += len(news_list)
+                    print(f"📄 {agency} {day_key} صفحه {p}: {len(items)} خبر، {len(news_list)} خبر جدید")
+
+                    cursor.next_page = p + 1
+                    cursor.saved_count = (cursor.saved_count or 0) + len(news_list)
+                    db.commit()
+                    known_pages = 0 if new_items else known_pages + 1
+                    if known_pages >= BACKFILL_KNOWN_PAGES_STOP:
+                        # صفحه‌های بعدی قدیمی‌تر و قبلاً ذخیره شده‌اند
+                        print(f"🏁 {agency} {day_key}: به خبرهای ذخیره شده رسیدیم")
+                        finished = stop = True
+                        break
+                if stop:
+                    break
+                page = pages[-1] + 1
+        if finished:
+            if day == today_jalali():
+                # آرشیو امروز هنوز خبر جدید می‌گیرد و خبرهای جدید در صفحه‌های اول اضافه می‌شوند؛
+                # اجرای بعدی از صفحه اول شروع می‌کند و با رسیدن به خبرهای ذخیره شده متوقف می‌شود
+                cursor.next_page = 1
+            else:
+                cursor.done = True
+            db.commit()
+        return saved
+    finally:
+        db.close()
+
+def _process(source, item):
+    try:
+        return process_item(source, item)
+    except CircuitOpenError as e:
+        print(f"خبر {source['agency']} رد شد: {e}")
+        return None
+
+def backfill(agency, date_from, date_to, max_pages=None):
+    """backfill آرشیو یک خبرگزاری در بازه تاریخ شمسی (رشته یا jdatetime.date)"""
+    source = SOURCES[agency]
+    if 'archive' not in source:
+        raise ValueError(f"{agency} آرشیو قابل backfill ندارد")
+    if isinstance(date_from, str):
+        date_from = parse_jalali(date_from)
+    if isinstance(date_to, str):
+        date_to = parse_jalali(date_to)
+    total = 0
+    for day in iter_days(date_from, date_to):
+        total += backfill_day(source, day, max_pages)
+    print(f"✅ backfill {agency}: {total} خبر ذخیره شد")
+    return total
+
+def main():
+    args = sys.argv[1:]
+    max_pages = None
+    if '--pages' in args:
+        index = args.index('--pages')
+        max_pages = int(args[index + 1])
+        del args[index:index + 2]
+    if len(args) != 3:
+        print(__doc__)
+        sys.exit(1)
+    backfill(args[0], args[1], args[2], max_pages)
+
+    # بدون سرور workerی برای صف خلاصه‌سازی نیست؛ خلاصه‌های LLM همین‌جا تولید می‌شوند
+    from summary_queue import SUMMARY_DEFERRED, drain_queue
+    if SUMMARY_DEFERRED:
+        drain_queue()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+بنچمارک حالت scrape مرورگر
+زمان رسیدن به فهرست اخبار و بیشترین حافظه (RSS) پروسه‌های Chrome را
+با و بدون حالت scrape برای آرشیو IRNA و ISNA اندازه می‌گیرد.
+
+اجرا:
+    python bench_browser.py [تعداد تکرار]
+"""
+
+import os
+import sys
+import time
+import threading
+from browser_pool import BrowserPool, wait_for_selector
+from process_utils import tree_rss_kb
+
+TARGETS = [
+    ('IRNA', 'https://www.irna.ir/archive', 'ul li'),
+    ('ISNA', 'https://www.isna.ir/archive', 'div.items ul li'),
+]
+
+class PeakRssSampler:
+    """نمونه‌برداری دوره‌ای از مجموع RSS پروسه chromedriver و فرزندانش"""
+
+    def __init__(self, root_pid, interval=0.1):
+        self.root_pid = root_pid
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_kb = max(self.peak_kb, tree_rss_kb(self.root_pid))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+def bench(scrape_mode, runs):
+    pool = BrowserPool(size=1, scrape_mode=scrape_mode)
+    results = {name: {'times': [], 'peak_kb': 0} for name, _, _ in TARGETS}
+    try:
+        for _ in range(runs):
+            for name, url, selector in TARGETS:
+                with pool.tab() as driver:
+                    with PeakRssSampler(driver.service.process.pid) as sampler:
+                        start = time.perf_counter()
+                        driver.get(url)
+                        wait_for_selector(driver, selector)
+                        elapsed = time.perf_counter() - start
+                    results[name]['times'].append(elapsed)
+                    results[name]['peak_kb'] = max(results[name]['peak_kb'], sampler.peak_kb)
+    finally:
+        pool.close()
+    return results
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    if not os.path.isdir('/proc'):
+        print("⚠️ اندازه‌گیری RSS فقط روی لینوکس ممکن است")
+
+    print(f"🚀 بنچمارک مرورگر ({runs} تکرار برای هر سایت)")
+    print("=" * 60)
+    for scrape_mode in (False, True):
+        label = 'scrape' if scrape_mode else 'عادی'
+        results = bench(scrape_mode, runs)
+        print(f"\n🔧 حالت {label}:")
+        for name, data in results.items():
+            times = sorted(data['times'])
+            median = times[len(times) // 2]
+            print(
+                f"  {name}: زمان تا فهرست اخبار میانه {median:.2f} ث "
+                f"(کمینه {times[0]:.2f}، بیشینه {times[-1]:.2f})، "
+                f"بیشترین RSS {data['peak_kb'] / 1024:.0f} MB"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+بنچمارک parse صفحات خبرگزاری‌ها
+زمان parse و حافظه مصرفی هر صفحه را برای روش قدیمی (html.parser روی کل صفحه)
+و لایه جدید html_parsing (lxml، حذف بلوک‌های سنگین و parse جزئی) مقایسه می‌کند.
+
+صفحات نمونه در پوشه samples به شکل زیر قرار می‌گیرند:
+    samples/<AGENCY>/listing*.html
+    samples/<AGENCY>/article*.html
+
+اجرا:
+    python bench_parsing.py [پوشه نمونه‌ها] [--download] [--repeat N]
+
+با --download صفحه فهرست و چند خبر اول هر منبع از اینترنت دریافت و ذخیره می‌شود.
+"""
+
+import os
+import sys
+import glob
+import time
+import tracemalloc
+from bs4 import BeautifulSoup
+from html_parsing import parse_html, HTML_PARSER
+from news_sources import SOURCES
+
+DEFAULT_SAMPLES_DIR = 'samples'
+
+def download_samples(samples_dir, articles_per_source=3):
+    """دریافت صفحه فهرست و چند خبر اول هر منبع"""
+    from http_client import http_get
+    from scraper_engine import load_listing, read_listing
+
+    for name, source in SOURCES.items():
+        target = os.path.join(samples_dir, name)
+        os.makedirs(target, exist_ok=True)
+        try:
+            html, soup, _ = load_listing(source)
+            with open(os.path.join(target, 'listing.html'), 'w', encoding='utf-8') as f:
+                f.write(html)
+            items = read_listing(source, html, soup)
+            for i, item in enumerate(items[:articles_per_source], 1):
+                response = http_get(item['url'])
+                with open(os.path.join(target, f'article{i}.html'), 'w', encoding='utf-8') as f:
+                    f.write(response.text)
+            print(f"✅ {name}: فهرست و {min(len(items), articles_per_source)} خبر ذخیره شد")
+        except Exception as e:
+            print(f"❌ {name}: {e}")
+
+def measure(func, markup, repeat):
+    """میانه زمان اجرا (میلی‌ثانیه) و بیشترین حافظه تخصیص یافته (کیلوبایت)"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(markup)
+        times.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    func(markup)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    times.sort()
+    return times[len(times) // 2], peak / 1024
+
+def methods_for(source, kind):
+    parse_only = source.get('listing_parse_only') if kind == 'listing' else source.get('article', {}).get('parse_only')
+    methods = [
+        ('html.parser (قدیمی)', lambda markup: BeautifulSoup(markup, 'html.parser')),
+        (f'{HTML_PARSER} کامل', lambda markup: parse_html(markup, strip=False)),
+        (f'{HTML_PARSER} + حذف script/style', lambda markup: parse_html(markup)),
+    ]
+    if parse_only:
+        methods.append((
+            f'{HTML_PARSER} + parse جزئی {parse_only}',
+            lambda markup: parse_html(markup, parse_only)
+        ))
+    return methods
+
+def main():
+    args = sys.argv[1:]
+    repeat = 5
+    if '--repeat' in args:
+        index = args.index('--repeat')
+        repeat = int(args[index + 1])
+        del args[index:index + 2]
+    download = '--download' in args
+    args = [arg for arg in args if arg != '--download']
+    samples_dir = args[0] if args else DEFAULT_SAMPLES_DIR
+
+    if download:
+        download_samples(samples_dir)
+
+    print(f"🚀 بنچمارک parse (parser پیش‌فرض: {HTML_PARSER}، {repeat} تکرار)")
+    print("=" * 70)
+    found = False
+    for name, source in SOURCES.items():
+        for kind in ('listing', 'article'):
+            for path in sorted(glob.glob(os.path.join(samples_dir, name, f'{kind}*.html'))):
+                found = True
+                with open(path, encoding='utf-8') as f:
+                    markup = f.read()
+                print(f"\n📄 {name} / {os.path.basename(path)} ({len(markup.encode('utf-8')) / 1024:.0f} KB)")
+                for label, func in methods_for(source, kind):
+                    elapsed, peak_kb = measure(func, markup, max(repeat, 1))
+                    print(f"  {label:45} {elapsed:8.1f} ms  {peak_kb / 1024:7.1f} MB")
+    if not found:
+        print(f"⚠️ صفحه نمونه‌ای در {samples_dir} پیدا نشد؛ با --download نمونه‌ها را دریافت کنید")
+
+if __name__ == "__main__":
+    main()
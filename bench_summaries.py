@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+بنچمارک سرویس خلاصه‌سازی روی سرور آزمایشی محلی (بدون اینترنت و بدون هزینه API)
+روش قدیمی (یک درخواست در هر زمان) با SummaryService هم‌زمان مقایسه می‌شود.
+
+اجرا:
+    python bench_summaries.py [--count 40] [--latency 1.0] [--concurrency 8] [--rpm 600] [--deadline 30]
+"""
+
+import sys
+import time
+from mock_llm_server import start_mock_server
+from summarizer_service import SummaryService
+
+def make_articles(count):
+    paragraph = 'این یک بند آزمایشی از متن خبر است که برای سنجش سرعت خلاصه‌سازی تکرار می‌شود. '
+    return [(f'متن خبر شماره {i}. ' + paragraph * 20, f'عنوان خبر شماره {i}') for i in range(count)]
+
+def run(service, articles):
+    start = time.perf_counter()
+    results = service.summarize_many(articles)
+    elapsed = time.perf_counter() - start
+    llm = sum(1 for result in results if result['source'] == 'llm')
+    return elapsed, llm, len(results) - llm
+
+def main():
+    args = sys.argv[1:]
+    options = {'count': 40, 'latency': 1.0, 'concurrency': 8, 'rpm': 600, 'deadline': 30.0}
+    for flag, cast in (('--count', int), ('--latency', float), ('--concurrency', int), ('--rpm', int), ('--deadline', float)):
+        if flag in args:
+            options[flag[2:]] = cast(args[args.index(flag) + 1])
+
+    server, api_base = start_mock_server(latency=options['latency'])
+    articles = make_articles(options['count'])
+    print(f"🤖 {len(articles)} خبر، تأخیر هر پاسخ {options['latency']} ثانیه، بودجه {options['rpm']} درخواست در دقیقه\n")
+
+    for label, concurrency in (('یکی یکی (روش قدیمی)', 1), (f"هم‌زمان ({options['concurrency']})", options['concurrency'])):
+        service = SummaryService(
+            api_base=api_base, api_key='', concurrency=concurrency,
+            rpm=options['rpm'], tpm=10 ** 7, deadline=options['deadline']
+        )
+        elapsed, llm, fallback = run(service, articles)
+        service.close()
+        print(
+            f"{label:24} {elapsed:7.1f} ثانیه  {len(articles) / elapsed:6.2f} خبر در ثانیه  "
+            f"{llm} خلاصه LLM، {fallback} fallback، {service.stats['retries']} تلاش دوباره"
+        )
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import os
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException, TimeoutException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from http_client import DEFAULT_USER_AGENT
+
+# pool مرورگرهای Chrome که بین دفعات دریافت اخبار گرم نگه داشته می‌شوند
+# برای هر صفحه یک tab جدید باز می‌شود و پروسه مرورگر دوباره ساخته نمی‌شود
+
+BROWSER_POOL_SIZE = int(os.getenv('BROWSER_POOL_SIZE', '2'))
+# پس از این تعداد صفحه، مرورگر بسته و مرورگر تازه ساخته می‌شود (جلوگیری از نشت حافظه)
+BROWSER_MAX_USES = int(os.getenv('BROWSER_MAX_USES', '50'))
+# حداکثر عمر یک مرورگر (ثانیه)
+BROWSER_MAX_AGE = float(os.getenv('BROWSER_MAX_AGE', '3600'))
+# اگر حافظه JS صفحه از این مقدار (مگابایت) بیشتر شود، مرورگر بازیافت می‌شود
+BROWSER_MAX_JS_HEAP_MB = int(os.getenv('BROWSER_MAX_JS_HEAP_MB', '512'))
+# حداکثر زمان انتظار برای ظاهر شدن فهرست اخبار (ثانیه)
+BROWSER_WAIT_TIMEOUT = float(os.getenv('BROWSER_WAIT_TIMEOUT', '30'))
+
+# حالت scrape: فقط HTML لازم است؛ تصویر، ویدیو، فونت و اسکریپت‌های تبلیغاتی/آماری لود نمی‌شوند
+BROWSER_SCRAPE_MODE = os.getenv('BROWSER_SCRAPE_MODE', '1') == '1'
+# سقف حافظه heap موتور JS در حالت scrape (مگابایت)
+BROWSER_SCRAPE_JS_HEAP_MB = int(os.getenv('BROWSER_SCRAPE_JS_HEAP_MB', '256'))
+
+# سایت‌های تبلیغاتی و آماری که در حالت scrape مسدود می‌شوند
+BLOCKED_HOSTS = [
+    'google-analytics.com',
+    'googletagmanager.com',
+    'googlesyndication.com',
+    'doubleclick.net',
+    'googleadservices.com',
+    'facebook.net',
+    'hotjar.com',
+    'yandex.ru',
+    'scorecardresearch.com',
+    'chartbeat.com',
+    'taboola.com',
+    'outbrain.com',
+    'yektanet.com',
+    'tapsell.ir',
+    'mediaad.org',
+] + [host.strip() for host in os.getenv('BROWSER_BLOCKED_HOSTS', '').split(',') if host.strip()]
+
+# پسوند فایل‌هایی که در حالت scrape دانلود نمی‌شوند (تصویر، ویدیو، صوت، فونت)
+BLOCKED_EXTENSIONS = [
+    'png', 'jpg', 'jpeg', 'gif', 'webp', 'avif', 'svg', 'ico', 'bmp',
+    'mp4', 'webm', 'm3u8', 'mp3', 'ogg', 'wav',
+    'woff', 'woff2', 'ttf', 'otf', 'eot',
+]
+
+def blocked_url_patterns():
+    """الگوهای URL برای Network.setBlockedURLs"""
+    patterns = [f'*.{ext}' for ext in BLOCKED_EXTENSIONS]
+    patterns += [f'*.{ext}?*' for ext in BLOCKED_EXTENSIONS]
+    patterns += [f'*://*{host}/*' for host in BLOCKED_HOSTS]
+    return patterns
+
+def build_chrome_options(scrape_mode=None):
+    """تنظیمات Chrome برای Selenium"""
+    if scrape_mode is None:
+        scrape_mode = BROWSER_SCRAPE_MODE
+    chrome_options = Options()
+    chrome_options.add_argument('--headless')  # اجرا بدون نمایش
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--window-size=1920,1080')
+    chrome_options.add_argument(f'--user-agent={DEFAULT_USER_AGENT}')
+    if scrape_mode:
+        # بعد از DOMContentLoaded کنترل برگردانده می‌شود و منتظر تصاویر و iframeها نمی‌مانیم
+        chrome_options.page_load_strategy = 'eager'
+        chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+        chrome_options.add_argument(f'--js-flags=--max-old-space-size={BROWSER_SCRAPE_JS_HEAP_MB}')
+        chrome_options.add_argument('--disable-extensions')
+        chrome_options.add_argument('--disable-background-networking')
+        chrome_options.add_argument('--mute-audio')
+        chrome_options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+            'profile.managed_default_content_settings.media_stream': 2,
+            'profile.default_content_setting_values.notifications': 2,
+        })
+    return chrome_options
+
+def apply_scrape_mode(driver):
+    """مسدود کردن فونت، رسانه و سایت‌های تبلیغاتی برای tab فعلی (از طریق CDP)"""
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked_url_patterns()})
+    except Exception as e:
+        print(f"⚠️ اعمال حالت scrape روی tab ممکن نشد: {e}")
+
+def create_driver(scrape_mode=None):
+    """ساخت یک مرورگر Chrome جدید"""
+    chrome_options = build_chrome_options(scrape_mode)
+    # استفاده از ChromeDriver - نسخه جدید Selenium
+    try:
+        return webdriver.Chrome(options=chrome_options)
+    except Exception:
+        # اگر ChromeDriver در PATH نباشد، از مسیر محلی استفاده کن
+        driver_path = './chromedriver.exe'
+        from selenium.webdriver.chrome.service import Service
+        service = Service(executable_path=driver_path)
+        return webdriver.Chrome(service=service, options=chrome_options)
+
+class _Browser:
+    def __init__(self, driver):
+        self.driver = driver
+        self.base_handle = driver.current_window_handle
+        self.created_at = time.monotonic()
+        self.uses = 0
+        self.broken = False
+
+    def expired(self):
+        return self.uses >= BROWSER_MAX_USES or time.monotonic() - self.created_at >= BROWSER_MAX_AGE
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+class BrowserPool:
+    """pool مرورگرهای گرم؛ هر tab() یک tab جدید روی یکی از مرورگرها باز می‌کند"""
+
+    def __init__(self, size=None, scrape_mode=None):
+        self.size = size or BROWSER_POOL_SIZE
+        self.scrape_mode = BROWSER_SCRAPE_MODE if scrape_mode is None else scrape_mode
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _checkout(self):
+        with self._lock:
+            while self._idle:
+                browser = self._idle.pop()
+                if not browser.expired() and self._alive(browser):
+                    return browser
+                print("♻️ بازیافت مرورگر قدیمی یا از کار افتاده")
+                browser.quit()
+        return _Browser(create_driver(self.scrape_mode))
+
+    def _checkin(self, browser):
+        with self._lock:
+            if browser.broken or browser.expired() or self._closed:
+                browser.quit()
+            else:
+                self._idle.append(browser)
+
+    @staticmethod
+    def _alive(browser):
+        try:
+            browser.driver.switch_to.window(browser.base_handle)
+            return True
+        except WebDriverException:
+            return False
+
+    @staticmethod
+    def _heap_too_large(driver):
+        try:
+            used = driver.execute_script(
+                'return window.performance && performance.memory ? performance.memory.usedJSHeapSize : 0'
+            )
+            return used and used > BROWSER_MAX_JS_HEAP_MB * 1024 * 1024
+        except WebDriverException:
+            return False
+
+    @contextmanager
+    def tab(self):
+        """گرفتن یک tab جدید؛ پس از پایان، tab بسته و مرورگر به pool برگردانده می‌شود"""
+        self._slots.acquire()
+        browser = None
+        try:
+            browser = self._checkout()
+            driver = browser.driver
+            driver.switch_to.new_window('tab')
+            if self.scrape_mode:
+                apply_scrape_mode(driver)
+            try:
+                yield driver
+            except TimeoutException:
+                # صفحه دیر لود شد؛ مرورگر سالم است
+                raise
+            except WebDriverException:
+                browser.broken = True
+                raise
+            finally:
+                browser.uses += 1
+                if not browser.broken:
+                    try:
+                        if self._heap_too_large(driver):
+                            print("⚠️ حافظه مرورگر از حد مجاز گذشت، مرورگر بازیافت می‌شود")
+                            browser.broken = True
+                        driver.close()
+                        driver.switch_to.window(browser.base_handle)
+                    except WebDriverException:
+                        browser.broken = True
+        except Exception:
+            if browser is not None and not browser.broken:
+                # خطای ساخت tab معمولاً یعنی مرورگر crash کرده است
+                browser.broken = not self._alive(browser)
+            raise
+        finally:
+            if browser is not None:
+                self._checkin(browser)
+            self._slots.release()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for browser in self._idle:
+                browser.quit()
+            self._idle = []
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_browser_pool():
+    """pool مشترک مرورگرها (در اولین استفاده ساخته می‌شود)"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = BrowserPool()
+                atexit.register(_pool.close)
+    return _pool
+
+def wait_for_selector(driver, selector, timeout=None):
+    """انتظار تا ظاهر شدن selector در صفحه (به جای sleep ثابت برای Cloudflare)"""
+    WebDriverWait(driver, timeout or BROWSER_WAIT_TIMEOUT, poll_frequency=0.25).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+    )
@@ -0,0 +1,10 @@
+import os
+import atexit
+import shutil
+import tempfile
+
+# تست‌ها روی دیتابیس موقت اجرا می‌شوند تا panel_rasad.db تغییر نکند (migration، جدول‌ها و ردیف‌های جدید)
+# باید پیش از import شدن database در ماژول‌های تست تنظیم شود
+_db_dir = tempfile.mkdtemp(prefix='panel_rasad_test_')
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'panel_rasad.db')}"
@@ -1,10 +1,12 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime
+from sqlalchemy import create_engine, Column, Integer, Float, String, Text, DateTime, Boolean, UniqueConstraint, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.exc import OperationalError
+import os
 import datetime
 
-# پایگاه داده SQLite
-SQLALCHEMY_DATABASE_URL = "sqlite:///./panel_rasad.db"
+# پایگاه داده SQLite (تست‌ها با DATABASE_URL دیتابیس موقت جداگانه استفاده می‌کنند)
+SQLALCHEMY_DATABASE_URL = os.getenv('DATABASE_URL', "sqlite:///./panel_rasad.db")
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
@@ -15,9 +17,11 @@ class News(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)  # عنوان خبر
     url = Column(String)  # لینک خبر
+    url_normalized = Column(String, unique=True, index=True)  # لینک نرمال‌شده برای تشخیص خبر تکراری قبل از استخراج
     summary = Column(Text)  # خلاصه خبر
     agency = Column(String)  # خبرگزاری
     published_at = Column(DateTime, default=datetime.datetime.utcnow)  # زمان انتشار
+    summary_status = Column(String, default='ready')  # ready / pending (در صف خلاصه‌سازی LLM) / failed
 
 # جدول پیام‌های تلگرام
 class TelegramMessage(Base):
@@ -38,5 +42,121 @@ class DailyMessage(Base):
     created_at = Column(DateTime, default=datetime.datetime.utcnow)  # زمان ایجاد
     updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)  # زمان بروزرسانی
 
+# جدول validatorهای HTTP (ETag / Last-Modified) برای درخواست‌های شرطی
+class HttpValidator(Base):
+    __tablename__ = "http_validators"
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String, unique=True, index=True)  # آدرس درخواست شده
+    etag = Column(String)  # مقدار هدر ETag
+    last_modified = Column(String)  # مقدار هدر Last-Modified
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)  # زمان آخرین دریافت کامل
+
+# ژورنال دریافت اخبار: مرحله هر خبر کشف شده تا در صورت قطع برنامه کار از همان‌جا ادامه پیدا کند
+class FetchJournal(Base):
+    __tablename__ = "fetch_journal"
+    id = Column(Integer, primary_key=True, index=True)
+    url_normalized = Column(String, unique=True, index=True)  # لینک نرمال‌شده خبر
+    agency = Column(String, index=True)  # خبرگزاری
+    stage = Column(String, index=True)  # discovered / extracted / summarized / saved
+    item = Column(Text)  # آیتم فهرست (JSON)
+    article = Column(Text)  # محتوای استخراج شده صفحه خبر (JSON)
+    news = Column(Text)  # خبر خلاصه شده آماده ذخیره (JSON)
+    attempts = Column(Integer, default=1)  # تعداد اجراهایی که این خبر را پردازش کرده‌اند
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)  # زمان کشف
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)  # زمان آخرین تغییر مرحله
+
+# مکان‌نمای backfill آرشیو: آخرین صفحه دریافت شده هر روز هر خبرگزاری
+class BackfillCursor(Base):
+    __tablename__ = "backfill_cursors"
+    __table_args__ = (UniqueConstraint('agency', 'day'),)
+    id = Column(Integer, primary_key=True, index=True)
+    agency = Column(String, index=True)  # خبرگزاری
+    day = Column(String)  # تاریخ شمسی روز آرشیو (1404/05/03)
+    next_page = Column(Integer, default=1)  # اولین صفحه‌ای که هنوز دریافت نشده است
+    done = Column(Boolean, default=False)  # همه خبرهای این روز دریافت شده‌اند
+    saved_count = Column(Integer, default=0)  # تعداد خبرهای ارسال شده برای ذخیره
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)  # زمان آخرین تغییر
+
+class PageSnapshot(Base):
+    __tablename__ = "page_snapshots"
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String)  # آدرس صفحه
+    url_normalized = Column(String, index=True)  # آدرس نرمال شده برای جستجو
+    agency = Column(String, index=True)  # خبرگزاری
+    kind = Column(String)  # listing / feed / article
+    content_hash = Column(String, index=True)  # sha256 محتوای خام (نام فایل فشرده)
+    raw_size = Column(Integer)  # حجم HTML خام (بایت)
+    stored_size = Column(Integer)  # حجم فایل فشرده روی دیسک (بایت)
+    fetched_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)  # زمان دریافت
+
+class SummaryCache(Base):
+    __tablename__ = "summary_cache"
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String, unique=True, index=True)  # sha256 متن نرمال شده، عنوان، مدل و نسخه prompt
+    summary = Column(Text)  # خلاصه تولید شده
+    model = Column(String)  # مدل LLM
+    prompt_version = Column(String)  # نسخه prompt خلاصه‌سازی
+    hits = Column(Integer, default=0)  # تعداد دفعات استفاده از کش
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)  # زمان تولید خلاصه
+    last_used_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)  # آخرین استفاده (برای حذف قدیمی‌ها)
+
+class SummaryTask(Base):
+    __tablename__ = "summary_tasks"
+    id = Column(Integer, primary_key=True, index=True)
+    news_id = Column(Integer, unique=True, index=True)  # خبری که خلاصه آن تولید می‌شود
+    title = Column(String)  # عنوان خبر برای prompt
+    text = Column(Text)  # متن استخراج شده خبر
+    priority = Column(Integer, default=0, index=True)  # اولویت (تعداد کلمات فیلتر در خبر)
+    status = Column(String, default='pending', index=True)  # pending / running
+    attempts = Column(Integer, default=0)  # تعداد تلاش‌های ناموفق
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)  # زمان ورود به صف
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)  # زمان آخرین تغییر
+
+class LlmUsage(Base):
+    __tablename__ = "llm_usage"
+    id = Column(Integer, primary_key=True, index=True)
+    model = Column(String)  # مدل LLM
+    prompt_tokens = Column(Integer)  # توکن‌های ورودی (گزارش API)
+    completion_tokens = Column(Integer)  # توکن‌های خروجی (گزارش API)
+    original_tokens = Column(Integer)  # تخمین توکن متن کامل خبر پیش از اعمال بودجه
+    elapsed = Column(Float)  # زمان پاسخ (ثانیه)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)  # زمان درخواست
+
+def add_missing_columns():
+    """اضافه کردن ستون‌های جدید مدل‌ها به جدول‌های موجود
+
+    create_all فقط جدول‌های جدید را می‌سازد و ستون جدید به جدول قدیمی اضافه نمی‌کند.
+    """
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing = {col['name'] for col in inspector.get_columns(table.name)}
+        new_columns = {col.name for col in table.columns if col.name not in existing}
+        for col in table.columns:
+            if col.name not in new_columns:
+                continue
+            col_type = col.type.compile(dialect=engine.dialect)
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {col.name} {col_type}'))
+            except OperationalError as e:
+                # پروسه دیگری (مثلاً worker دیگر uvicorn) هم‌زمان ستون را اضافه کرده است
+                if 'duplicate column' not in str(e).lower():
+                    raise
+        for index in table.indexes:
+            if any(col.name in new_columns for col in index.columns):
+                try:
+                    with engine.begin() as conn:
+                        index.create(bind=conn, checkfirst=True)
+                except OperationalError as e:
+                    if 'already exists' not in str(e).lower():
+                        raise
+
 # ایجاد جداول
-Base.metadata.create_all(bind=engine) 
\ No newline at end of file
+try:
+    Base.metadata.create_all(bind=engine)
+except OperationalError as e:
+    # چند worker هم‌زمان جدول‌ها را می‌سازند؛ بار دوم جدول‌های ساخته شده رد می‌شوند
+    if 'already exists' not in str(e).lower():
+        raise
+    Base.metadata.create_all(bind=engine)
+add_missing_columns() 
\ No newline at end of file
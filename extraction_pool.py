@@ -0,0 +1,47 @@
+import os
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+# حداکثر تعداد خبرهایی که هم‌زمان استخراج می‌شوند (برای هر fetcher)
+EXTRACT_MAX_WORKERS = int(os.getenv('EXTRACT_MAX_WORKERS', '8'))
+# حداکثر درخواست هم‌زمان به یک سایت (بین همه fetcherها مشترک است)
+EXTRACT_PER_HOST_LIMIT = int(os.getenv('EXTRACT_PER_HOST_LIMIT', '4'))
+
+_host_semaphores = {}
+_host_semaphores_lock = threading.Lock()
+
+def _host_semaphore(url):
+    host = urlparse(url).netloc.lower()
+    with _host_semaphores_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(EXTRACT_PER_HOST_LIMIT)
+        return _host_semaphores[host]
+
+@contextmanager
+def host_slot(url):
+    """گرفتن یکی از ظرفیت‌های هم‌زمانی سایت مربوط به url"""
+    semaphore = _host_semaphore(url)
+    with semaphore:
+        yield
+
+def _call_in_host_slot(func, index, item, url):
+    with host_slot(url):
+        return func(index, item)
+
+def map_in_order(func, items, url_key='url', max_workers=None):
+    """اجرای func(index, item) برای همه آیتم‌ها به صورت هم‌زمان با حفظ ترتیب لیست
+
+    هر فراخوانی داخل ظرفیت سایت item[url_key] اجرا می‌شود تا یک خبرگزاری
+    بیش از EXTRACT_PER_HOST_LIMIT درخواست هم‌زمان دریافت نکند.
+    """
+    if not items:
+        return []
+    max_workers = min(max_workers or EXTRACT_MAX_WORKERS, len(items))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='extract') as executor:
+        futures = [
+            executor.submit(_call_in_host_slot, func, i, item, item[url_key])
+            for i, item in enumerate(items)
+        ]
+        return [future.result() for future in futures]
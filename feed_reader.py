@@ -0,0 +1,85 @@
+import io
+import datetime
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from xml.etree.ElementTree import iterparse, ParseError
+from html_parsing import parse_html
+
+# خواندن فید RSS / Atom به صورت جریانی
+# هر خبر به همان dict فهرست scraper_engine تبدیل می‌شود (title, url, description, time)
+# به علاوه published_at واقعی خبر
+
+def _local_name(tag):
+    """نام تگ بدون namespace ({http://www.w3.org/2005/Atom}entry -> entry)"""
+    return tag.rsplit('}', 1)[-1]
+
+def parse_feed_date(value):
+    """تاریخ RSS (RFC 822) یا Atom (ISO 8601) به datetime با منطقه زمانی UTC"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            date = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if date.tzinfo is None:
+        return date.replace(tzinfo=timezone.utc)
+    return date.astimezone(timezone.utc)
+
+def _clean_text(value):
+    """حذف تگ‌های HTML از توضیحات فید"""
+    value = (value or '').strip()
+    if '<' in value:
+        value = parse_html(value).get_text(' ', strip=True)
+    return value
+
+def _entry_to_item(fields):
+    return {
+        'title': _clean_text(fields.get('title')),
+        'url': (fields.get('link') or fields.get('guid') or '').strip(),
+        'description': _clean_text(fields.get('description') or fields.get('summary') or fields.get('content')),
+        'time': fields.get('pubDate') or fields.get('published') or fields.get('updated') or '',
+        'published_at': parse_feed_date(
+            fields.get('pubDate') or fields.get('published') or fields.get('updated') or fields.get('date')
+        ),
+    }
+
+def parse_feed(data, max_items=None):
+    """استخراج خبرهای فید RSS 2.0 یا Atom
+
+    فید با iterparse خوانده می‌شود و هر item/entry پس از پردازش از حافظه پاک می‌شود.
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    items = []
+    fields = None
+    try:
+        for event, elem in iterparse(io.BytesIO(data), events=('start', 'end')):
+            name = _local_name(elem.tag)
+            if event == 'start':
+                if name in ('item', 'entry'):
+                    fields = {}
+                continue
+            if name in ('item', 'entry'):
+                item = _entry_to_item(fields or {})
+                if item['title'] and item['url']:
+                    items.append(item)
+                fields = None
+                elem.clear()
+                if max_items and len(items) >= max_items:
+                    break
+            elif fields is not None and name not in fields:
+                if name == 'link' and elem.get('href'):
+                    # Atom: لینک اصلی rel=alternate است (یا بدون rel)
+                    if elem.get('rel', 'alternate') == 'alternate':
+                        fields['link'] = elem.get('href')
+                else:
+                    fields[name] = elem.text or ''
+    except ParseError as e:
+        if not items:
+            raise
+        print(f"خطا در ادامه parse فید (از {len(items)} خبر خوانده شده استفاده می‌شود): {e}")
+    return items
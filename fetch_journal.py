@@ -0,0 +1,161 @@
+import os
+import json
+import datetime
+from database import SessionLocal, FetchJournal
+from news_fetcher import normalize_url, get_known_urls
+
+# ژورنال مراحل دریافت اخبار (discovered ← extracted ← summarized ← saved)
+# اگر برنامه وسط دریافت متوقف شود، اجرای بعدی خبرهای نیمه‌کاره را از آخرین مرحله ثبت شده
+# ادامه می‌دهد و استخراج صفحه یا خلاصه‌سازی (پولی) تکرار نمی‌شود
+
+FETCH_JOURNAL_ENABLED = os.getenv('FETCH_JOURNAL_ENABLED', '1') == '1'
+# خبری که در این تعداد اجرا ذخیره نشده است رها می‌شود
+FETCH_JOURNAL_MAX_ATTEMPTS = int(os.getenv('FETCH_JOURNAL_MAX_ATTEMPTS', '3'))
+# ورودی‌های قدیمی‌تر از این تعداد روز پاک می‌شوند
+FETCH_JOURNAL_RETENTION_DAYS = int(os.getenv('FETCH_JOURNAL_RETENTION_DAYS', '7'))
+
+_STAGES = ('discovered', 'extracted', 'summarized', 'saved')
+
+def _default(value):
+    if isinstance(value, datetime.datetime):
+        return {'__datetime__': value.isoformat()}
+    raise TypeError(f"نوع {type(value)} قابل ذخیره در ژورنال نیست")
+
+def _object_hook(value):
+    if '__datetime__' in value:
+        return datetime.datetime.fromisoformat(value['__datetime__'])
+    return value
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, default=_default)
+
+def _loads(value):
+    return json.loads(value, object_hook=_object_hook) if value else None
+
+def _item_data(item):
+    return {key: value for key, value in item.items() if key != 'checkpoint'}
+
+def resume_items(agency, items):
+    """ثبت خبرهای کشف شده و اضافه کردن خبرهای نیمه‌کاره اجراهای قبلی
+
+    خروجی فهرست خبرهاست؛ خبری که قبلاً استخراج یا خلاصه شده کلید checkpoint
+    ({'stage', 'article', 'news'}) دارد و مراحل انجام شده دوباره اجرا نمی‌شوند.
+    items باید پیش از این با filter_known_items از خبرهای ذخیره شده پاک شده باشد.
+    """
+    if not FETCH_JOURNAL_ENABLED:
+        return items
+    db = SessionLocal()
+    try:
+        by_key = {}
+        for item in items:
+            by_key.setdefault(normalize_url(item['url']), item)
+        rows = {
+            row.url_normalized: row
+            for row in db.query(FetchJournal).filter(
+                FetchJournal.agency == agency,
+                FetchJournal.stage != 'saved'
+            )
+        }
+        if by_key:
+            rows.update({
+                row.url_normalized: row
+                for row in db.query(FetchJournal).filter(FetchJournal.url_normalized.in_(list(by_key)))
+            })
+
+        result = []
+        for key, item in by_key.items():
+            row = rows.pop(key, None)
+            if row is None:
+                db.add(FetchJournal(url_normalized=key, agency=agency, stage='discovered', item=_dumps(_item_data(item))))
+            elif row.stage == 'saved':
+                # قبلاً پردازش شده است (حتی اگر save_news آن را به دلیل عنوان مشابه ذخیره نکرده باشد)
+                continue
+            else:
+                # خبر رها شده دست نمی‌خورد تا prune_journal آن را پاک کند
+                if (row.attempts or 0) >= FETCH_JOURNAL_MAX_ATTEMPTS:
+                    continue
+                row.attempts = (row.attempts or 0) + 1
+                if row.stage in ('extracted', 'summarized'):
+                    item = dict(item, checkpoint={
+                        'stage': row.stage,
+                        'article': _loads(row.article),
+                        'news': _loads(row.news),
+                    })
+            result.append(item)
+
+        # خبرهای نیمه‌کاره‌ای که دیگر در فهرست نیستند
+        resumed = 0
+        leftovers = [row for row in rows.values() if row.stage != 'saved' and (row.attempts or 0) < FETCH_JOURNAL_MAX_ATTEMPTS]
+        known = get_known_urls(row.url_normalized for row in leftovers) if leftovers else set()
+        for row in leftovers:
+            if row.url_normalized in known:
+                # پیش از ثبت مرحله saved در جدول اخبار ذخیره شده است
+                row.stage = 'saved'
+                continue
+            row.attempts = (row.attempts or 0) + 1
+            item = _loads(row.item)
+            if row.stage in ('extracted', 'summarized'):
+                item['checkpoint'] = {'stage': row.stage, 'article': _loads(row.article), 'news': _loads(row.news)}
+            result.append(item)
+            resumed += 1
+        db.commit()
+        if resumed:
+            print(f"♻️ {agency}: {resumed} خبر نیمه‌کاره از اجرای قبلی ادامه داده می‌شود")
+        return result
+    except Exception as e:
+        print(f"خطا در ژورنال دریافت {agency}: {e}")
+        db.rollback()
+        return items
+    finally:
+        db.close()
+
+def _set_stage(urls, stage, field=None, values=None):
+    if not FETCH_JOURNAL_ENABLED:
+        return
+    db = SessionLocal()
+    try:
+        keys = [normalize_url(url) for url in urls]
+        rows = {row.url_normalized: row for row in db.query(FetchJournal).filter(FetchJournal.url_normalized.in_(keys))}
+        for i, key in enumerate(keys):
+            row = rows.get(key)
+            if row is None or _STAGES.index(row.stage) > _STAGES.index(stage):
+                continue
+            row.stage = stage
+            if field:
+                setattr(row, field, _dumps(values[i]))
+        db.commit()
+    except Exception as e:
+        print(f"خطا در ثبت مرحله {stage} در ژورنال: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+def mark_extracted(item, article):
+    """ثبت محتوای استخراج شده صفحه خبر"""
+    _set_stage([item['url']], 'extracted', 'article', [article])
+
+def mark_summarized(item, news):
+    """ثبت خبر خلاصه شده (پیش از ذخیره در جدول اخبار)"""
+    _set_stage([item['url']], 'summarized', 'news', [news])
+
+def mark_saved(news_list):
+    """ثبت ذخیره شدن دسته‌ای از خبرها"""
+    _set_stage([news['url'] for news in news_list], 'saved')
+
+def prune_journal(days=None):
+    """حذف ورودی‌های قدیمی ژورنال (بر اساس زمان کشف تا خبرهای رها شده هم پاک شوند)"""
+    if not FETCH_JOURNAL_ENABLED:
+        return 0
+    days = days if days is not None else FETCH_JOURNAL_RETENTION_DAYS
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+    db = SessionLocal()
+    try:
+        count = db.query(FetchJournal).filter(FetchJournal.created_at < cutoff).delete(synchronize_session=False)
+        db.commit()
+        return count
+    except Exception as e:
+        print(f"خطا در پاک‌سازی ژورنال دریافت: {e}")
+        db.rollback()
+        return 0
+    finally:
+        db.close()
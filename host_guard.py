@@ -0,0 +1,155 @@
+import os
+import time
+import random
+import threading
+
+# محدودکننده نرخ و circuit breaker هر سایت
+# هر سایت یک token bucket دارد که با پاسخ‌های 429/503 کند و با پاسخ‌های موفق دوباره تند می‌شود.
+# پس از چند خطای پشت سر هم مدار سایت باز می‌شود و تا پایان زمان استراحت هیچ درخواستی
+# به آن ارسال نمی‌شود؛ بعد از آن یک درخواست آزمایشی فرستاده می‌شود و اگر باز هم خطا داد
+# زمان استراحت (با jitter) دو برابر می‌شود.
+
+# حداکثر درخواست در ثانیه به هر سایت و ظرفیت انفجاری bucket
+HOST_RATE_LIMIT = float(os.getenv('HOST_RATE_LIMIT', '5'))
+HOST_RATE_BURST = float(os.getenv('HOST_RATE_BURST', '5'))
+# کمترین نرخ پس از کند شدن با 429/503
+HOST_RATE_MIN = float(os.getenv('HOST_RATE_MIN', '0.5'))
+# تعداد خطای پشت سر همی که مدار را باز می‌کند
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '3'))
+# زمان استراحت اولیه و حداکثر آن (ثانیه)
+CIRCUIT_COOLDOWN = float(os.getenv('CIRCUIT_COOLDOWN', '30'))
+CIRCUIT_MAX_COOLDOWN = float(os.getenv('CIRCUIT_MAX_COOLDOWN', '900'))
+
+# پاسخ‌هایی که نشان می‌دهند سایت در دسترس نیست یا ما را مسدود کرده است
+_FAILURE_STATUSES = (403, 429, 500, 502, 503, 504)
+# پاسخ‌هایی که یعنی باید آهسته‌تر درخواست بفرستیم
+_THROTTLE_STATUSES = (429, 503)
+
+class CircuitOpenError(Exception):
+    """مدار سایت باز است و درخواست بدون ارسال رد شد"""
+    def __init__(self, host, retry_in):
+        super().__init__(f"مدار {host} باز است؛ {retry_in:.0f} ثانیه تا تلاش بعدی")
+        self.host = host
+        self.retry_in = retry_in
+
+class _HostState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rate = HOST_RATE_LIMIT
+        self.tokens = HOST_RATE_BURST
+        self.refilled_at = time.monotonic()
+        self.failures = 0
+        self.state = 'closed'  # closed / open / half_open
+        self.open_until = 0.0
+        self.trips = 0  # تعداد باز شدن پشت سر هم (برای backoff نمایی)
+        self.rejected = 0
+
+_hosts = {}
+_hosts_lock = threading.Lock()
+
+def _get_state(host):
+    with _hosts_lock:
+        if host not in _hosts:
+            _hosts[host] = _HostState()
+        return _hosts[host]
+
+def _cooldown(trips, retry_after=None):
+    """زمان استراحت با backoff نمایی و jitter (نیمی ثابت، نیمی تصادفی)"""
+    cooldown = min(CIRCUIT_MAX_COOLDOWN, CIRCUIT_COOLDOWN * 2 ** max(trips - 1, 0))
+    cooldown = cooldown / 2 + random.uniform(0, cooldown / 2)
+    if retry_after:
+        cooldown = max(cooldown, min(retry_after, CIRCUIT_MAX_COOLDOWN))
+    return cooldown
+
+def _open(state, host, retry_after=None):
+    state.trips += 1
+    cooldown = _cooldown(state.trips, retry_after)
+    state.state = 'open'
+    state.open_until = time.monotonic() + cooldown
+    print(f"⛔ مدار {host} پس از {state.failures} خطای پشت سر هم باز شد ({cooldown:.0f} ثانیه استراحت)")
+
+def acquire(host):
+    """اجازه ارسال درخواست به host؛ در صورت باز بودن مدار CircuitOpenError
+
+    اگر bucket خالی باشد تا رسیدن نوبت صبر می‌کند.
+    """
+    state = _get_state(host)
+    with state.lock:
+        now = time.monotonic()
+        if state.state == 'open':
+            if now < state.open_until:
+                state.rejected += 1
+                raise CircuitOpenError(host, state.open_until - now)
+            # پایان استراحت: فقط یک درخواست آزمایشی
+            state.state = 'half_open'
+        elif state.state == 'half_open':
+            state.rejected += 1
+            raise CircuitOpenError(host, 0)
+
+        state.tokens = min(HOST_RATE_BURST, state.tokens + (now - state.refilled_at) * state.rate)
+        state.refilled_at = now
+        # رزرو token؛ اگر منفی شود باید به اندازه کمبود صبر کرد
+        state.tokens -= 1
+        wait = -state.tokens / state.rate if state.tokens < 0 else 0
+    if wait > 0:
+        time.sleep(wait)
+
+def record_result(host, status_code=None, retry_after=None):
+    """ثبت نتیجه درخواست؛ status_code=None یعنی خطای شبکه (timeout، قطع اتصال)"""
+    state = _get_state(host)
+    failed = status_code is None or status_code in _FAILURE_STATUSES
+    with state.lock:
+        if status_code in _THROTTLE_STATUSES:
+            state.rate = max(HOST_RATE_MIN, state.rate / 2)
+        elif not failed:
+            # افزایش تدریجی نرخ تا سقف
+            state.rate = min(HOST_RATE_LIMIT, state.rate + HOST_RATE_LIMIT / 10)
+
+        if not failed:
+            state.failures = 0
+            if state.state != 'closed':
+                print(f"✅ مدار {host} دوباره بسته شد")
+            state.state = 'closed'
+            state.trips = 0
+            return
+
+        state.failures += 1
+        if state.state == 'half_open':
+            _open(state, host, retry_after)
+        elif state.state == 'closed':
+            # با 429 و Retry-After سایت صراحتاً زمان تلاش بعدی را اعلام کرده است
+            if state.failures >= CIRCUIT_FAILURE_THRESHOLD or (status_code == 429 and retry_after):
+                _open(state, host, retry_after)
+
+def parse_retry_after(value):
+    """مقدار هدر Retry-After به ثانیه (فقط قالب عددی)"""
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+def reset_host(host):
+    """بستن مدار و بازگرداندن نرخ host (مثلاً پس از گرفتن کوکی جدید از مرورگر)"""
+    state = _get_state(host)
+    with state.lock:
+        state.failures = 0
+        state.trips = 0
+        state.state = 'closed'
+        state.rate = HOST_RATE_LIMIT
+
+def get_host_guard_states():
+    """وضعیت مدار و نرخ فعلی هر سایت"""
+    result = {}
+    with _hosts_lock:
+        hosts = dict(_hosts)
+    now = time.monotonic()
+    for host, state in hosts.items():
+        with state.lock:
+            result[host] = {
+                'state': state.state,
+                'rate': state.rate,
+                'failures': state.failures,
+                'retry_in': max(state.open_until - now, 0.0) if state.state == 'open' else 0.0,
+                'rejected': state.rejected
+            }
+    return result
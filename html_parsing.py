@@ -0,0 +1,44 @@
+import re
+from functools import lru_cache
+from bs4 import BeautifulSoup, SoupStrainer
+
+# لایه parse صفحات HTML
+# در صورت نصب بودن lxml از parser سریع C استفاده می‌شود و فقط بخش‌های لازم صفحه ساخته می‌شوند
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# بلوک‌هایی که هیچ selectorی به آن‌ها نیاز ندارد ولی بخش بزرگی از صفحه هستند
+_HEAVY_BLOCKS_RE = re.compile(r'<(script|style|svg|noscript|template)\b[^>]*>.*?</\1\s*>', re.S | re.I)
+_COMMENTS_RE = re.compile(r'<!--.*?-->', re.S)
+
+def strip_heavy_blocks(markup):
+    """حذف script، style، svg و کامنت‌ها پیش از parse"""
+    markup = _HEAVY_BLOCKS_RE.sub('', markup)
+    return _COMMENTS_RE.sub('', markup)
+
+@lru_cache(maxsize=None)
+def build_strainer(spec):
+    """ساخت SoupStrainer از روی spec
+
+    spec یک tuple از نام تگ‌هاست (مثل ('ul', 'article')) یا یک عنصر به شکل 'tag.class'
+    (مثل ('div.items',)). فقط زیردرخت عناصر منطبق ساخته می‌شود.
+    """
+    if len(spec) == 1 and '.' in spec[0]:
+        tag, css_class = spec[0].split('.', 1)
+        return SoupStrainer(tag, class_=re.compile(r'(^|\s)' + re.escape(css_class) + r'(\s|$)'))
+    if any('.' in name for name in spec):
+        raise ValueError(f"فقط یک عنصر 'tag.class' در parse_only مجاز است: {spec}")
+    return SoupStrainer(list(spec))
+
+def parse_html(markup, parse_only=None, strip=True):
+    """parse صفحه HTML؛ parse_only لیست تگ‌هایی است که فقط زیردرخت آن‌ها ساخته می‌شود"""
+    if isinstance(markup, bytes):
+        markup = markup.decode('utf-8', errors='replace')
+    if strip:
+        markup = strip_heavy_blocks(markup)
+    strainer = build_strainer(tuple(parse_only)) if parse_only else None
+    return BeautifulSoup(markup, HTML_PARSER, parse_only=strainer)
@@ -0,0 +1,82 @@
+import os
+import threading
+from database import SessionLocal, HttpValidator
+from http_client import http_get
+
+# کش validatorهای HTTP برای درخواست‌های شرطی (If-None-Match / If-Modified-Since)
+# اگر سایت 304 برگرداند، صفحه از آخرین دریافت تغییری نکرده و پردازش آن لازم نیست
+
+HTTP_CACHE_ENABLED = os.getenv('HTTP_CACHE_ENABLED', '1') == '1'
+
+class NotModified(Exception):
+    """صفحه از آخرین دریافت تغییری نکرده است (HTTP 304)"""
+    def __init__(self, url):
+        super().__init__(f"صفحه تغییری نکرده است: {url}")
+        self.url = url
+
+# کش حافظه‌ای برای جلوگیری از query تکراری به دیتابیس (None یعنی validator ندارد)
+_validators = {}
+_validators_lock = threading.Lock()
+
+def _load_validators(url):
+    with _validators_lock:
+        if url in _validators:
+            return _validators[url]
+    db = SessionLocal()
+    try:
+        row = db.query(HttpValidator).filter(HttpValidator.url == url).first()
+        value = (row.etag, row.last_modified) if row else None
+    finally:
+        db.close()
+    with _validators_lock:
+        _validators[url] = value
+    return value
+
+def conditional_get(url, **kwargs):
+    """دریافت صفحه با درخواست شرطی؛ در صورت پاسخ 304 خطای NotModified بالا داده می‌شود
+
+    validatorهای پاسخ جدید ذخیره نمی‌شوند تا وقتی فراخوان پس از پردازش موفق
+    remember_validators را صدا بزند؛ در غیر این صورت صفحه‌ای که پردازش آن
+    ناموفق بوده در دفعات بعد به اشتباه رد می‌شد.
+    """
+    headers = dict(kwargs.pop('headers', None) or {})
+    if HTTP_CACHE_ENABLED:
+        validators = _load_validators(url)
+        if validators:
+            etag, last_modified = validators
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+    response = http_get(url, headers=headers, **kwargs)
+    if response.status_code == 304:
+        raise NotModified(url)
+    response.cache_key = url
+    return response
+
+def remember_validators(response):
+    """ذخیره ETag / Last-Modified پاسخ برای درخواست شرطی دفعه بعد"""
+    if not HTTP_CACHE_ENABLED or response.status_code != 200:
+        return
+    url = getattr(response, 'cache_key', response.url)
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    if not etag and not last_modified:
+        return
+    db = SessionLocal()
+    try:
+        row = db.query(HttpValidator).filter(HttpValidator.url == url).first()
+        if row is None:
+            row = HttpValidator(url=url)
+            db.add(row)
+        row.etag = etag
+        row.last_modified = last_modified
+        db.commit()
+    except Exception as e:
+        print(f"خطا در ذخیره validator برای {url}: {e}")
+        db.rollback()
+        return
+    finally:
+        db.close()
+    with _validators_lock:
+        _validators[url] = (etag, last_modified)
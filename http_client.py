@@ -0,0 +1,177 @@
+import os
+import time
+import threading
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from host_guard import acquire, record_result, parse_retry_after, get_host_guard_states
+import http_replay
+
+# کلاینت HTTP مشترک برای همه scraperها
+# اتصال‌های TCP/TLS هر سایت بین درخواست‌ها نگه داشته و دوباره استفاده می‌شوند
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# (زمان اتصال، زمان خواندن) به ثانیه
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '10'))
+# تعداد سایت‌هایی که pool اتصال جداگانه دارند و سقف اتصال باز برای هر سایت
+HTTP_POOL_HOSTS = int(os.getenv('HTTP_POOL_HOSTS', '10'))
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '8'))
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', '2'))
+
+def _accept_encoding():
+    """فشرده‌سازی‌هایی که requests می‌تواند هنگام دریافت از حالت فشرده خارج کند"""
+    encodings = ['gzip', 'deflate']
+    try:
+        import brotli  # noqa: F401
+        encodings.append('br')
+    except ImportError:
+        pass
+    return ', '.join(encodings)
+
+def _build_session():
+    session = requests.Session()
+    retry = Retry(
+        total=HTTP_RETRIES,
+        connect=HTTP_RETRIES,
+        read=1,
+        status=HTTP_RETRIES,
+        # 503 معمولاً صفحه چالش Cloudflare است و تکرار آن فایده‌ای ندارد
+        status_forcelist=(500, 502, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        backoff_factor=0.5,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_HOSTS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        pool_block=True,
+        max_retries=retry
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({
+        'User-Agent': DEFAULT_USER_AGENT,
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+        'Accept-Language': 'fa,en;q=0.8',
+        'Accept-Encoding': _accept_encoding()
+    })
+    return session
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """برگرداندن Session مشترک (در اولین فراخوانی ساخته می‌شود)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+# User-Agent اختصاصی هر دامنه (مثلاً User-Agent مرورگری که کوکی Cloudflare را گرفته است)
+_host_user_agents = {}
+
+def _base_domain(host):
+    parts = host.lower().split(':')[0].split('.')
+    return '.'.join(parts[-2:])
+
+def set_host_user_agent(host, user_agent):
+    """استفاده از user_agent برای همه درخواست‌های بعدی به دامنه host"""
+    _host_user_agents[_base_domain(host)] = user_agent
+
+# آمار هر سایت: تعداد درخواست، خطا، مجموع تأخیر و حجم داده
+_host_stats = {}
+_stats_lock = threading.Lock()
+
+def _record(host, latency, wire_bytes, body_bytes, error=False):
+    with _stats_lock:
+        stats = _host_stats.setdefault(host, {
+            'requests': 0,
+            'errors': 0,
+            'latency_total': 0.0,
+            'latency_max': 0.0,
+            'wire_bytes': 0,
+            'body_bytes': 0
+        })
+        stats['requests'] += 1
+        stats['latency_total'] += latency
+        stats['latency_max'] = max(stats['latency_max'], latency)
+        stats['wire_bytes'] += wire_bytes
+        stats['body_bytes'] += body_bytes
+        if error:
+            stats['errors'] += 1
+
+def http_get(url, headers=None, timeout=None, **kwargs):
+    """درخواست GET از طریق کلاینت مشترک
+
+    پاسخ با encoding=utf-8 برگردانده می‌شود (مثل همه scraperهای پروژه).
+    خطاهای شبکه مثل requests.get بالا داده می‌شوند. اگر مدار سایت باز باشد
+    بدون ارسال درخواست CircuitOpenError بالا داده می‌شود.
+    """
+    host = urlparse(url).netloc.lower()
+    timeout = timeout or (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    user_agent = _host_user_agents.get(_base_domain(host))
+    if user_agent:
+        headers = dict(headers or {})
+        headers.setdefault('User-Agent', user_agent)
+    if http_replay.is_replaying():
+        # پخش پاسخ ضبط شده بدون شبکه (و بدون محدودیت نرخ سایت)
+        start = time.monotonic()
+        response = http_replay.replay_response(url)
+        _record(host, time.monotonic() - start, len(response.content), len(response.content), error=response.status_code >= 400)
+        return response
+    if http_replay.is_recording() and headers:
+        # پاسخ کامل ضبط می‌شود نه 304
+        headers = {k: v for k, v in headers.items() if k not in ('If-None-Match', 'If-Modified-Since')}
+    acquire(host)
+    start = time.monotonic()
+    try:
+        response = get_session().get(url, headers=headers, timeout=timeout, **kwargs)
+        body = response.content  # دریافت و باز کردن فشرده‌سازی به صورت جریانی
+    except Exception:
+        _record(host, time.monotonic() - start, 0, 0, error=True)
+        record_result(host)
+        raise
+    record_result(host, response.status_code, parse_retry_after(response.headers.get('Retry-After')))
+    try:
+        wire_bytes = response.raw.tell()  # حجم واقعی دریافتی (قبل از باز کردن فشرده‌سازی)
+    except Exception:
+        wire_bytes = len(body)
+    _record(host, time.monotonic() - start, wire_bytes, len(body), error=response.status_code >= 400)
+    response.encoding = 'utf-8'
+    if http_replay.is_recording():
+        http_replay.record_response(url, response)
+    return response
+
+def get_host_stats():
+    """آمار تجمعی درخواست‌ها به تفکیک سایت"""
+    with _stats_lock:
+        result = {}
+        for host, stats in _host_stats.items():
+            item = dict(stats)
+            item['latency_avg'] = stats['latency_total'] / stats['requests'] if stats['requests'] else 0.0
+            result[host] = item
+        return result
+
+def reset_host_stats():
+    with _stats_lock:
+        _host_stats.clear()
+
+def print_host_stats():
+    guard_states = get_host_guard_states()
+    for host, stats in sorted(get_host_stats().items()):
+        print(
+            f"  🌐 {host}: {stats['requests']} درخواست، {stats['errors']} خطا، "
+            f"میانگین {stats['latency_avg']:.2f} ثانیه، "
+            f"{stats['wire_bytes'] / 1024:.0f} KB دریافتی ({stats['body_bytes'] / 1024:.0f} KB پس از باز کردن فشرده‌سازی)"
+        )
+        guard = guard_states.get(host)
+        if guard and (guard['state'] != 'closed' or guard['rejected']):
+            print(
+                f"     ⛔ مدار {guard['state']}، {guard['rejected']} درخواست رد شده، "
+                f"{guard['retry_in']:.0f} ثانیه تا تلاش بعدی"
+            )
@@ -0,0 +1,128 @@
+import os
+import json
+import gzip
+import atexit
+import base64
+import threading
+from contextlib import contextmanager
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# ضبط و پخش دوباره پاسخ‌های HTTP و صفحه‌های مرورگر برای تست و benchmark بدون اینترنت
+# در حالت record پاسخ‌های واقعی http_get و page_source مرورگر در یک فایل آرشیو (JSON فشرده)
+# ذخیره می‌شوند؛ در حالت replay همان پاسخ‌ها بدون شبکه و بدون Chrome برگردانده می‌شوند
+#
+#   HTTP_REPLAY_MODE=record HTTP_REPLAY_ARCHIVE=fixtures/all.json.gz python test_fetch.py
+#   HTTP_REPLAY_MODE=replay HTTP_REPLAY_ARCHIVE=fixtures/all.json.gz python test_fetch.py
+
+# off / record / replay
+HTTP_REPLAY_MODE = os.getenv('HTTP_REPLAY_MODE', 'off')
+HTTP_REPLAY_ARCHIVE = os.getenv('HTTP_REPLAY_ARCHIVE', os.path.join('fixtures', 'http_replay.json.gz'))
+
+# هدرهایی که با بدنه باز شده (بدون فشرده‌سازی) دیگر درست نیستند
+_SKIPPED_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length', 'set-cookie'}
+
+class ReplayMissError(requests.ConnectionError):
+    """پاسخی برای این آدرس در آرشیو ضبط نشده است (در replay مثل خطای شبکه رفتار می‌کند)"""
+    def __init__(self, kind, url):
+        super().__init__(f"پاسخ {kind} برای {url} در آرشیو replay نیست")
+        self.url = url
+
+class Cassette:
+    """آرشیو پاسخ‌های ضبط شده؛ از هر آدرس آخرین پاسخ نگه داشته می‌شود"""
+
+    def __init__(self, path, mode):
+        self.path = path
+        self.mode = mode
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        if os.path.exists(path):
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                self.entries = json.load(f).get('entries', {})
+        elif mode == 'replay':
+            raise FileNotFoundError(f"آرشیو replay پیدا نشد: {path}")
+
+    def get(self, kind, url):
+        with self._lock:
+            entry = self.entries.get(f'{kind} {url}')
+        if entry is None:
+            raise ReplayMissError(kind, url)
+        return entry
+
+    def put(self, kind, url, entry):
+        with self._lock:
+            self.entries[f'{kind} {url}'] = entry
+            self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f'{self.path}.tmp'
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump({'version': 1, 'entries': self.entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        print(f"📼 {len(self.entries)} پاسخ در {self.path} ذخیره شد")
+
+_cassette = None
+
+def active_cassette():
+    """آرشیو فعال (یا None اگر record/replay خاموش است)"""
+    return _cassette
+
+@contextmanager
+def use_cassette(path, mode='replay'):
+    """فعال کردن record یا replay برای بخشی از کد (مثلاً یک تست)"""
+    global _cassette
+    previous = _cassette
+    _cassette = Cassette(path, mode)
+    try:
+        yield _cassette
+    finally:
+        if _cassette.mode == 'record':
+            _cassette.save()
+        _cassette = previous
+
+def is_replaying():
+    return _cassette is not None and _cassette.mode == 'replay'
+
+def is_recording():
+    return _cassette is not None and _cassette.mode == 'record'
+
+def record_response(url, response):
+    """ضبط پاسخ requests (بدنه پس از باز کردن فشرده‌سازی)"""
+    _cassette.put('http', url, {
+        'status': response.status_code,
+        'headers': {k: v for k, v in response.headers.items() if k.lower() not in _SKIPPED_HEADERS},
+        'body': base64.b64encode(response.content).decode('ascii'),
+        'url': response.url,
+    })
+
+def replay_response(url):
+    """ساخت requests.Response از پاسخ ضبط شده"""
+    entry = _cassette.get('http', url)
+    response = requests.Response()
+    response.status_code = entry['status']
+    response.headers = CaseInsensitiveDict(entry['headers'])
+    response._content = base64.b64decode(entry['body'])
+    response.url = entry.get('url', url)
+    response.encoding = 'utf-8'
+    return response
+
+def record_page(url, page_source):
+    """ضبط HTML نهایی صفحه‌ای که با مرورگر باز شده است"""
+    _cassette.put('browser', url, {'page_source': page_source})
+
+def replay_page(url):
+    return _cassette.get('browser', url)['page_source']
+
+if HTTP_REPLAY_MODE in ('record', 'replay'):
+    _cassette = Cassette(HTTP_REPLAY_ARCHIVE, HTTP_REPLAY_MODE)
+    if HTTP_REPLAY_MODE == 'record':
+        atexit.register(_cassette.save)
+    print(f"📼 HTTP {HTTP_REPLAY_MODE}: {HTTP_REPLAY_ARCHIVE}")
@@ -0,0 +1,406 @@
+import os
+import time
+import queue
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from news_sources import SOURCES
+from news_fetcher import AGENCY_FETCHERS, filter_known_items, save_news
+from news_orchestrator import FETCH_MAX_WORKERS, FETCH_AGENCY_TIMEOUT, agency_lock
+from extraction_pool import EXTRACT_MAX_WORKERS, host_slot
+from http_cache import NotModified, remember_validators
+from host_guard import CircuitOpenError
+from scraper_engine import discover_items, extract_item, build_news, make_news
+from fetch_journal import resume_items, mark_extracted, mark_summarized, prune_journal
+from snapshot_store import SNAPSHOT_ENABLED, prune_snapshots
+from summary_cache import prune_summary_cache
+from summarizer_service import SUMMARY_CONCURRENCY
+
+# خط لوله دریافت اخبار: کشف ← استخراج ← خلاصه‌سازی ← ذخیره
+# مراحل با صف‌های محدود به هم وصل هستند؛ اگر مرحله‌ای عقب بماند مرحله قبل منتظر می‌ماند
+# و هر خبر بلافاصله پس از خلاصه‌سازی در دسته‌های کوچک ذخیره می‌شود (نه در پایان کار خبرگزاری)
+
+# ظرفیت هر صف بین مراحل
+INGEST_QUEUE_SIZE = int(os.getenv('INGEST_QUEUE_SIZE', '20'))
+INGEST_EXTRACT_WORKERS = int(os.getenv('INGEST_EXTRACT_WORKERS', str(EXTRACT_MAX_WORKERS)))
+# به اندازه ظرفیت هم‌زمان سرویس خلاصه‌سازی تا درخواست‌های LLM پشت سر هم منتظر نمانند
+INGEST_SUMMARIZE_WORKERS = int(os.getenv('INGEST_SUMMARIZE_WORKERS', str(SUMMARY_CONCURRENCY)))
+# حداکثر تعداد خبر هر commit و حداکثر زمان انتظار برای پر شدن دسته (ثانیه)
+INGEST_SAVE_BATCH = int(os.getenv('INGEST_SAVE_BATCH', '5'))
+INGEST_SAVE_INTERVAL = float(os.getenv('INGEST_SAVE_INTERVAL', '2'))
+# پاک‌سازی ژورنال، کش خلاصه و snapshotها حداکثر یک بار در این فاصله (ساعت)، نه در هر نوبت زمان‌بند
+INGEST_PRUNE_INTERVAL_HOURS = float(os.getenv('INGEST_PRUNE_INTERVAL_HOURS', '24'))
+INGEST_PRUNE_MARKER = os.getenv(
+    'INGEST_PRUNE_MARKER',
+    os.path.join(tempfile.gettempdir(), 'panel_rasad_prune.marker')
+)
+
+_STOP = object()
+# فاصله بررسی مهلت خبرگزاری هنگام انتظار برای صف پر (ثانیه)
+_PUT_POLL = 0.5
+
+class _AgencyRun:
+    """وضعیت دریافت یک خبرگزاری در خط لوله"""
+
+    def __init__(self, name, timeout):
+        self.name = name
+        self.source = SOURCES.get(name)
+        self.timeout = timeout
+        self.started = None
+        self.status = None
+        self.error = None
+        self.count = 0
+        self.elapsed = 0.0
+        self.response = None
+        self.lock = agency_lock(name)
+        self.finished = threading.Event()
+        self._pending = 0
+        self._discovering = True
+        self._abandoned = False
+        self._released = False
+        self._state_lock = threading.Lock()
+        self._failed_items = 0
+
+    def expired(self):
+        return self.started is not None and time.monotonic() - self.started >= self.timeout
+
+    def cancelled(self):
+        """مهلت تمام شده یا نتیجه پیش از اتمام گزارش شده است؛ خبرهای باقی‌مانده پردازش نمی‌شوند"""
+        return self._abandoned or self.expired()
+
+    def add_pending(self, n):
+        with self._state_lock:
+            self._pending += n
+
+    def item_done(self, saved=0, failed=False):
+        with self._state_lock:
+            self._pending -= 1
+            self.count += saved
+            if failed:
+                self._failed_items += 1
+        self._maybe_finish()
+
+    def discovery_done(self, error=None):
+        if error is not None:
+            self.error = error
+        with self._state_lock:
+            self._discovering = False
+        self._maybe_finish()
+
+    def release_lock(self):
+        """آزاد کردن قفل خبرگزاری (فقط یک بار و فقط اگر کشف آن را گرفته باشد)"""
+        with self._state_lock:
+            if self.started is None or self._released:
+                return
+            self._released = True
+        self.lock.release()
+
+    def abandon(self):
+        """گزارش پیش از اتمام (مهلت): قفل بدون انتظار برای خبرهای باقی‌مانده در صف‌ها آزاد می‌شود"""
+        with self._state_lock:
+            self._abandoned = True
+            discovering = self._discovering
+        # اگر کشف هنوز ادامه دارد، finally مرحله کشف قفل را آزاد می‌کند
+        if not discovering:
+            self.release_lock()
+
+    def discovery_ended(self):
+        """پایان مرحله کشف؛ اگر مهلت تمام شده خبرهای صف پردازش نمی‌شوند و قفل همین‌جا آزاد می‌شود"""
+        with self._state_lock:
+            abandoned = self._abandoned
+        if abandoned or self.expired():
+            self.release_lock()
+
+    def _maybe_finish(self):
+        with self._state_lock:
+            if self._discovering or self._pending > 0 or self.finished.is_set():
+                return
+            self.finished.set()
+        self.elapsed = time.monotonic() - self.started if self.started else 0.0
+        if self.error:
+            self.status = 'error'
+        elif self.expired():
+            self.status = 'timeout'
+            self.error = f'مهلت {self.timeout:.0f} ثانیه‌ای تمام شد'
+        else:
+            self.status = 'ok'
+            if self.response is not None and not self._failed_items:
+                # همه خبرهای فهرست پردازش شدند؛ دفعه بعد درخواست شرطی ارسال می‌شود
+                remember_validators(self.response)
+        self.release_lock()
+
+    def result(self):
+        status = self.status or 'timeout'
+        error = self.error if self.status else f'مهلت {self.timeout:.0f} ثانیه‌ای تمام شد'
+        elapsed = self.elapsed if self.status else (time.monotonic() - self.started if self.started else 0.0)
+        return {'agency': self.name, 'status': status, 'news': [], 'count': self.count, 'error': error, 'elapsed': elapsed}
+
+_prune_lock = threading.Lock()
+
+def prune_if_due(force=False):
+    """پاک‌سازی‌های دوره‌ای اگر از آخرین اجرا (زمان تغییر فایل INGEST_PRUNE_MARKER) گذشته باشد"""
+    with _prune_lock:
+        if not force:
+            try:
+                if time.time() - os.path.getmtime(INGEST_PRUNE_MARKER) < INGEST_PRUNE_INTERVAL_HOURS * 3600:
+                    return False
+            except OSError:
+                pass
+        try:
+            with open(INGEST_PRUNE_MARKER, 'w'):
+                pass
+        except OSError as e:
+            print(f"خطا در ثبت زمان پاک‌سازی: {e}")
+    prune_journal()
+    prune_summary_cache()
+    if SNAPSHOT_ENABLED:
+        prune_snapshots()
+    return True
+
+class IngestPipeline:
+    """اجرای مراحل خط لوله با threadهای جداگانه برای هر مرحله"""
+
+    def __init__(self, extract_workers=None, summarize_workers=None, queue_size=None):
+        queue_size = queue_size or INGEST_QUEUE_SIZE
+        self.extract_queue = queue.Queue(maxsize=queue_size)
+        self.summarize_queue = queue.Queue(maxsize=queue_size)
+        self.save_queue = queue.Queue(maxsize=queue_size)
+        self.extract_workers = extract_workers or INGEST_EXTRACT_WORKERS
+        self.summarize_workers = summarize_workers or INGEST_SUMMARIZE_WORKERS
+        self.threads = []
+        self._threads_lock = threading.Lock()
+
+    def start(self):
+        """شروع threadهای مراحل (یک بار؛ در اجراهای بعدی همان threadها استفاده می‌شوند)"""
+        with self._threads_lock:
+            if self.threads:
+                return
+            stages = (
+                (self._extract_loop, 'ingest-extract', self.extract_workers),
+                (self._summarize_loop, 'ingest-summarize', self.summarize_workers),
+                (self._save_loop, 'ingest-save', 1),
+            )
+            for target, name, count in stages:
+                for _ in range(count):
+                    thread = threading.Thread(target=target, name=name, daemon=True)
+                    thread.start()
+                    self.threads.append(thread)
+
+    def stop(self):
+        """پایان threadهای مراحل؛ کارهای در جریان ادامه پیدا می‌کنند ولی منتظر آن‌ها نمی‌مانیم"""
+        with self._threads_lock:
+            counts = (self.extract_workers, self.summarize_workers, 1)
+            for stage_queue, count in zip((self.extract_queue, self.summarize_queue, self.save_queue), counts):
+                for _ in range(count):
+                    try:
+                        stage_queue.put(_STOP, timeout=INGEST_SAVE_INTERVAL)
+                    except queue.Full:
+                        break
+            for thread in self.threads:
+                thread.join(timeout=INGEST_SAVE_INTERVAL)
+            self.threads = []
+
+    def _put(self, stage_queue, run, task):
+        """قرار دادن کار در صف (backpressure)؛ False اگر مهلت خبرگزاری در حین انتظار تمام شود"""
+        while not run.cancelled():
+            try:
+                stage_queue.put(task, timeout=_PUT_POLL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    # --- مرحله کشف ---
+    def discover(self, run):
+        if not run.lock.acquire(blocking=False):
+            run.discovery_done(error='دریافت قبلی این خبرگزاری هنوز در حال اجراست')
+            return
+        run.started = time.monotonic()
+        try:
+            if run.source is None:
+                # fetcher قدیمی بدون تعریف در news_sources: خروجی آن مستقیم ذخیره می‌شود
+                news_list = AGENCY_FETCHERS[run.name]()
+                run.add_pending(len(news_list))
+                for news in news_list:
+                    if not self._put(self.save_queue, run, (run, news)):
+                        run.abandon()
+                        break
+                run.discovery_done()
+                return
+
+            items, run.response = discover_items(run.source)
+            print(f"تعداد آیتم‌های یافت شده در {run.name}: {len(items)}")
+            # حذف خبرهای ذخیره شده (تا در ژورنال ثبت نشوند) و اضافه شدن خبرهای نیمه‌کاره اجرای قبلی
+            items = resume_items(run.name, filter_known_items(items, run.name))
+            print(f"تعداد کل اخبار {run.name}: {len(items)}")
+            run.add_pending(len(items))
+            for item in items:
+                # ادامه از آخرین مرحله ثبت شده در ژورنال؛ اگر صف پر باشد همین‌جا منتظر می‌ماند (backpressure)
+                checkpoint = item.get('checkpoint') or {}
+                if checkpoint.get('stage') == 'summarized' and checkpoint.get('news'):
+                    queued = self._put(self.save_queue, run, (run, checkpoint['news']))
+                elif checkpoint.get('stage') == 'extracted':
+                    queued = self._put(self.summarize_queue, run, (run, item, checkpoint['article']))
+                else:
+                    queued = self._put(self.extract_queue, run, (run, item))
+                if not queued:
+                    # بقیه خبرها در ژورنال می‌مانند و در اجرای بعدی ادامه داده می‌شوند
+                    print(f"⏱️ مهلت {run.name} در انتظار صف تمام شد؛ بقیه خبرها در دریافت بعدی ادامه داده می‌شوند")
+                    run.abandon()
+                    break
+            run.discovery_done()
+        except NotModified:
+            print(f"صفحه اخبار {run.name} تغییری نکرده است (304)، پردازش رد شد")
+            run.discovery_done()
+        except CircuitOpenError as e:
+            print(f"⛔ دریافت اخبار {run.name} رد شد: {e}")
+            run.discovery_done()
+        except Exception as e:
+            print(f"خطا در دریافت اخبار {run.name}: {e}")
+            run.discovery_done(error=str(e))
+        finally:
+            run.discovery_ended()
+
+    # --- مرحله استخراج ---
+    def _extract_loop(self):
+        while True:
+            task = self.extract_queue.get()
+            if task is _STOP:
+                return
+            run, item = task
+            if run.cancelled():
+                run.item_done()
+                continue
+            try:
+                with host_slot(item['url']):
+                    article = extract_item(run.source, item)
+            except CircuitOpenError as e:
+                # ذخیره نمی‌شود تا در دریافت بعدی دوباره تلاش شود
+                print(f"خبر {run.name} رد شد: {e}")
+                run.item_done(failed=True)
+                continue
+            except Exception as e:
+                print(f"خطا در استخراج محتوای {run.name}: {e}")
+                if not self._put(self.save_queue, run, (run, make_news(run.source, item, item['title'], ''))):
+                    run.item_done()
+                continue
+            mark_extracted(item, article)
+            if not self._put(self.summarize_queue, run, (run, item, article)):
+                run.item_done()
+
+    # --- مرحله خلاصه‌سازی ---
+    def _summarize_loop(self):
+        while True:
+            task = self.summarize_queue.get()
+            if task is _STOP:
+                return
+            run, item, article = task
+            if run.cancelled():
+                run.item_done()
+                continue
+            try:
+                news = build_news(run.source, item, article)
+            except CircuitOpenError as e:
+                print(f"خبر {run.name} رد شد: {e}")
+                run.item_done(failed=True)
+                continue
+            except Exception as e:
+                # thread این مرحله بین اجراها مشترک است و نباید با خطای یک خبر متوقف شود
+                print(f"خطا در خلاصه‌سازی خبر {run.name}: {e}")
+                run.item_done(failed=True)
+                continue
+            mark_summarized(item, news)
+            if not self._put(self.save_queue, run, (run, news)):
+                run.item_done()
+
+    # --- مرحله ذخیره ---
+    def _save_loop(self):
+        batch = []
+        stopping = False
+        while not stopping:
+            deadline = time.monotonic() + INGEST_SAVE_INTERVAL
+            while len(batch) < INGEST_SAVE_BATCH:
+                try:
+                    task = self.save_queue.get(timeout=max(deadline - time.monotonic(), 0.01))
+                except queue.Empty:
+                    break
+                if task is _STOP:
+                    stopping = True
+                    break
+                batch.append(task)
+            if batch:
+                self._save_batch(batch)
+                batch = []
+
+    def _save_batch(self, batch):
+        try:
+            save_news([news for _, news in batch])
+        except Exception as e:
+            print(f"خطا در ذخیره دسته اخبار: {e}")
+        for run, _ in batch:
+            run.item_done(saved=1)
+
+    def run(self, agencies, max_workers=None, timeout=None, on_result=None, prune=True):
+        """اجرای خط لوله برای خبرگزاری‌ها و برگرداندن نتیجه هر کدام
+
+        با prune=False (پروسه‌های worker) پاک‌سازی ژورنال، کش خلاصه و snapshotها به پروسه اصلی واگذار می‌شود.
+        """
+        if prune:
+            prune_if_due()
+        timeout = timeout or FETCH_AGENCY_TIMEOUT
+        max_workers = max_workers or FETCH_MAX_WORKERS
+        runs = [_AgencyRun(name, timeout) for name in agencies if name in AGENCY_FETCHERS]
+        results = []
+        for name in agencies:
+            if name not in AGENCY_FETCHERS:
+                result = {'agency': name, 'status': 'error', 'news': [], 'count': 0, 'error': 'خبرگزاری ناشناخته', 'elapsed': 0.0}
+                results.append(result)
+                if on_result:
+                    on_result(result)
+
+        self.start()
+
+        # گزارش هر خبرگزاری به محض اتمام آن
+        reported = set()
+        def report(run):
+            if run.name not in reported:
+                reported.add(run.name)
+                result = run.result()
+                results.append(result)
+                if on_result:
+                    on_result(result)
+
+        discovery = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ingest-discover')
+        try:
+            for run in runs:
+                discovery.submit(self.discover, run)
+            # سقف کلی مثل news_orchestrator برای خبرگزاری‌هایی که دیر شروع می‌شوند
+            waves = -(-len(runs) // max_workers) if runs else 0
+            overall_deadline = time.monotonic() + timeout * waves + INGEST_SAVE_INTERVAL
+            while len(reported) < len(runs):
+                for run in runs:
+                    if run.finished.is_set():
+                        report(run)
+                    elif run.expired() or time.monotonic() >= overall_deadline:
+                        # خبرهای باقی‌مانده در صف‌ها رد می‌شوند؛ منتظر کارهای گیر کرده نمی‌مانیم
+                        report(run)
+                        run.abandon()
+                time.sleep(0.1)
+        finally:
+            discovery.shutdown(wait=False, cancel_futures=True)
+            # قفل خبرگزاری‌ها مستقل از تخلیه صف‌ها آزاد می‌شود
+            # threadهای مراحل برای اجرای بعدی باقی می‌مانند و خبرهای رد شده را سریع از صف خارج می‌کنند
+            for run in runs:
+                run.abandon()
+        return results
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+def get_ingest_pipeline():
+    """خط لوله مشترک (threadهای مراحل یک بار ساخته می‌شوند و بین دریافت‌ها مشترک هستند)"""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = IngestPipeline()
+        return _pipeline
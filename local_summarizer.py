@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+خلاصه‌ساز محلی استخراجی برای متن فارسی (TextRank / LexRank با NumPy)
+جمله‌ها جدا می‌شوند، ماتریس شباهت کسینوسی بردارهای TF-IDF جمله‌ها ساخته می‌شود و
+جمله‌های مهم با PageRank (با وزن بیشتر برای جمله‌های ابتدای خبر) انتخاب می‌شوند.
+بدون شبکه و بدون هزینه API؛ با SUMMARY_ENGINE=textrank جایگزین LLM می‌شود و در حالت llm
+وقتی API در دسترس نیست به جای بریدن 500 کاراکتر اول استفاده می‌شود.
+
+اجرا (benchmark روی اخبار ذخیره شده):
+    python local_summarizer.py [--limit 500]
+"""
+
+import os
+import re
+import sys
+import time
+import numpy as np
+
+# تعداد جمله‌های خلاصه و سقف طول آن (کاراکتر)
+LOCAL_SUMMARY_SENTENCES = int(os.getenv('LOCAL_SUMMARY_SENTENCES', '3'))
+LOCAL_SUMMARY_MAX_CHARS = int(os.getenv('LOCAL_SUMMARY_MAX_CHARS', '600'))
+# ضریب میرایی PageRank و وزن موقعیت جمله (0 یعنی TextRank بدون ترجیح جمله‌های اول)
+TEXTRANK_DAMPING = 0.85
+TEXTRANK_LEAD_WEIGHT = float(os.getenv('TEXTRANK_LEAD_WEIGHT', '0.5'))
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?؟!])\s+|\n+')
+_WORD = re.compile(r'\w+')
+
+# کلمات پرتکرار فارسی که در شباهت جمله‌ها اثری ندارند
+_STOPWORDS = frozenset("""
+و در به از که این آن با را برای تا بر هم یا اما نیز شد شده شود می است بود هست
+های ها یک دو خود او ما شما آنها ایشان کرد کرده کند کنند کنید گفت گفته داد داده دارد
+باید نیست بین پس پیش روی زیر طی همه هر چه چون اگر وی آن‌ها این‌ها اند ای
+""".split())
+
+def split_sentences(text):
+    """جدا کردن جمله‌های متن (نقطه، علامت سؤال/تعجب فارسی و لاتین و خط جدید)"""
+    sentences = [s.strip() for s in _SENTENCE_SPLIT.split(text or '')]
+    return [s for s in sentences if len(s) > 10]
+
+def _tokens(sentence):
+    sentence = sentence.replace('ي', 'ی').replace('ك', 'ک').replace('‌', ' ')
+    return [w for w in _WORD.findall(sentence.lower()) if len(w) > 1 and w not in _STOPWORDS and not w.isdigit()]
+
+def similarity_matrix(sentences):
+    """ماتریس شباهت کسینوسی بردارهای TF-IDF جمله‌ها (قطر صفر)"""
+    tokenized = [_tokens(s) for s in sentences]
+    vocabulary = {}
+    rows, cols = [], []
+    for i, words in enumerate(tokenized):
+        for word in words:
+            rows.append(i)
+            cols.append(vocabulary.setdefault(word, len(vocabulary)))
+    matrix = np.zeros((len(sentences), max(len(vocabulary), 1)))
+    if rows:
+        np.add.at(matrix, (np.array(rows), np.array(cols)), 1.0)
+    document_frequency = np.count_nonzero(matrix, axis=0)
+    idf = np.log((1 + len(sentences)) / (1 + document_frequency)) + 1.0
+    matrix *= idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms == 0, 1.0, norms)
+    similarity = matrix @ matrix.T
+    np.fill_diagonal(similarity, 0.0)
+    return similarity
+
+def rank_sentences(similarity, lead_weight=None, iterations=50, tolerance=1e-6):
+    """امتیاز PageRank جمله‌ها روی گراف شباهت"""
+    lead_weight = TEXTRANK_LEAD_WEIGHT if lead_weight is None else lead_weight
+    n = similarity.shape[0]
+    # توزیع پرش تصادفی: ترکیب یکنواخت و ترجیح جمله‌های اول خبر (لید)
+    position = 1.0 / np.arange(1, n + 1)
+    personalization = (1 - lead_weight) / n + lead_weight * position / position.sum()
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    # جمله بدون شباهت به بقیه مثل پرش تصادفی رفتار می‌کند
+    transition = np.where(row_sums > 0, similarity / np.where(row_sums == 0, 1.0, row_sums), personalization)
+    scores = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        updated = (1 - TEXTRANK_DAMPING) * personalization + TEXTRANK_DAMPING * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < tolerance:
+            return updated
+        scores = updated
+    return scores
+
+def summarize_text(text, max_sentences=None, max_chars=None):
+    """خلاصه استخراجی: جمله‌های با بیشترین امتیاز به ترتیب متن اصلی"""
+    max_sentences = max_sentences or LOCAL_SUMMARY_SENTENCES
+    max_chars = max_chars or LOCAL_SUMMARY_MAX_CHARS
+    sentences = split_sentences(text)
+    if len(sentences) <= max_sentences:
+        summary = ' '.join(sentences) if sentences else (text or '').strip()
+        return summary[:max_chars] + "..." if len(summary) > max_chars else summary
+
+    scores = rank_sentences(similarity_matrix(sentences))
+    chosen = []
+    length = 0
+    for index in np.argsort(-scores, kind='stable'):
+        sentence = sentences[index]
+        if chosen and length + len(sentence) > max_chars:
+            continue
+        chosen.append(index)
+        length += len(sentence) + 1
+        if len(chosen) >= max_sentences:
+            break
+    summary = ' '.join(sentences[i] for i in sorted(chosen))
+    return summary[:max_chars] + "..." if len(summary) > max_chars else summary
+
+def main():
+    from database import SessionLocal, News
+    args = sys.argv[1:]
+    limit = int(args[args.index('--limit') + 1]) if '--limit' in args else 500
+    db = SessionLocal()
+    try:
+        texts = [summary for (summary,) in db.query(News.summary).order_by(News.id.desc()).limit(limit) if summary]
+    finally:
+        db.close()
+    if not texts:
+        print("خبری برای benchmark پیدا نشد")
+        return
+    start = time.perf_counter()
+    for text in texts:
+        summarize_text(text)
+    elapsed = time.perf_counter() - start
+    print(
+        f"✅ {len(texts)} متن (میانگین {sum(map(len, texts)) / len(texts):.0f} کاراکتر) در {elapsed:.2f} ثانیه، "
+        f"{elapsed / len(texts) * 1000:.2f} ms برای هر خبر"
+    )
+
+if __name__ == "__main__":
+    main()
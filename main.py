@@ -5,7 +5,11 @@ from fastapi.staticfiles import StaticFiles
 import uvicorn
 from database import SessionLocal, News, TelegramMessage, DailyMessage
 from datetime import datetime
-from news_fetcher import fetch_irna_top_news, save_news, fetch_bbc_persian_news, fetch_iranintl_news, fetch_isna_news
+from news_orchestrator import fetch_all_news
+from scheduler import start_scheduler, stop_scheduler, get_scheduler_status
+from summary_cache import get_summary_cache_stats
+from token_budget import get_token_usage
+from summary_queue import start_summary_workers, stop_summary_workers, get_summary_queue_status
 from dateutil import parser as date_parser
 import jdatetime
 from fastapi.responses import FileResponse, StreamingResponse
@@ -36,6 +40,18 @@ def save_filters(filters):
 
 app = FastAPI()
 
+@app.on_event('startup')
+def start_background_fetch():
+    # دریافت خودکار اخبار در پس‌زمینه (با چند worker فقط یکی دریافت می‌کند)
+    start_scheduler()
+    # تولید خلاصه LLM خبرهای ذخیره شده با خلاصه موقت
+    start_summary_workers()
+
+@app.on_event('shutdown')
+def stop_background_fetch():
+    stop_scheduler()
+    stop_summary_workers()
+
 app.mount('/static', StaticFiles(directory='static'), name='static')
 templates = Jinja2Templates(directory='templates')
 
@@ -210,19 +226,38 @@ def highlights_page(request: Request, filter: str = Query(None), repeated: bool
 def fetch_news_endpoint():
     """API endpoint برای دریافت اخبار جدید"""
     try:
-        irna_news = fetch_irna_top_news()
-        bbc_news = fetch_bbc_persian_news()
-        iranintl_news = fetch_iranintl_news()
-        isna_news = fetch_isna_news()
-        save_news(irna_news)
-        save_news(bbc_news)
-        save_news(iranintl_news)
-        save_news(isna_news)
-        total_count = len(irna_news) + len(bbc_news) + len(iranintl_news) + len(isna_news)
-        return {"message": "اخبار با موفقیت دریافت و ذخیره شد", "count": total_count}
+        result = fetch_all_news()
+        if result['agencies'] and len(result['failed']) == len(result['agencies']):
+            return {"error": "دریافت اخبار از همه خبرگزاری‌ها ناموفق بود", "agencies": result['agencies']}
+        return {
+            "message": "اخبار با موفقیت دریافت و ذخیره شد",
+            "count": result['count'],
+            "agencies": result['agencies'],
+            "failed": result['failed']
+        }
     except Exception as e:
         return {"error": f"خطا در دریافت اخبار: {str(e)}"}
 
+@app.get('/scheduler-status')
+def scheduler_status_endpoint():
+    """وضعیت زمان‌بند دریافت خودکار اخبار"""
+    return get_scheduler_status()
+
+@app.get('/summary-cache-stats')
+def summary_cache_stats_endpoint():
+    """آمار hit/miss کش خلاصه‌های LLM"""
+    return get_summary_cache_stats()
+
+@app.get('/summary-queue-status')
+def summary_queue_status_endpoint():
+    """وضعیت صف خلاصه‌سازی LLM"""
+    return get_summary_queue_status()
+
+@app.get('/llm-usage')
+def llm_usage_endpoint(days: int = 1):
+    """مصرف توکن ورودی و خروجی خلاصه‌سازی LLM"""
+    return get_token_usage(days)
+
 @app.get('/download-news-pdf')
 def download_news_pdf(day: str):
     """دانلود PDF اخبار یک روز خاص"""
@@ -630,10 +665,9 @@ if __name__ == "__main__":
     print("شروع سرور...")
     print("در حال دریافت اخبار جدید...")
     try:
-        # دریافت اخبار جدید در ابتدای اجرا
-        isna_news = fetch_irna_top_news()
-        save_news(isna_news)
-        print(f"تعداد {len(isna_news)} خبر جدید دریافت شد.")
+        # دریافت اخبار جدید ایرنا در ابتدای اجرا (با همان مسیر /fetch-news و قفل خبرگزاری)
+        result = fetch_all_news(agencies=['IRNA'])
+        print(f"تعداد {result['count']} خبر جدید دریافت شد.")
     except Exception as e:
         print(f"خطا در دریافت اخبار: {e}")
     
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+سرور آزمایشی محلی سازگار با OpenAI chat/completions برای تست و benchmark خلاصه‌سازی بدون اینترنت
+هر پاسخ پس از تأخیر latency برگردانده می‌شود و اگر rpm تعیین شده باشد، درخواست‌های بیش از آن
+با 429 و هدر Retry-After رد می‌شوند.
+
+اجرا:
+    python mock_llm_server.py [--port 8765] [--latency 1.0] [--rpm 0]
+    OPENAI_API_BASE=http://127.0.0.1:8765/v1 python news_fetcher.py
+"""
+
+import sys
+import json
+import time
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if server.rpm:
+            with server.lock:
+                now = time.monotonic()
+                while server.recent and now - server.recent[0] >= 60:
+                    server.recent.popleft()
+                limited = len(server.recent) >= server.rpm
+                if limited:
+                    retry_after = 60 - (now - server.recent[0])
+                else:
+                    server.recent.append(now)
+            if limited:
+                server.rejected += 1
+                self._reply(429, {'error': {'message': 'Rate limit reached'}}, {'Retry-After': f'{retry_after:.0f}'})
+                return
+
+        time.sleep(server.latency)
+        prompt = ' '.join(message.get('content', '') for message in body.get('messages', []))
+        # خلاصه ساختگی: اولین خط غیرخالی متن خبر
+        lines = [line.strip() for line in prompt.split('متن کامل خبر:')[-1].splitlines() if line.strip()]
+        summary = f"خلاصه آزمایشی: {lines[0][:200] if lines else ''}"
+        prompt_tokens = len(prompt) // 3 + 1
+        completion_tokens = len(summary) // 3 + 1
+        with server.lock:
+            server.served += 1
+        self._reply(200, {
+            'id': f'mock-{server.served}',
+            'object': 'chat.completion',
+            'model': body.get('model', 'mock'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': summary}, 'finish_reason': 'stop'}],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            }
+        })
+
+    def _reply(self, status, data, headers=None):
+        payload = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_mock_server(host='127.0.0.1', port=0, latency=1.0, rpm=0):
+    """اجرای سرور در thread پس‌زمینه و برگرداندن (server, api_base)"""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.rpm = rpm
+    server.recent = deque()
+    server.lock = threading.Lock()
+    server.served = 0
+    server.rejected = 0
+    threading.Thread(target=server.serve_forever, name='mock-llm', daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}/v1'
+
+def main():
+    args = sys.argv[1:]
+    options = {'port': 8765, 'latency': 1.0, 'rpm': 0}
+    for flag, cast in (('--port', int), ('--latency', float), ('--rpm', int)):
+        if flag in args:
+            options[flag[2:]] = cast(args[args.index(flag) + 1])
+    server, api_base = start_mock_server(**options)
+    print(f"🤖 سرور آزمایشی LLM روی {api_base} (تأخیر {options['latency']} ثانیه)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
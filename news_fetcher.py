@@ -1,854 +1,77 @@
-import requests
-from bs4 import BeautifulSoup
 from database import SessionLocal, News
-import datetime
-from datetime import timezone
-from dateutil import parser as date_parser
-from urllib.parse import urlparse, urlunparse
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import openai
-import os
+from sqlalchemy import or_
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+from functools import partial
+from http_client import print_host_stats
+from news_sources import SOURCES
+from summarizer_service import SUMMARY_ENGINE, OPENAI_MODEL, SUMMARY_PROMPT_VERSION, get_summary_service, truncate_summary
 import re
+import threading
 
-# تابع دریافت اخبار مهم از IRNA با خلاصه‌سازی هوشمند
+# دریافت اخبار هر خبرگزاری با موتور عمومی scraper_engine و تعریف‌های news_sources
 
-def fetch_irna_top_news():
-    """دریافت اخبار مهم از IRNA با استفاده از Selenium برای دور زدن Cloudflare"""
-    try:
-        # تنظیمات Chrome برای Selenium
-        chrome_options = Options()
-        chrome_options.add_argument('--headless')  # اجرا بدون نمایش
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
-        
-        # استفاده از ChromeDriver - نسخه جدید Selenium
-        try:
-            driver = webdriver.Chrome(options=chrome_options)
-        except:
-            # اگر ChromeDriver در PATH نباشد، از مسیر محلی استفاده کن
-            driver_path = './chromedriver.exe'
-            from selenium.webdriver.chrome.service import Service
-            service = Service(executable_path=driver_path)
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-        
-        try:
-            url = 'https://www.irna.ir/archive'
-            driver.get(url)
-            
-            # انتظار برای لود شدن صفحه
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
-            
-            # انتظار بیشتر برای Cloudflare
-            import time
-            time.sleep(8)
-            
-            # دریافت محتوای صفحه
-            page_source = driver.page_source
-            soup = BeautifulSoup(page_source, 'html.parser')
-            
-            news_list = []
-            all_news_items = []
-            
-            # انتخاب اخبار از آرشیو IRNA - همه li ها
-            news_items = soup.select('ul li')
-            
-            print(f"تعداد آیتم‌های یافت شده در آرشیو: {len(news_items)}")
-            
-            for item in news_items[:15]:  # حداکثر 15 خبر
-                try:
-                    # استخراج عنوان از h3 داخل div.desc
-                    title_elem = item.select_one('div.desc h3 a')
-                    if not title_elem:
-                        continue
-                        
-                    title = title_elem.get_text(strip=True)
-                    if not title or len(title) < 10:
-                        continue
-                    
-                    # استخراج لینک
-                    link = title_elem.get('href', '')
-                    if not link:
-                        continue
-                        
-                    if not link.startswith('http'):
-                        link = 'https://www.irna.ir' + link
-                    
-                    # استخراج توضیحات
-                    desc_elem = item.select_one('div.desc p')
-                    description = desc_elem.get_text(strip=True) if desc_elem else ""
-                    
-                    # استخراج تاریخ
-                    time_elem = item.select_one('div.desc time a')
-                    time_text = time_elem.get_text(strip=True) if time_elem else ""
-                    
-                    # حذف تکراری
-                    is_duplicate = False
-                    for existing in all_news_items:
-                        if existing['title'] == title or existing['url'] == link:
-                            is_duplicate = True
-                            break
-                    
-                    if not is_duplicate:
-                        all_news_items.append({
-                            'title': title, 
-                            'url': link, 
-                            'description': description,
-                            'time': time_text
-                        })
-                        print(f"خبر جدید یافت شد: {title[:50]}...")
-                        
-                except Exception as e:
-                    print(f"خطا در پردازش خبر IRNA: {e}")
-                    continue
-            
-            print(f"تعداد کل اخبار IRNA: {len(all_news_items)}")
-            
-            for i, news_item in enumerate(all_news_items):
-                print(f"\nپردازش خبر IRNA {i+1}/{len(all_news_items)}: {news_item['title'][:50]}...")
-                try:
-                    result = extract_irna_content_with_summary(news_item['url'], news_item['title'])
-                    title = result['title']
-                    summary = result['summary']
-                except Exception as e:
-                    print(f"خطا در استخراج محتوای IRNA: {e}")
-                    title = news_item['title']
-                    summary = ''
-                today = datetime.datetime.now(timezone.utc)
-                news_list.append({
-                    'title': title,
-                    'url': news_item['url'],
-                    'agency': 'IRNA',
-                    'published_at': today,
-                    'summary': summary
-                })
-                print(f"خبر IRNA {i+1} پردازش شد")
-            
-            print(f"\nIRNA news count: {len(news_list)}")
-            return news_list
-            
-        finally:
-            driver.quit()
-            
-    except Exception as e:
-        print(f"خطا در دریافت اخبار IRNA: {e}")
-        return []
+def fetch_source_news(name):
+    """دریافت اخبار جدید منبع name (کلید SOURCES در news_sources)"""
+    from scraper_engine import scrape_source
+    return scrape_source(name)
 
-def extract_irna_content(url):
-    """استخراج محتوای اصلی خبر از IRNA (عنوان و خلاصه)"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, timeout=10, headers=headers)
-        response.encoding = 'utf-8'
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # --- New logic for IRNA ---
-        # Extract title from <a itemprop="headline">
-        title_tag = soup.find('a', itemprop='headline')
-        if title_tag and title_tag.text.strip():
-            title = title_tag.text.strip()
-        else:
-            # fallback: try <h1 class="title"> or <title>
-            h1_title = soup.find('h1', class_='title')
-            if h1_title and h1_title.text.strip():
-                title = h1_title.text.strip()
-            else:
-                title = soup.title.text.strip() if soup.title else ''
-
-        # ابتدا تگ summary را جستجو کن
-        summary_text = ""
-        summary_tag = soup.select_one('p.summary')
-        if summary_tag:
-            summary_text = summary_tag.get_text(strip=True)
-            print(f"خلاصه IRNA یافت شد: {summary_text[:100]}...")
-        else:
-            # fallback: try other summary selectors
-            summary_selectors = [
-                'p.summary.introtext[itemprop="description"]',
-                'p.summary.introtext',
-                'div.summary p',
-                'div.intro p'
-            ]
-            for selector in summary_selectors:
-                summary_tag = soup.select_one(selector)
-                if summary_tag:
-                    summary_text = summary_tag.get_text(strip=True)
-                    print(f"خلاصه IRNA یافت شد: {summary_text[:100]}...")
-                    break
-        
-        summary = summary_text
-
-        # Extract main content as before (for ChatGPT summarization)
-        content_parts = []
-        selectors = [
-            'div.news-content p',
-            'div.news-text p',
-            'div.content p',
-            'article p'
-        ]
-        for selector in selectors:
-            paragraphs = soup.select(selector)
-            for p in paragraphs:
-                text = p.get_text(strip=True)
-                if text and len(text) > 30 and len(text) < 1000:
-                    content_parts.append(text)
-                if len(content_parts) >= 5:
-                    break
-            if len(content_parts) >= 5:
-                break
-        if content_parts:
-            full_content = ' '.join(content_parts)
-            if len(full_content) > 2000:
-                full_content = full_content[:2000] + "..."
-        else:
-            full_content = ''
-        
-        # اگر summary یافت شد، آن را به ابتدای محتوا اضافه کن
-        if summary_text:
-            full_content = f"خلاصه خبر: {summary_text}\n\nمتن کامل: {full_content}"
-
-        return {
-            'title': title,
-            'summary': summary,
-            'content': full_content
-        }
-    except Exception as e:
-        print(f"خطا در استخراج محتوای IRNA: {e}")
-        return {'title': '', 'summary': '', 'content': ''}
-
-def extract_irna_content_with_summary(url, homepage_title=None):
-    """استخراج محتوای IRNA و خلاصه از سایت"""
-    data = extract_irna_content(url)
-    title = data['title'] if data['title'] else (homepage_title or '')
-    summary = data['summary']
-    # خلاصه از سایت استخراج شده، مستقیماً استفاده کن
-    return {'title': title, 'summary': summary}
-
-# تابع دریافت اخبار BBC فارسی با خلاصه‌سازی هوشمند
+def fetch_irna_top_news():
+    """دریافت اخبار مهم از IRNA (آرشیو پشت Cloudflare)"""
+    return fetch_source_news('IRNA')
 
 def fetch_bbc_persian_news():
-    try:
-        url = 'https://www.bbc.com/persian/topics/ckdxnwvwwjnt'
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, timeout=10, headers=headers)
-        response.encoding = 'utf-8'
-        soup = BeautifulSoup(response.text, 'html.parser')
-        news_list = []
-        all_news_items = []
-        selectors = [
-            'ul[data-testid="topic-promos"] > li h2 a',
-            'article h2 a',
-            'div[data-testid="card-headline"] a'
-        ]
-        for selector in selectors:
-            for a_tag in soup.select(selector):
-                title = a_tag.get_text(strip=True)
-                if not title:
-                    continue
-                link = a_tag['href']
-                if not link.startswith('http'):
-                    link = 'https://www.bbc.com' + link
-                is_duplicate = False
-                for existing in all_news_items:
-                    if existing['title'] == title or existing['url'] == link:
-                        is_duplicate = True
-                        break
-                if not is_duplicate:
-                    all_news_items.append({'title': title, 'url': link})
-                if len(all_news_items) >= 15:
-                    break
-            if len(all_news_items) >= 15:
-                break
-        print(f"تعداد کل اخبار BBC: {len(all_news_items)}")
-        for i, news_item in enumerate(all_news_items):
-            print(f"\nپردازش خبر BBC {i+1}/{len(all_news_items)}: {news_item['title'][:50]}...")
-            summary = ""
-            try:
-                # استخراج محتوای اصلی خبر
-                summary = extract_bbc_content_with_summary(news_item['url'], news_item['title'])
-            except Exception as e:
-                print(f"خطا در استخراج محتوای BBC: {e}")
-                summary = ""
-            today = datetime.datetime.now(timezone.utc)
-            news_list.append({
-                'title': news_item['title'],
-                'url': news_item['url'],
-                'agency': 'BBC',
-                'published_at': today,
-                'summary': summary
-            })
-            print(f"خبر BBC {i+1} پردازش شد")
-        print(f"\nBBC news count: {len(news_list)}")
-        return news_list
-    except Exception as e:
-        print(f"خطا در دریافت اخبار BBC: {e}")
-        return []
-
-def extract_bbc_content(url):
-    """استخراج محتوای اصلی خبر از BBC"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, timeout=10, headers=headers)
-        response.encoding = 'utf-8'
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # استخراج محتوای اصلی با کلاس‌های مشخص شده
-        content_parts = []
-        
-        # جستجو در div با کلاس bbc-4wucq3 ebmt73l0
-        main_content_divs = soup.find_all('div', class_='bbc-4wucq3 ebmt73l0')
-        for div in main_content_divs:
-            # جستجو در p با کلاس bbc-1gjryo4 e17g058b0
-            paragraphs = div.find_all('p', class_='bbc-1gjryo4 e17g058b0')
-            for p in paragraphs:
-                text = p.get_text(strip=True)
-                if text and len(text) > 20:  # فقط متن‌های معنادار
-                    content_parts.append(text)
-        
-        # اگر محتوای اصلی پیدا نشد، از روش جایگزین استفاده کن
-        if not content_parts:
-            # جستجو در تمام p های موجود
-            paragraphs = soup.find_all('p')
-            for p in paragraphs:
-                text = p.get_text(strip=True)
-                if text and len(text) > 50 and len(text) < 1000:  # متن‌های متوسط
-                    content_parts.append(text)
-                if len(content_parts) >= 5:  # حداکثر 5 پاراگراف
-                    break
-        
-        # ترکیب محتوا
-        if content_parts:
-            full_content = ' '.join(content_parts)
-            # کوتاه کردن اگر خیلی طولانی باشد
-            if len(full_content) > 2000:
-                full_content = full_content[:2000] + "..."
-            return full_content
-        else:
-            return ""
-            
-    except Exception as e:
-        print(f"خطا در استخراج محتوای BBC: {e}")
-        return ""
-
-def extract_bbc_content_with_summary(url, title):
-    """استخراج محتوای BBC و خلاصه از سایت"""
-    content = extract_bbc_content(url)
-    if content:
-        # خلاصه از سایت استخراج شده، مستقیماً استفاده کن
-        return content
-    return ""
-
-# تابع دریافت اخبار ایران اینترنشنال با خلاصه‌سازی هوشمند
+    """دریافت اخبار BBC فارسی"""
+    return fetch_source_news('BBC')
 
 def fetch_iranintl_news():
-    try:
-        url = 'https://www.iranintl.com/iran'
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, timeout=10, headers=headers)
-        response.encoding = 'utf-8'
-        soup = BeautifulSoup(response.text, 'html.parser')
-        news_list = []
-        all_news_items = []
-        selectors = [
-            'article h3',
-            'div.TopicCluster-module-scss-module__RZ03fG__featured article h3',
-            'div.TopicCluster-module-scss-module__RZ03fG__additionalItem article h3',
-            'div.topic__grid__item article h3'
-        ]
-        for selector in selectors:
-            for title_tag in soup.select(selector):
-                if not title_tag:
-                    continue
-                title = title_tag.get_text(strip=True)
-                if not title:
-                    continue
-                article = title_tag.find_parent('article')
-                if not article:
-                    continue
-                link_tag = article.select_one('a')
-                if not link_tag:
-                    continue
-                link = link_tag['href']
-                if not link.startswith('http'):
-                    link = 'https://www.iranintl.com' + link
-                is_duplicate = False
-                for existing in all_news_items:
-                    if existing['title'] == title or existing['url'] == link:
-                        is_duplicate = True
-                        break
-                if not is_duplicate:
-                    all_news_items.append({'title': title, 'url': link})
-                if len(all_news_items) >= 15:
-                    break
-            if len(all_news_items) >= 15:
-                break
-        print(f"تعداد کل اخبار IranIntl: {len(all_news_items)}")
-        for i, news_item in enumerate(all_news_items):
-            print(f"\nپردازش خبر IranIntl {i+1}/{len(all_news_items)}: {news_item['title'][:50]}...")
-            summary = ""
-            try:
-                summary = extract_iranintl_content_with_summary(news_item['url'], news_item['title'])
-            except Exception as e:
-                print(f"خطا در استخراج محتوای IranIntl: {e}")
-                summary = ""
-            today = datetime.datetime.now(timezone.utc)
-            news_list.append({
-                'title': news_item['title'],
-                'url': news_item['url'],
-                'agency': 'IranIntl',
-                'published_at': today,
-                'summary': summary
-            })
-            print(f"خبر IranIntl {i+1} پردازش شد")
-        print(f"\nIranIntl news count: {len(news_list)}")
-        return news_list
-    except Exception as e:
-        print(f"خطا در دریافت اخبار IranIntl: {e}")
-        return []
+    """دریافت اخبار ایران اینترنشنال"""
+    return fetch_source_news('IranIntl')
 
-def extract_iranintl_content(url):
-    """استخراج محتوای اصلی خبر از IranIntl"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, timeout=10, headers=headers)
-        response.encoding = 'utf-8'
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        content_parts = []
-        lead_paragraph = ""
-        
-        # جستجو در محتوای اصلی IranIntl
-        selectors = [
-            'div.article-content p',
-            'div.content p',
-            'article p',
-            'div.article-body p'
-        ]
-        
-        # ابتدا به دنبال روتیتر (پاراگراف اول) بگرد
-        for selector in selectors:
-            paragraphs = soup.select(selector)
-            if paragraphs:
-                # پاراگراف اول معمولاً روتیتر است
-                lead_text = paragraphs[0].get_text(strip=True)
-                if lead_text and len(lead_text) > 50 and len(lead_text) < 300:
-                    lead_paragraph = lead_text
-                    print(f"✅ روتیتر IranIntl پیدا شد: {lead_text[:100]}...")
-                    break
-        
-        # اگر روتیتر پیدا شد، آن را برگردان
-        if lead_paragraph:
-            return lead_paragraph
-        
-        # اگر روتیتر پیدا نشد، از ChatGPT استفاده کن
-        for selector in selectors:
-            paragraphs = soup.select(selector)
-            for p in paragraphs:
-                text = p.get_text(strip=True)
-                if text and len(text) > 30 and len(text) < 1000:
-                    content_parts.append(text)
-                if len(content_parts) >= 5:
-                    break
-            if len(content_parts) >= 5:
-                break
-        
-        # ترکیب محتوا
-        if content_parts:
-            full_content = ' '.join(content_parts)
-            if len(full_content) > 2000:
-                full_content = full_content[:2000] + "..."
-            return full_content
-        else:
-            return ""
-            
-    except Exception as e:
-        print(f"خطا در استخراج محتوای IranIntl: {e}")
-        return ""
-
-def extract_iranintl_content_with_summary(url, title):
-    """استخراج محتوای IranIntl و خلاصه از سایت"""
-    content = extract_iranintl_content(url)
-    if content:
-        # خلاصه از سایت استخراج شده، مستقیماً استفاده کن
-        return content
-    return ""
-
-# تابع دریافت اخبار ISNA
 def fetch_isna_news():
-    """دریافت اخبار مهم از ISNA با استفاده از Selenium برای دور زدن Cloudflare"""
-    try:
-        # تنظیمات Chrome برای Selenium
-        chrome_options = Options()
-        chrome_options.add_argument('--headless')  # اجرا بدون نمایش
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
-        
-        # استفاده از ChromeDriver - نسخه جدید Selenium
-        try:
-            driver = webdriver.Chrome(options=chrome_options)
-        except:
-            # اگر ChromeDriver در PATH نباشد، از مسیر محلی استفاده کن
-            driver_path = './chromedriver.exe'
-            from selenium.webdriver.chrome.service import Service
-            service = Service(executable_path=driver_path)
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-        
-        try:
-            url = 'https://www.isna.ir/archive'
-            driver.get(url)
-            
-            # انتظار برای لود شدن صفحه
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
-            
-            # انتظار بیشتر برای Cloudflare
-            import time
-            time.sleep(5)
-            
-            # دریافت محتوای صفحه
-            page_source = driver.page_source
-            soup = BeautifulSoup(page_source, 'html.parser')
-            
-            news_list = []
-            all_news_items = []
-            
-            # انتخاب اخبار از آرشیو ISNA
-            news_items = soup.select('div.items ul li')
-            
-            print(f"تعداد آیتم‌های یافت شده در آرشیو: {len(news_items)}")
-            
-            for item in news_items[:15]:  # حداکثر 15 خبر
-                try:
-                    # استخراج عنوان - فقط از h3 (نه h4 که روتیتر است)
-                    title_elem = item.select_one('div.desc h3 a')
-                    if not title_elem:
-                        continue
-                        
-                    title = title_elem.get_text(strip=True)
-                    if not title or len(title) < 10:
-                        continue
-                    
-                    # استخراج لینک
-                    link = title_elem.get('href', '')
-                    if not link:
-                        continue
-                        
-                    if not link.startswith('http'):
-                        link = 'https://www.isna.ir' + link
-                    
-                    # استخراج توضیحات
-                    desc_elem = item.select_one('div.desc p')
-                    description = desc_elem.get_text(strip=True) if desc_elem else ""
-                    
-                    # استخراج تاریخ
-                    time_elem = item.select_one('div.desc time a')
-                    time_text = time_elem.get('title', '') if time_elem else ""
-                    
-                    # حذف تکراری
-                    is_duplicate = False
-                    for existing in all_news_items:
-                        if existing['title'] == title or existing['url'] == link:
-                            is_duplicate = True
-                            break
-                    
-                    if not is_duplicate:
-                        all_news_items.append({
-                            'title': title, 
-                            'url': link, 
-                            'description': description,
-                            'time': time_text
-                        })
-                        print(f"خبر جدید یافت شد: {title[:50]}...")
-                        
-                except Exception as e:
-                    print(f"خطا در پردازش خبر ISNA: {e}")
-                    continue
-            
-            print(f"تعداد کل اخبار ISNA: {len(all_news_items)}")
-            
-            for i, news_item in enumerate(all_news_items):
-                print(f"\nپردازش خبر ISNA {i+1}/{len(all_news_items)}: {news_item['title'][:50]}...")
-                
-                # استفاده از توضیحات موجود یا استخراج محتوا
-                summary = news_item.get('description', '')
-                if not summary:
-                    try:
-                        summary = extract_isna_content_with_summary(news_item['url'], news_item['title'])
-                    except Exception as e:
-                        print(f"خطا در استخراج محتوای ISNA: {e}")
-                        summary = ""
-                
-                today = datetime.datetime.now(timezone.utc)
-                news_list.append({
-                    'title': news_item['title'],
-                    'url': news_item['url'],
-                    'agency': 'ISNA',
-                    'published_at': today,
-                    'summary': summary
-                })
-                print(f"خبر ISNA {i+1} پردازش شد")
-            
-            print(f"\nISNA news count: {len(news_list)}")
-            return news_list
-            
-        finally:
-            driver.quit()
-            
-    except Exception as e:
-        print(f"خطا در دریافت اخبار ISNA: {e}")
-        return []
+    """دریافت اخبار مهم از ISNA (آرشیو پشت Cloudflare)"""
+    return fetch_source_news('ISNA')
 
-# تابع دریافت اخبار تسنیم
 def fetch_tasnim_news():
-    try:
-        url = 'https://www.tasnimnews.com/'
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, timeout=10, headers=headers)
-        response.encoding = 'utf-8'
-        soup = BeautifulSoup(response.text, 'html.parser')
-        news_list = []
-        summarizer = PersianSummarizer()
-        all_news_items = []
-        
-        # انتخاب عناوین اخبار
-        selectors = [
-            'div.news-list h3 a',
-            'div.top-news h3 a',
-            'div.latest-news h3 a',
-            'article h3 a',
-            'div.news-item h3 a'
-        ]
-        
-        for selector in selectors:
-            for a_tag in soup.select(selector):
-                title = a_tag.get_text(strip=True)
-                if not title or len(title) < 10:
-                    continue
-                link = a_tag['href']
-                if not link.startswith('http'):
-                    link = 'https://www.tasnimnews.com' + link
-                
-                # حذف تکراری
-                is_duplicate = False
-                for existing in all_news_items:
-                    if existing['title'] == title or existing['url'] == link:
-                        is_duplicate = True
-                        break
-                if not is_duplicate:
-                    all_news_items.append({'title': title, 'url': link})
-                if len(all_news_items) >= 10:
-                    break
-            if len(all_news_items) >= 10:
-                break
-        
-        print(f"تعداد کل اخبار Tasnim: {len(all_news_items)}")
-        
-        for i, news_item in enumerate(all_news_items):
-            print(f"\nپردازش خبر Tasnim {i+1}/{len(all_news_items)}: {news_item['title'][:50]}...")
-            summary = ""
-            try:
-                summary = extract_tasnim_content_with_summary(news_item['url'], news_item['title'])
-            except Exception as e:
-                print(f"خطا در استخراج محتوای Tasnim: {e}")
-                summary = ""
-            
-            today = datetime.datetime.now(timezone.utc)
-            news_list.append({
-                'title': news_item['title'],
-                'url': news_item['url'],
-                'agency': 'Tasnim',
-                'published_at': today,
-                'summary': summary
-            })
-            print(f"خبر Tasnim {i+1} پردازش شد")
-        
-        print(f"\nTasnim news count: {len(news_list)}")
-        return news_list
-    except Exception as e:
-        print(f"خطا در دریافت اخبار Tasnim: {e}")
-        return []
+    """دریافت اخبار تسنیم و خلاصه‌سازی با ChatGPT"""
+    return fetch_source_news('Tasnim')
 
-def extract_isna_content(url):
-    """استخراج محتوای اصلی خبر از ISNA"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, timeout=10, headers=headers)
-        response.encoding = 'utf-8'
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # ابتدا تگ summary را جستجو کن
-        summary_elem = soup.select_one('p.summary')
-        summary_text = ""
-        if summary_elem:
-            summary_text = summary_elem.get_text(strip=True)
-            print(f"خلاصه ISNA یافت شد: {summary_text[:100]}...")
-        
-        content_parts = []
-        
-        # جستجو در محتوای اصلی ISNA
-        selectors = [
-            'div.news-content p',
-            'div.news-text p',
-            'div.content p',
-            'article p',
-            'div.news-body p'
-        ]
-        
-        for selector in selectors:
-            paragraphs = soup.select(selector)
-            for p in paragraphs:
-                text = p.get_text(strip=True)
-                if text and len(text) > 30 and len(text) < 1000:
-                    content_parts.append(text)
-                if len(content_parts) >= 5:
-                    break
-            if len(content_parts) >= 5:
-                break
-        
-        # ترکیب محتوا
-        if content_parts:
-            full_content = ' '.join(content_parts)
-            if len(full_content) > 2000:
-                full_content = full_content[:2000] + "..."
-            
-            # اگر summary یافت شد، آن را به ابتدای محتوا اضافه کن
-            if summary_text:
-                full_content = f"خلاصه خبر: {summary_text}\n\nمتن کامل: {full_content}"
-            
-            return full_content
-        else:
-            return summary_text if summary_text else ""
-            
-    except Exception as e:
-        print(f"خطا در استخراج محتوای ISNA: {e}")
-        return ""
+def get_chatgpt_summary(text, title):
+    """دریافت خلاصه از ChatGPT (خلاصه‌های قبلی همان متن از کش خوانده می‌شوند)
 
-def extract_isna_content_with_summary(url, title):
-    """استخراج محتوای ISNA و خلاصه از سایت"""
-    content = extract_isna_content(url)
-    if content:
-        # خلاصه از سایت استخراج شده، مستقیماً استفاده کن
-        return content
-    return ""
+    درخواست از طریق سرویس مشترک summarizer_service ارسال می‌شود تا بودجه RPM/TPM بین
+    همه threadها رعایت شود؛ اگر تا SUMMARY_DEADLINE پاسخی نیامد یا API در دسترس نبود
+    خلاصه‌ساز محلی TextRank استفاده می‌شود. با SUMMARY_ENGINE=textrank اصلاً درخواستی ارسال نمی‌شود.
+    """
+    summary, _ = request_llm_summary(text, title)
+    return summary
 
-def extract_tasnim_content(url):
-    """استخراج محتوای اصلی خبر از Tasnim"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, timeout=10, headers=headers)
-        response.encoding = 'utf-8'
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        content_parts = []
-        
-        # جستجو در محتوای اصلی Tasnim
-        selectors = [
-            'div.news-content p',
-            'div.news-text p',
-            'div.content p',
-            'article p',
-            'div.news-body p'
-        ]
-        
-        for selector in selectors:
-            paragraphs = soup.select(selector)
-            for p in paragraphs:
-                text = p.get_text(strip=True)
-                if text and len(text) > 30 and len(text) < 1000:
-                    content_parts.append(text)
-                if len(content_parts) >= 5:
-                    break
-            if len(content_parts) >= 5:
-                break
-        
-        # ترکیب محتوا
-        if content_parts:
-            full_content = ' '.join(content_parts)
-            if len(full_content) > 2000:
-                full_content = full_content[:2000] + "..."
-            return full_content
-        else:
-            return ""
-            
-    except Exception as e:
-        print(f"خطا در استخراج محتوای Tasnim: {e}")
-        return ""
+def cached_llm_summary(text, title):
+    """خلاصه LLM ذخیره شده در کش برای این متن (یا None)"""
+    from summary_cache import summary_key, get_cached_summary
+    return get_cached_summary(summary_key(text, title, OPENAI_MODEL, SUMMARY_PROMPT_VERSION))
 
-def extract_tasnim_content_with_summary(url, title):
-    """استخراج محتوای Tasnim و خلاصه‌سازی با ChatGPT"""
-    content = extract_tasnim_content(url)
-    if content:
-        # Tasnim روتیتر ندارد، از ChatGPT استفاده کن
-        return get_chatgpt_summary(content, title)
-    return ""
+def request_llm_summary(text, title):
+    """خلاصه متن و اینکه از LLM (یا کش آن) آمده است یا جایگزین محلی: (summary, from_llm)"""
+    if SUMMARY_ENGINE == 'textrank':
+        return local_summary(text), False
+    from summary_cache import summary_key, get_cached_summary, store_summary
+    key = summary_key(text, title, OPENAI_MODEL, SUMMARY_PROMPT_VERSION)
+    cached = get_cached_summary(key)
+    if cached is not None:
+        return cached, True
+    result = get_summary_service().summarize(text, title)
+    if result['source'] == 'llm':
+        store_summary(key, result['summary'], OPENAI_MODEL, SUMMARY_PROMPT_VERSION)
+        return result['summary'], True
+    return local_summary(text) or result['summary'], False
 
-def get_chatgpt_summary(text, title):
-    """دریافت خلاصه از ChatGPT"""
+def local_summary(text):
+    """خلاصه استخراجی محلی (اگر NumPy نصب نباشد متن کوتاه شده)"""
     try:
-        # تنظیم API key (اگر موجود باشد)
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            print("⚠️ OPENAI_API_KEY تنظیم نشده است. از متن کامل استفاده می‌شود.")
-            return text[:500] + "..." if len(text) > 500 else text
-        
-        openai.api_key = api_key
-        
-        prompt = f"""
-        عنوان خبر: {title}
-        
-        متن کامل خبر:
-        {text}
-        
-        لطفاً این خبر را در یک پاراگراف کوتاه و معنادار خلاصه کنید. 
-        خلاصه باید شامل نکات اصلی و مهم خبر باشد و به زبان فارسی نوشته شود.
-        حداکثر 200 کلمه باشد.
-        """
-        
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "شما یک خبرنگار حرفه‌ای هستید که اخبار را خلاصه می‌کند."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=300,
-            temperature=0.7
-        )
-        
-        summary = response.choices[0].message.content.strip()
-        return summary
-        
-    except Exception as e:
-        print(f"خطا در دریافت خلاصه از ChatGPT: {e}")
-        # در صورت خطا، از متن کوتاه شده استفاده کن
-        return text[:500] + "..." if len(text) > 500 else text
+        from local_summarizer import summarize_text
+    except ImportError:
+        return truncate_summary(text)
+    return summarize_text(text)
 
 def normalize_text(text):
     """نرمال کردن متن برای مقایسه"""
@@ -860,11 +83,93 @@ def normalize_text(text):
     text = re.sub(r'\s+', ' ', text)     # تبدیل چندین فاصله به یک فاصله
     return text
 
+# پارامترهای ردیابی که در شناسه خبر اثری ندارند؛ بقیه query (مثل ?id=) بخشی از کلید خبر است
+_TRACKING_PARAM_PREFIXES = ('utm_', 'at_')
+_TRACKING_PARAMS = frozenset((
+    'fbclid', 'gclid', 'dclid', 'yclid', 'msclkid', 'igshid', 'mc_cid', 'mc_eid',
+    '_ga', 'ref', 'ref_src', 'xtor', 'ocid', 'cmpid',
+))
+
+def _is_tracking_param(name):
+    name = name.lower()
+    return name in _TRACKING_PARAMS or name.startswith(_TRACKING_PARAM_PREFIXES)
+
 def normalize_url(url):
-    """نرمال کردن URL برای مقایسه"""
-    parsed = urlparse(url)
-    clean_url = urlunparse(parsed._replace(query=""))
-    return clean_url.strip().lower()
+    """نرمال کردن URL برای مقایسه (بدون fragment و پارامترهای ردیابی، با ترتیب ثابت پارامترها)"""
+    parsed = urlparse(url.strip())
+    params = sorted(
+        (name, value) for name, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not _is_tracking_param(name)
+    )
+    clean_url = urlunparse(parsed._replace(query='', fragment='')).lower()
+    # مقدار پارامترها ممکن است به حروف بزرگ و کوچک حساس باشد
+    return f'{clean_url}?{urlencode(params)}' if params else clean_url
+
+_url_index_ready = False
+_url_index_lock = threading.Lock()
+
+def ensure_url_index():
+    """پر کردن url_normalized برای خبرهای قدیمی که پیش از اضافه شدن این ستون ذخیره شده‌اند
+
+    لینک‌های دارای query هم دوباره نرمال می‌شوند (کلیدهای قدیمی کل query را حذف می‌کردند).
+    """
+    global _url_index_ready
+    if _url_index_ready:
+        return
+    with _url_index_lock:
+        if _url_index_ready:
+            return
+        db = SessionLocal()
+        try:
+            rows = db.query(News.id, News.url, News.url_normalized).filter(
+                or_(News.url_normalized.is_(None), News.url.contains('?'))
+            ).all()
+            updates = []
+            if rows:
+                seen = {key for (key,) in db.query(News.url_normalized).filter(News.url_normalized.isnot(None))}
+                for news_id, url, current in rows:
+                    if not url:
+                        continue
+                    key = normalize_url(url)
+                    # برای خبرهای تکراری قدیمی کلید قبلی می‌ماند (ستون unique است)
+                    if key == current or key in seen:
+                        continue
+                    seen.add(key)
+                    updates.append({'id': news_id, 'url_normalized': key})
+            if updates:
+                db.bulk_update_mappings(News, updates)
+                db.commit()
+                print(f"🔗 لینک نرمال‌شده برای {len(updates)} خبر قدیمی ثبت شد")
+            _url_index_ready = True
+        except Exception as e:
+            print(f"خطا در ساخت فهرست لینک‌ها: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+def get_known_urls(urls):
+    """لینک‌های نرمال‌شده‌ای از urls که قبلاً در دیتابیس ذخیره شده‌اند (با یک query)"""
+    ensure_url_index()
+    keys = {normalize_url(url) for url in urls if url}
+    if not keys:
+        return set()
+    db = SessionLocal()
+    try:
+        return {key for (key,) in db.query(News.url_normalized).filter(News.url_normalized.in_(keys))}
+    finally:
+        db.close()
+
+def filter_known_items(news_items, agency):
+    """حذف آیتم‌هایی از فهرست که لینک آن‌ها قبلاً ذخیره شده است"""
+    try:
+        known = get_known_urls(item['url'] for item in news_items)
+    except Exception as e:
+        print(f"خطا در بررسی لینک‌های ذخیره شده {agency}: {e}")
+        return news_items
+    new_items = [item for item in news_items if normalize_url(item['url']) not in known]
+    if len(new_items) < len(news_items):
+        print(f"{agency}: {len(news_items) - len(new_items)} خبر قبلاً ذخیره شده و استخراج نمی‌شود")
+    return new_items
 
 def is_similar_title(title1, title2, threshold=0.8):
     """بررسی شباهت دو عنوان با استفاده از الگوریتم ساده"""
@@ -886,7 +191,16 @@ def save_news(news_items):
     db = SessionLocal()
     try:
         added_count = 0
+        # خبرهایی که خلاصه LLM آن‌ها بعداً در صف خلاصه‌سازی تولید می‌شود
+        pending = []
+        # لینک‌های ذخیره شده (در دیتابیس یا همین دسته) - ستون url_normalized یکتا است
+        seen_urls = get_known_urls(item['url'] for item in news_items)
         for item in news_items:
+            url_key = normalize_url(item['url'])
+            if url_key in seen_urls:
+                print(f"خبر تکراری (لینک) نادیده گرفته شد: {item['title'][:50]}...")
+                continue
+            
             # بررسی تکراری بودن بر اساس عنوان مشابه و آژانس
             existing_news = db.query(News).filter(News.agency == item['agency']).all()
             
@@ -900,11 +214,16 @@ def save_news(news_items):
                 news = News(
                     title=item['title'],  # ذخیره متن اصلی
                     url=item['url'],      # ذخیره URL اصلی
+                    url_normalized=url_key,
                     agency=item['agency'],
                     published_at=item['published_at'],
-                    summary=item['summary']
+                    summary=item['summary'],
+                    summary_status=item.get('summary_status', 'ready')
                 )
                 db.add(news)
+                if news.summary_status == 'pending':
+                    pending.append((news, item))
+                seen_urls.add(url_key)
                 added_count += 1
                 print(f"خبر جدید اضافه شد: {item['title'][:50]}...")
             else:
@@ -912,82 +231,56 @@ def save_news(news_items):
         
         db.commit()
         print(f"تعداد {added_count} خبر جدید از {len(news_items)} خبر اضافه شد")
+        if pending:
+            from summary_queue import enqueue_summaries
+            enqueue_summaries([
+                (news.id, item['summary_input']['title'], item['summary_input']['text'])
+                for news, item in pending
+            ])
+        from fetch_journal import mark_saved
+        mark_saved(news_items)
     except Exception as e:
         print(f"خطا در ذخیره اخبار: {e}")
         db.rollback()
     finally:
         db.close()
 
+# نگاشت نام خبرگزاری به تابع دریافت اخبار آن (مورد استفاده در news_orchestrator)
+# منابع جدید news_sources به صورت خودکار اضافه می‌شوند
+AGENCY_FETCHERS = {
+    'IRNA': fetch_irna_top_news,
+    'BBC': fetch_bbc_persian_news,
+    'IranIntl': fetch_iranintl_news,
+    'ISNA': fetch_isna_news,
+    'Tasnim': fetch_tasnim_news,
+}
+for _name in SOURCES:
+    AGENCY_FETCHERS.setdefault(_name, partial(fetch_source_news, _name))
+
 if __name__ == "__main__":
+    from news_orchestrator import fetch_all_news
+
     print("شروع دریافت اخبار...")
     
-    all_news = []
-    
-    # دریافت اخبار IRNA
-    try:
-        irna_news = fetch_irna_top_news()
-        if irna_news:
-            save_news(irna_news)
-            all_news.extend(irna_news)
-        else:
-            print("هیچ خبری از IRNA دریافت نشد")
-    except Exception as e:
-        print(f"خطا در پردازش اخبار IRNA: {e}")
-    
-    # دریافت اخبار BBC
-    try:
-        bbc_news = fetch_bbc_persian_news()
-        if bbc_news:
-            save_news(bbc_news)
-            all_news.extend(bbc_news)
-        else:
-            print("هیچ خبری از BBC دریافت نشد")
-    except Exception as e:
-        print(f"خطا در پردازش اخبار BBC: {e}")
-    
-    # دریافت اخبار IranIntl
-    try:
-        iranintl_news = fetch_iranintl_news()
-        if iranintl_news:
-            save_news(iranintl_news)
-            all_news.extend(iranintl_news)
-        else:
-            print("هیچ خبری از IranIntl دریافت نشد")
-    except Exception as e:
-        print(f"خطا در پردازش اخبار IranIntl: {e}")
-    
-    # دریافت اخبار ISNA
-    try:
-        isna_news = fetch_isna_news()
-        if isna_news:
-            save_news(isna_news)
-            all_news.extend(isna_news)
-        else:
-            print("هیچ خبری از ISNA دریافت نشد")
-    except Exception as e:
-        print(f"خطا در پردازش اخبار ISNA: {e}")
-    
-    # دریافت اخبار Tasnim
-    try:
-        tasnim_news = fetch_tasnim_news()
-        if tasnim_news:
-            save_news(tasnim_news)
-            all_news.extend(tasnim_news)
-        else:
-            print("هیچ خبری از Tasnim دریافت نشد")
-    except Exception as e:
-        print(f"خطا در پردازش اخبار Tasnim: {e}")
+    # دریافت هم‌زمان اخبار همه خبرگزاری‌ها و ذخیره هر کدام به محض اتمام
+    result = fetch_all_news()
+
+    # بدون سرور workerی برای صف خلاصه‌سازی نیست؛ خلاصه‌های LLM همین‌جا تولید می‌شوند
+    from summary_queue import SUMMARY_DEFERRED, drain_queue
+    if SUMMARY_DEFERRED:
+        drain_queue()
     
     # خلاصه نهایی
-    agencies = {}
-    for news in all_news:
-        if news['agency'] not in agencies:
-            agencies[news['agency']] = 0
-        agencies[news['agency']] += 1
-    
     print(f"\n📊 خلاصه نهایی:")
-    for agency, count in agencies.items():
-        print(f"  📰 {agency}: {count} خبر")
+    for agency, info in result['agencies'].items():
+        if info['status'] == 'ok':
+            print(f"  📰 {agency}: {info['count']} خبر ({info['elapsed']:.1f} ثانیه)")
+        else:
+            print(f"  ❌ {agency}: {info['status']} - {info['error']}")
+    
+    print(f"\n🌐 آمار درخواست‌ها:")
+    print_host_stats()
     
-    print(f"\n✅ تعداد کل اخبار دریافت شده: {len(all_news)}")
+    print(f"\n✅ تعداد کل اخبار دریافت شده: {result['count']}")
+    print(f"⏱️ زمان کل: {result['elapsed']:.1f} ثانیه")
     print("🎯 عملیات دریافت اخبار کامل شد.") 
\ No newline at end of file
@@ -0,0 +1,240 @@
+import os
+import time
+import math
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from news_fetcher import AGENCY_FETCHERS, save_news
+
+# تعداد خبرگزاری‌هایی که هم‌زمان دریافت می‌شوند
+FETCH_MAX_WORKERS = int(os.getenv('FETCH_MAX_WORKERS', '3'))
+# حداکثر زمان (ثانیه) برای دریافت اخبار هر خبرگزاری
+FETCH_AGENCY_TIMEOUT = float(os.getenv('FETCH_AGENCY_TIMEOUT', '180'))
+# استفاده از خط لوله ingest_pipeline (ذخیره هر خبر بلافاصله پس از خلاصه‌سازی)
+INGEST_PIPELINE_ENABLED = os.getenv('INGEST_PIPELINE_ENABLED', '1') == '1'
+
+# هر خبرگزاری در هر لحظه فقط یک دریافت در حال اجرا دارد (حتی اگر دریافت قبلی از مهلت گذشته باشد)؛
+# قفل روی فایل است تا /fetch-news در هر worker uvicorn با زمان‌بند worker leader هم‌زمان نشود
+AGENCY_LOCK_DIR = os.getenv('AGENCY_LOCK_DIR', tempfile.gettempdir())
+
+def try_file_lock(lock_file):
+    """قفل انحصاری و بدون انتظار روی فایل (بین پروسه‌ها)"""
+    try:
+        import fcntl
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except ImportError:
+        # ویندوز
+        import msvcrt
+        try:
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+    except OSError:
+        return False
+
+class AgencyLock:
+    """قفل دریافت یک خبرگزاری بین threadهای این پروسه و پروسه‌های دیگر"""
+
+    def __init__(self, name):
+        self.name = name
+        self.path = os.path.join(AGENCY_LOCK_DIR, f'panel_rasad_agency_{name}.lock')
+        # در پروسه worker قفل فایل را پروسه اصلی برای آن نگه داشته است
+        self.inherited = False
+        self._thread_lock = threading.Lock()
+        self._file = None
+
+    def acquire(self, blocking=False):
+        """گرفتن قفل بدون انتظار؛ False اگر دریافت دیگری (در هر پروسه) در حال اجرا باشد"""
+        if blocking:
+            raise ValueError('قفل خبرگزاری فقط بدون انتظار گرفته می‌شود')
+        if not self._thread_lock.acquire(blocking=False):
+            return False
+        if self.inherited:
+            return True
+        try:
+            lock_file = open(self.path, 'a+')
+        except OSError as e:
+            print(f"⚠️ فایل قفل {self.name} باز نشد، فقط قفل داخل پروسه استفاده می‌شود: {e}")
+            return True
+        if not try_file_lock(lock_file):
+            lock_file.close()
+            self._thread_lock.release()
+            return False
+        self._file = lock_file
+        return True
+
+    def release(self):
+        if self._file is not None:
+            # بستن فایل قفل آن را آزاد می‌کند
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+    def locked(self):
+        if self._thread_lock.locked():
+            return True
+        if self.inherited:
+            return False
+        try:
+            lock_file = open(self.path, 'a+')
+        except OSError:
+            return False
+        with lock_file:
+            return not try_file_lock(lock_file)
+
+_agency_locks = {}
+_agency_locks_lock = threading.Lock()
+
+def agency_lock(name):
+    with _agency_locks_lock:
+        if name not in _agency_locks:
+            _agency_locks[name] = AgencyLock(name)
+        return _agency_locks[name]
+
+def inherit_agency_lock(name):
+    """پروسه worker: قفل فایل این خبرگزاری را پروسه اصلی گرفته است"""
+    agency_lock(name).inherited = True
+
+def is_agency_running(name):
+    """آیا دریافت اخبار این خبرگزاری (در این پروسه یا پروسه دیگر) در حال اجراست"""
+    return agency_lock(name).locked()
+
+def _run_fetcher(name, fetcher, started):
+    """اجرای fetcher یک خبرگزاری و ثبت زمان شروع واقعی آن"""
+    lock = agency_lock(name)
+    if not lock.acquire(blocking=False):
+        raise RuntimeError('دریافت قبلی این خبرگزاری هنوز در حال اجراست')
+    try:
+        started[name] = time.monotonic()
+        return fetcher()
+    finally:
+        lock.release()
+
+def _result(name, status, news=None, error=None, elapsed=0.0):
+    return {
+        'agency': name,
+        'status': status,  # ok / error / timeout
+        'news': news or [],
+        'count': len(news or []),
+        'error': error,
+        'elapsed': elapsed
+    }
+
+def iter_agency_results(agencies=None, max_workers=None, timeout=None):
+    """اجرای هم‌زمان fetcherها و برگرداندن نتیجه هر خبرگزاری به محض اتمام
+
+    زمان‌سنج هر خبرگزاری از لحظه شروع واقعی آن (نه لحظه صف شدن) محاسبه می‌شود.
+    خبرگزاری‌ای که از مهلت خود بگذرد با وضعیت timeout گزارش می‌شود و منتظر آن نمی‌مانیم.
+    """
+    if agencies is None:
+        agencies = list(AGENCY_FETCHERS.keys())
+    max_workers = max_workers or FETCH_MAX_WORKERS
+    timeout = timeout or FETCH_AGENCY_TIMEOUT
+
+    started = {}
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fetch')
+    try:
+        futures = {}
+        for name in agencies:
+            fetcher = AGENCY_FETCHERS.get(name)
+            if fetcher is None:
+                yield _result(name, 'error', error='خبرگزاری ناشناخته')
+                continue
+            futures[executor.submit(_run_fetcher, name, fetcher, started)] = name
+
+        # سقف کلی برای خبرگزاری‌هایی که به دلیل اشغال بودن workerها هرگز شروع نشوند
+        waves = math.ceil(len(futures) / max_workers) if futures else 0
+        overall_deadline = time.monotonic() + timeout * waves
+
+        pending = set(futures)
+        while pending:
+            now = time.monotonic()
+            deadlines = [started[futures[f]] + timeout for f in pending if futures[f] in started]
+            wait_for = min(deadlines + [overall_deadline]) - now
+            done, pending = wait(pending, timeout=max(wait_for, 0.1), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name = futures[future]
+                elapsed = time.monotonic() - started.get(name, now)
+                try:
+                    yield _result(name, 'ok', news=future.result(), elapsed=elapsed)
+                except Exception as e:
+                    yield _result(name, 'error', error=str(e), elapsed=elapsed)
+
+            now = time.monotonic()
+            for future in list(pending):
+                name = futures[future]
+                expired = name in started and now - started[name] >= timeout
+                if expired or now >= overall_deadline:
+                    future.cancel()
+                    pending.discard(future)
+                    elapsed = now - started[name] if name in started else 0.0
+                    yield _result(name, 'timeout', error=f'مهلت {timeout:.0f} ثانیه‌ای تمام شد', elapsed=elapsed)
+    finally:
+        # منتظر threadهایی که از مهلت گذشته‌اند نمی‌مانیم
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def fetch_all_news(agencies=None, max_workers=None, timeout=None, on_result=None, isolation=None, prune=True):
+    """دریافت هم‌زمان اخبار همه خبرگزاری‌ها و ذخیره نتیجه هر کدام به محض اتمام
+
+    با INGEST_PIPELINE_ENABLED هر خبر به جای پایان کار خبرگزاری، بلافاصله پس از
+    خلاصه‌سازی ذخیره می‌شود. خبرگزاری‌هایی که طبق AGENCY_ISOLATION (یا isolation)
+    باید جدا اجرا شوند در پروسه worker با مهلت قطعی دریافت می‌شوند.
+    """
+    from agency_worker import should_isolate, run_isolated
+
+    start = time.monotonic()
+    if agencies is None:
+        agencies = list(AGENCY_FETCHERS.keys())
+    agencies_info = {}
+    total_count = 0
+    results_lock = threading.Lock()
+
+    def handle(result):
+        nonlocal total_count
+        name = result['agency']
+        with results_lock:
+            if result['status'] == 'ok':
+                if result['news']:
+                    save_news(result['news'])
+                print(f"✅ {name}: {result['count']} خبر در {result['elapsed']:.1f} ثانیه")
+            else:
+                print(f"❌ {name}: {result['status']} - {result['error']}")
+            total_count += result['count']
+            agencies_info[name] = {
+                'status': result['status'],
+                'count': result['count'],
+                'error': result['error'],
+                'elapsed': round(result['elapsed'], 2)
+            }
+            if on_result:
+                on_result(result)
+
+    isolated = [name for name in agencies if should_isolate(name, isolation)]
+    local = [name for name in agencies if name not in isolated]
+    supervisor = None
+    if isolated:
+        supervisor = threading.Thread(
+            target=run_isolated,
+            args=(isolated,),
+            kwargs={'max_workers': max_workers, 'timeout': timeout, 'on_result': handle},
+            name='agency-supervisor'
+        )
+        supervisor.start()
+    if local:
+        if INGEST_PIPELINE_ENABLED:
+            from ingest_pipeline import get_ingest_pipeline
+            get_ingest_pipeline().run(local, max_workers=max_workers, timeout=timeout, on_result=handle, prune=prune)
+        else:
+            for result in iter_agency_results(local, max_workers=max_workers, timeout=timeout):
+                handle(result)
+    if supervisor is not None:
+        supervisor.join()
+    return {
+        'count': total_count,
+        'agencies': agencies_info,
+        'failed': [name for name, info in agencies_info.items() if info['status'] != 'ok'],
+        'elapsed': time.monotonic() - start
+    }
@@ -0,0 +1,191 @@
+# تعریف منابع خبری برای scraper_engine
+# برای اضافه کردن یک خبرگزاری جدید کافی است یک ورودی به SOURCES اضافه شود
+#
+# کلیدهای هر منبع:
+#   agency               نام خبرگزاری (همان مقداری که در ستون News.agency ذخیره می‌شود)
+#   listing_url          آدرس صفحه فهرست اخبار
+#   feed_url             فید RSS/Atom؛ اگر تعیین شود ابتدا فید خوانده می‌شود و صفحه فهرست فقط در صورت خطا
+#                        (توضیحات و تاریخ انتشار از فید؛ صفحه خبر فقط برای فیلدهایی که فید ندارد)
+#   base_url             پیشوند لینک‌های نسبی
+#   transport            'http' (کلاینت مشترک با درخواست شرطی) یا 'browser' (HTTP با کوکی Cloudflare و در صورت چالش مرورگر)
+#   wait_selector        selectorی که نشان می‌دهد فهرست اخبار لود شده است (فقط browser)
+#   listing_parse_only   فقط زیردرخت این تگ‌ها parse می‌شود (نام تگ‌ها یا یک 'tag.class')
+#   listing_selectors    selectorهای عنوان خبر در صفحه فهرست، به ترتیب اولویت
+#   link_parent          اگر تعیین شود، لینک از اولین <a> داخل این والد عنوان خوانده می‌شود
+#   item_parent          والد عنوان که توضیحات و زمان از داخل آن خوانده می‌شود
+#   description_selector توضیحات خبر در صفحه فهرست
+#   time_selector        زمان خبر در صفحه فهرست (time_attr: خواندن از attribute به جای متن)
+#   min_title_length     عنوان‌های کوتاه‌تر نادیده گرفته می‌شوند
+#   max_items            حداکثر تعداد خبر در هر بار دریافت
+#   poll_interval        فاصله دریافت خودکار توسط scheduler (ثانیه)
+#   archive              آرشیو روزانه برای backfill:
+#       url                  الگوی آدرس صفحه آرشیو ({page}، {year}، {month}، {day} تاریخ شمسی)
+#       max_pages            حداکثر صفحه‌های هر روز
+#       page_size            حداکثر خبر هر صفحه
+#   article              selectorهای صفحه خبر:
+#       title_selectors      عنوان خبر در صفحه خبر (اگر use_article_title باشد جایگزین عنوان فهرست می‌شود)
+#       summary_selectors    خلاصه/لید منتشر شده توسط خود سایت
+#       lead                 پاراگراف اول متن به عنوان روتیتر (اگر طول آن در بازه باشد)
+#       content              مراحل استخراج متن؛ اولین مرحله‌ای که متنی پیدا کند استفاده می‌شود
+#       parse_only           مثل listing_parse_only برای صفحه خبر
+#   summary_from         ترتیب منابع خلاصه؛ اولین مقدار غیرخالی ذخیره می‌شود:
+#       description / site_summary / lead / content / summary_and_content / llm
+
+# selectorهای عمومی متن خبر در سایت‌های خبری داخلی
+_COMMON_CONTENT_SELECTORS = [
+    'div.news-content p',
+    'div.news-text p',
+    'div.content p',
+    'article p',
+]
+
+SOURCES = {
+    'IRNA': {
+        'agency': 'IRNA',
+        'listing_url': 'https://www.irna.ir/archive',
+        'feed_url': 'https://www.irna.ir/rss',
+        'base_url': 'https://www.irna.ir',
+        'transport': 'browser',
+        'wait_selector': 'ul li',
+        'listing_parse_only': ['ul'],
+        'listing_selectors': ['ul li div.desc h3 a'],
+        'item_parent': 'li',
+        'description_selector': 'div.desc p',
+        'time_selector': 'div.desc time a',
+        'min_title_length': 10,
+        'max_items': 15,
+        'poll_interval': 1800,  # Selenium؛ هر نیم ساعت
+        'archive': {
+            'url': 'https://www.irna.ir/archive?pi={page}&ms=0&dy={day}&mn={month}&yr={year}',
+            'max_pages': 50,
+            'page_size': 100,
+        },
+        'use_article_title': True,
+        'article': {
+            'title_selectors': ['a[itemprop="headline"]', 'h1.title', 'title'],
+            'summary_selectors': [
+                'p.summary',
+                'p.summary.introtext[itemprop="description"]',
+                'p.summary.introtext',
+                'div.summary p',
+                'div.intro p',
+            ],
+            'content': [
+                {'selectors': _COMMON_CONTENT_SELECTORS, 'min': 30, 'max': 1000, 'limit': 5},
+            ],
+        },
+        'summary_from': ['site_summary'],
+    },
+    'BBC': {
+        'agency': 'BBC',
+        'listing_url': 'https://www.bbc.com/persian/topics/ckdxnwvwwjnt',
+        'base_url': 'https://www.bbc.com',
+        'transport': 'http',
+        'listing_parse_only': ['main'],
+        'listing_selectors': [
+            'ul[data-testid="topic-promos"] > li h2 a',
+            'article h2 a',
+            'div[data-testid="card-headline"] a',
+        ],
+        'min_title_length': 1,
+        'max_items': 15,
+        'poll_interval': 300,
+        'article': {
+            'parse_only': ['main'],
+            'content': [
+                # کلاس‌های بدنه خبر BBC
+                {'selectors': ['div.bbc-4wucq3.ebmt73l0 p.bbc-1gjryo4.e17g058b0'], 'min': 20},
+                # اگر محتوای اصلی پیدا نشد، پاراگراف‌های متوسط صفحه
+                {'selectors': ['p'], 'min': 50, 'max': 1000, 'limit': 5},
+            ],
+        },
+        'summary_from': ['content'],
+    },
+    'IranIntl': {
+        'agency': 'IranIntl',
+        'listing_url': 'https://www.iranintl.com/iran',
+        'base_url': 'https://www.iranintl.com',
+        'transport': 'http',
+        'listing_selectors': [
+            'article h3',
+            'div.TopicCluster-module-scss-module__RZ03fG__featured article h3',
+            'div.TopicCluster-module-scss-module__RZ03fG__additionalItem article h3',
+            'div.topic__grid__item article h3',
+        ],
+        'listing_parse_only': ['article'],
+        'link_parent': 'article',
+        'min_title_length': 1,
+        'max_items': 15,
+        'poll_interval': 600,
+        'article': {
+            # پاراگراف اول معمولاً روتیتر است
+            'lead': {
+                'selectors': ['div.article-content p', 'div.content p', 'article p', 'div.article-body p'],
+                'min': 50,
+                'max': 300,
+            },
+            'content': [
+                {
+                    'selectors': ['div.article-content p', 'div.content p', 'article p', 'div.article-body p'],
+                    'min': 30,
+                    'max': 1000,
+                    'limit': 5,
+                },
+            ],
+        },
+        'summary_from': ['lead', 'content'],
+    },
+    'ISNA': {
+        'agency': 'ISNA',
+        'listing_url': 'https://www.isna.ir/archive',
+        'feed_url': 'https://www.isna.ir/rss',
+        'base_url': 'https://www.isna.ir',
+        'transport': 'browser',
+        'wait_selector': 'div.items ul li',
+        'listing_parse_only': ['div.items'],
+        # فقط h3 (نه h4 که روتیتر است)
+        'listing_selectors': ['div.items ul li div.desc h3 a'],
+        'item_parent': 'li',
+        'description_selector': 'div.desc p',
+        'time_selector': 'div.desc time a',
+        'time_attr': 'title',
+        'min_title_length': 10,
+        'max_items': 15,
+        'poll_interval': 1800,  # Selenium؛ هر نیم ساعت
+        'archive': {
+            'url': 'https://www.isna.ir/archive?pi={page}&ms=0&dy={day}&mn={month}&yr={year}',
+            'max_pages': 50,
+            'page_size': 100,
+        },
+        'article': {
+            'summary_selectors': ['p.summary'],
+            'content': [
+                {'selectors': _COMMON_CONTENT_SELECTORS + ['div.news-body p'], 'min': 30, 'max': 1000, 'limit': 5},
+            ],
+        },
+        'summary_from': ['description', 'summary_and_content'],
+    },
+    'Tasnim': {
+        'agency': 'Tasnim',
+        'listing_url': 'https://www.tasnimnews.com/',
+        'base_url': 'https://www.tasnimnews.com',
+        'transport': 'http',
+        'listing_selectors': [
+            'div.news-list h3 a',
+            'div.top-news h3 a',
+            'div.latest-news h3 a',
+            'article h3 a',
+            'div.news-item h3 a',
+        ],
+        'min_title_length': 10,
+        'max_items': 10,
+        'poll_interval': 900,
+        'article': {
+            'content': [
+                {'selectors': _COMMON_CONTENT_SELECTORS + ['div.news-body p'], 'min': 30, 'max': 1000, 'limit': 5},
+            ],
+        },
+        # Tasnim روتیتر ندارد، از ChatGPT استفاده کن
+        'summary_from': ['llm'],
+    },
+}
@@ -0,0 +1,81 @@
+import os
+import time
+import signal
+
+# ابزارهای کار با درخت پروسه‌ها (فقط لینوکس، از طریق /proc)
+# برای اندازه‌گیری حافظه و پاک‌سازی پروسه‌های Chrome باقی‌مانده
+
+def descendant_pids(pid):
+    """همه پروسه‌های زیرمجموعه pid"""
+    if not os.path.isdir('/proc'):
+        return []
+    parents = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+            parents.setdefault(ppid, []).append(int(entry))
+        except (OSError, ValueError, IndexError):
+            continue
+    result, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        for child in parents.get(current, []):
+            result.append(child)
+            stack.append(child)
+    return result
+
+def rss_kb(pid):
+    """حافظه RSS پروسه به کیلوبایت (0 اگر پروسه وجود نداشته باشد)"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+def tree_rss_kb(pid):
+    """مجموع RSS پروسه و همه زیرمجموعه‌هایش"""
+    return sum(rss_kb(p) for p in [pid] + descendant_pids(pid))
+
+def kill_tree(pid, grace=2.0):
+    """پایان دادن به پروسه، گروه پروسه آن و همه زیرمجموعه‌ها (ابتدا SIGTERM و سپس SIGKILL)
+
+    زیرمجموعه‌ها پیش از kill جمع‌آوری می‌شوند چون پس از مرگ والد به init منتقل
+    می‌شوند و دیگر از روی درخت قابل پیدا کردن نیستند.
+    """
+    pids = [pid] + descendant_pids(pid)
+    for sig in (signal.SIGTERM, getattr(signal, 'SIGKILL', signal.SIGTERM)):
+        if hasattr(os, 'killpg'):
+            try:
+                os.killpg(pid, sig)
+            except OSError:
+                pass
+        for p in pids:
+            try:
+                os.kill(p, sig)
+            except OSError:
+                pass
+        deadline = time.monotonic() + grace
+        while time.monotonic() < deadline and any(_alive(p) for p in pids):
+            time.sleep(0.1)
+        if not any(_alive(p) for p in pids):
+            return
+
+def _alive(pid):
+    if os.path.isdir('/proc'):
+        # پروسه zombie هم مرده حساب می‌شود
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+        except OSError:
+            return False
+    try:
+        os.kill(pid, 0)
+        return True
+    except OSError:
+        return False
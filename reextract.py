@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+بازسازی خلاصه اخبار از snapshotهای ذخیره شده صفحه خبر (بدون اینترنت)
+پس از اصلاح selectorها یا منطق خلاصه‌سازی، تابع‌های فعلی استخراج روی HTML ذخیره شده
+(snapshot_store) اجرا می‌شوند و ستون summary در دسته‌های بزرگ به‌روزرسانی می‌شود.
+خلاصه‌سازی llm (نیازمند شبکه) اجرا نمی‌شود و خلاصه فعلی آن خبرها دست نمی‌خورد.
+
+اجرا:
+    python reextract.py [--agency IRNA] [--workers N] [--batch N] [--dry-run]
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from database import SessionLocal, News, PageSnapshot
+from news_sources import SOURCES
+from news_fetcher import ensure_url_index
+from snapshot_store import load_snapshot
+from scraper_engine import extract_article_html, summarize
+
+# تعداد خبرهایی که در هر تراکنش به‌روزرسانی می‌شوند
+REEXTRACT_BATCH = int(os.getenv('REEXTRACT_BATCH', '500'))
+
+# روش‌هایی که بدون شبکه یا داده فهرست قابل تکرار نیستند
+_ONLINE_STRATEGIES = ('llm', 'description')
+
+def offline_source(agency):
+    """تعریف منبع با روش‌های خلاصه‌سازی آفلاین (یا None اگر روشی باقی نماند)"""
+    source = SOURCES.get(agency)
+    if source is None:
+        return None
+    strategies = [s for s in source.get('summary_from', ['content']) if s not in _ONLINE_STRATEGIES]
+    if not strategies:
+        return None
+    return dict(source, summary_from=strategies)
+
+def _reextract(task):
+    """اجرا در پروسه worker: استخراج دوباره یک خبر از snapshot و برگرداندن (id, summary)"""
+    news_id, agency, url, title, content_hash = task
+    try:
+        source = offline_source(agency)
+        article = extract_article_html(source, load_snapshot(content_hash))
+        summary, _ = summarize(source, {'url': url, 'title': title}, article)
+        return news_id, summary, None
+    except Exception as e:
+        return news_id, None, str(e)
+
+def _tasks(db, agency=None):
+    """خبرهایی که snapshot صفحه خبر دارند؛ از هر آدرس آخرین snapshot استفاده می‌شود"""
+    latest = {}
+    query = db.query(PageSnapshot.url_normalized, PageSnapshot.content_hash).filter(PageSnapshot.kind == 'article')
+    if agency:
+        query = query.filter(PageSnapshot.agency == agency)
+    for url_normalized, content_hash in query.order_by(PageSnapshot.fetched_at):
+        latest[url_normalized] = content_hash
+
+    tasks = []
+    skipped = 0
+    query = db.query(News.id, News.agency, News.url, News.title, News.url_normalized)
+    if agency:
+        query = query.filter(News.agency == agency)
+    for news_id, news_agency, url, title, url_normalized in query:
+        content_hash = latest.get(url_normalized)
+        if content_hash is None:
+            continue
+        if offline_source(news_agency) is None:
+            skipped += 1
+            continue
+        tasks.append((news_id, news_agency, url, title, content_hash))
+    return tasks, skipped
+
+def _flush(db, updates, dry_run):
+    if updates and not dry_run:
+        db.bulk_update_mappings(News, updates)
+        db.commit()
+
+def reextract(agency=None, workers=None, batch=None, dry_run=False):
+    """استخراج دوباره همه خبرهای دارای snapshot و به‌روزرسانی خلاصه آن‌ها"""
+    workers = workers or os.cpu_count() or 1
+    batch = batch or REEXTRACT_BATCH
+    # خبرهای قدیمی بدون url_normalized با snapshotها جفت نمی‌شوند
+    ensure_url_index()
+    db = SessionLocal()
+    try:
+        tasks, skipped = _tasks(db, agency)
+        if skipped:
+            print(f"⏭️ {skipped} خبر با خلاصه‌سازی آنلاین (llm) رد شد")
+        if not tasks:
+            print("snapshotی برای استخراج دوباره پیدا نشد")
+            return {'pages': 0, 'updated': 0, 'failed': 0, 'elapsed': 0.0, 'pages_per_sec': 0.0}
+
+        current = dict(db.query(News.id, News.summary).filter(News.id.in_([t[0] for t in tasks])))
+        print(f"🔁 استخراج دوباره {len(tasks)} خبر با {workers} پروسه...")
+        started = time.perf_counter()
+        updates = []
+        updated = failed = 0
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, len(tasks) // (workers * 4))
+            for news_id, summary, error in executor.map(_reextract, tasks, chunksize=chunksize):
+                if error:
+                    failed += 1
+                    print(f"خطا در استخراج دوباره خبر {news_id}: {error}")
+                    continue
+                # خلاصه خالی (تغییر ساختار صفحه) جایگزین خلاصه قبلی نمی‌شود
+                if summary and summary != current.get(news_id):
+                    updates.append({'id': news_id, 'summary': summary})
+                    updated += 1
+                if len(updates) >= batch:
+                    _flush(db, updates, dry_run)
+                    updates = []
+        _flush(db, updates, dry_run)
+        elapsed = time.perf_counter() - started
+    finally:
+        db.close()
+
+    pages_per_sec = len(tasks) / elapsed if elapsed else 0.0
+    print(
+        f"✅ {len(tasks)} صفحه در {elapsed:.1f} ثانیه ({pages_per_sec:.1f} صفحه در ثانیه)، "
+        f"{updated} خلاصه {'تغییر می‌کرد' if dry_run else 'به‌روزرسانی شد'}، {failed} خطا"
+    )
+    return {'pages': len(tasks), 'updated': updated, 'failed': failed, 'elapsed': elapsed, 'pages_per_sec': pages_per_sec}
+
+def main():
+    args = sys.argv[1:]
+    options = {}
+    for flag, key, cast in (('--agency', 'agency', str), ('--workers', 'workers', int), ('--batch', 'batch', int)):
+        if flag in args:
+            index = args.index(flag)
+            options[key] = cast(args[index + 1])
+            del args[index:index + 2]
+    if '--dry-run' in args:
+        options['dry_run'] = True
+        args.remove('--dry-run')
+    if args:
+        print(__doc__)
+        sys.exit(1)
+    reextract(**options)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import os
+import time
+import random
+import tempfile
+import threading
+from news_sources import SOURCES
+from news_orchestrator import fetch_all_news, is_agency_running, try_file_lock
+from news_fetcher import AGENCY_FETCHERS
+
+# زمان‌بند داخلی دریافت اخبار که همراه برنامه FastAPI اجرا می‌شود
+# هر خبرگزاری فاصله دریافت خودش را دارد (poll_interval در news_sources)؛ منابع سریع مثل BBC
+# چند دقیقه یک بار و منابع سنگین Selenium با فاصله بیشتر دریافت می‌شوند.
+# وقتی uvicorn با چند worker اجرا شود فقط workerی که قفل فایل را گرفته است دریافت انجام می‌دهد.
+
+SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', '1') == '1'
+# فاصله پیش‌فرض (ثانیه) برای منابعی که poll_interval ندارند
+SCHEDULER_DEFAULT_INTERVAL = float(os.getenv('SCHEDULER_DEFAULT_INTERVAL', '900'))
+# نسبت تصادفی اضافه/کم شده به هر فاصله تا درخواست‌ها هم‌زمان نشوند
+SCHEDULER_JITTER = float(os.getenv('SCHEDULER_JITTER', '0.1'))
+# حداکثر تأخیر تصادفی اولین دریافت هر خبرگزاری پس از شروع برنامه
+SCHEDULER_STARTUP_SPREAD = float(os.getenv('SCHEDULER_STARTUP_SPREAD', '30'))
+# هر چند ثانیه workerهای غیر leader دوباره برای گرفتن قفل تلاش می‌کنند
+SCHEDULER_LEADER_RETRY = float(os.getenv('SCHEDULER_LEADER_RETRY', '60'))
+SCHEDULER_LOCK_FILE = os.getenv(
+    'SCHEDULER_LOCK_FILE',
+    os.path.join(tempfile.gettempdir(), 'panel_rasad_scheduler.lock')
+)
+
+def get_poll_interval(name):
+    """فاصله دریافت خبرگزاری (ثانیه)"""
+    source = SOURCES.get(name, {})
+    return float(source.get('poll_interval', SCHEDULER_DEFAULT_INTERVAL))
+
+def _with_jitter(interval):
+    return interval * (1 + random.uniform(-SCHEDULER_JITTER, SCHEDULER_JITTER))
+
+class NewsScheduler:
+    """اجرای دوره‌ای دریافت اخبار هر خبرگزاری در thread جداگانه"""
+
+    def __init__(self, agencies=None, lock_path=None):
+        self.agencies = list(agencies or AGENCY_FETCHERS.keys())
+        self.lock_path = lock_path or SCHEDULER_LOCK_FILE
+        self.is_leader = False
+        self.next_run = {}
+        self.last_result = {}
+        self._lock_file = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        now = time.monotonic()
+        for name in self.agencies:
+            self.next_run[name] = now + random.uniform(0, SCHEDULER_STARTUP_SPREAD)
+        self._thread = threading.Thread(target=self._loop, name='news-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._lock_file is not None:
+            # بستن فایل قفل را آزاد می‌کند تا worker دیگری leader شود
+            self._lock_file.close()
+            self._lock_file = None
+            self.is_leader = False
+
+    def _acquire_leadership(self):
+        if self._lock_file is None:
+            self._lock_file = open(self.lock_path, 'a+')
+        self._lock_file.seek(0)
+        if try_file_lock(self._lock_file):
+            self.is_leader = True
+            self._lock_file.seek(0)
+            self._lock_file.truncate()
+            self._lock_file.write(str(os.getpid()))
+            self._lock_file.flush()
+            print(f"⏰ زمان‌بند دریافت اخبار در پروسه {os.getpid()} فعال شد")
+        return self.is_leader
+
+    def _loop(self):
+        while not self._stop.is_set():
+            if not self.is_leader and not self._acquire_leadership():
+                self._stop.wait(SCHEDULER_LEADER_RETRY)
+                continue
+
+            now = time.monotonic()
+            for name in self.agencies:
+                if now < self.next_run[name]:
+                    continue
+                self.next_run[name] = now + _with_jitter(get_poll_interval(name))
+                if is_agency_running(name):
+                    print(f"⏭️ دریافت قبلی {name} هنوز تمام نشده است، این نوبت رد شد")
+                    continue
+                threading.Thread(target=self._run_agency, args=(name,), name=f'schedule-{name}', daemon=True).start()
+
+            wait_for = min(self.next_run.values()) - time.monotonic()
+            self._stop.wait(max(wait_for, 1))
+
+    def _run_agency(self, name):
+        try:
+            result = fetch_all_news(agencies=[name])
+            self.last_result[name] = dict(result['agencies'].get(name, {}), finished_at=time.time())
+        except Exception as e:
+            print(f"❌ خطا در دریافت زمان‌بندی شده {name}: {e}")
+            self.last_result[name] = {'status': 'error', 'error': str(e), 'finished_at': time.time()}
+
+    def status(self):
+        """وضعیت زمان‌بند برای نمایش در API"""
+        now = time.monotonic()
+        return {
+            'enabled': True,
+            'leader': self.is_leader,
+            'pid': os.getpid(),
+            'agencies': {
+                name: {
+                    'interval': get_poll_interval(name),
+                    'next_run_in': round(max(self.next_run.get(name, now) - now, 0), 1),
+                    'running': is_agency_running(name),
+                    'last_result': self.last_result.get(name)
+                }
+                for name in self.agencies
+            }
+        }
+
+_scheduler = None
+
+def start_scheduler():
+    """شروع زمان‌بند (اگر SCHEDULER_ENABLED فعال باشد)"""
+    global _scheduler
+    if not SCHEDULER_ENABLED:
+        print("⏰ زمان‌بند دریافت اخبار غیرفعال است (SCHEDULER_ENABLED=0)")
+        return None
+    if _scheduler is None:
+        _scheduler = NewsScheduler()
+        _scheduler.start()
+    return _scheduler
+
+def stop_scheduler():
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.stop()
+        _scheduler = None
+
+def get_scheduler_status():
+    if _scheduler is None:
+        return {'enabled': False}
+    return _scheduler.status()
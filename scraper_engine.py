@@ -0,0 +1,397 @@
+import datetime
+from datetime import timezone
+from functools import lru_cache
+import soupsieve
+from html_parsing import parse_html
+from feed_reader import parse_feed
+from news_sources import SOURCES
+from extraction_pool import map_in_order
+from session_bridge import fetch_protected_page
+from http_client import http_get
+from http_cache import conditional_get, remember_validators, NotModified
+from host_guard import CircuitOpenError
+from fetch_journal import resume_items, mark_extracted, mark_summarized
+from snapshot_store import store_snapshot
+from news_fetcher import filter_known_items, get_chatgpt_summary, cached_llm_summary, local_summary
+from summary_queue import SUMMARY_DEFERRED
+
+# موتور عمومی scraping که با تعریف‌های news_sources کار می‌کند
+# همه خبرگزاری‌ها از یک مسیر مشترک (درخواست شرطی، حذف تکراری، استخراج هم‌زمان) استفاده می‌کنند
+
+@lru_cache(maxsize=None)
+def compiled(selector):
+    """selector کامپایل شده (هر selector فقط یک بار کامپایل می‌شود)"""
+    return soupsieve.compile(selector)
+
+def get_source(source):
+    """برگرداندن تعریف منبع از روی نام یا خود dict"""
+    if isinstance(source, str):
+        return SOURCES[source]
+    return source
+
+def _absolute(link, base_url):
+    if link.startswith('http'):
+        return link
+    return base_url + link
+
+def _text(elem):
+    return elem.get_text(strip=True) if elem else ''
+
+def parse_listing(source, soup):
+    """استخراج فهرست خبرها (عنوان، لینک، توضیحات، زمان) از صفحه فهرست"""
+    source = get_source(source)
+    max_items = source.get('max_items', 15)
+    min_title_length = source.get('min_title_length', 1)
+    link_parent = source.get('link_parent')
+    item_parent = source.get('item_parent')
+
+    items = []
+    seen_titles = set()
+    seen_urls = set()
+    for selector in source['listing_selectors']:
+        for title_elem in compiled(selector).select(soup):
+            try:
+                title = _text(title_elem)
+                if not title or len(title) < min_title_length:
+                    continue
+
+                link_elem = title_elem
+                if link_parent:
+                    parent = title_elem.find_parent(link_parent)
+                    link_elem = parent.select_one('a') if parent else None
+                elif title_elem.name != 'a':
+                    link_elem = title_elem.find('a')
+                link = link_elem.get('href', '') if link_elem else ''
+                if not link:
+                    continue
+                link = _absolute(link, source['base_url'])
+
+                # حذف تکراری (بر اساس عنوان یا لینک)
+                if title in seen_titles or link in seen_urls:
+                    continue
+                seen_titles.add(title)
+                seen_urls.add(link)
+
+                item = {'title': title, 'url': link, 'description': '', 'time': ''}
+                container = title_elem.find_parent(item_parent) if item_parent else None
+                if container is not None:
+                    if source.get('description_selector'):
+                        item['description'] = _text(compiled(source['description_selector']).select_one(container))
+                    if source.get('time_selector'):
+                        time_elem = compiled(source['time_selector']).select_one(container)
+                        if time_elem is not None and source.get('time_attr'):
+                            item['time'] = time_elem.get(source['time_attr'], '')
+                        else:
+                            item['time'] = _text(time_elem)
+                items.append(item)
+            except Exception as e:
+                print(f"خطا در پردازش خبر {source['agency']}: {e}")
+                continue
+            if len(items) >= max_items:
+                return items
+    return items
+
+def _first_text(soup, selectors):
+    for selector in selectors:
+        text = _text(compiled(selector).select_one(soup))
+        if text:
+            return text
+    return ''
+
+def _paragraphs(soup, step):
+    """جمع‌آوری پاراگراف‌های یک مرحله content با محدودیت طول و تعداد"""
+    min_len = step.get('min', 0)
+    max_len = step.get('max')
+    limit = step.get('limit')
+    parts = []
+    for selector in step['selectors']:
+        for p in compiled(selector).select(soup):
+            text = p.get_text(strip=True)
+            if text and len(text) > min_len and (max_len is None or len(text) < max_len):
+                parts.append(text)
+            if limit and len(parts) >= limit:
+                return parts
+    return parts
+
+def extract_article(source, soup):
+    """استخراج عنوان، خلاصه سایت، روتیتر و متن از صفحه خبر"""
+    source = get_source(source)
+    config = source.get('article', {})
+
+    title = _first_text(soup, config.get('title_selectors', []))
+    site_summary = _first_text(soup, config.get('summary_selectors', []))
+
+    lead = ''
+    lead_config = config.get('lead')
+    if lead_config:
+        for selector in lead_config['selectors']:
+            first = compiled(selector).select_one(soup)
+            if first is not None:
+                text = first.get_text(strip=True)
+                if text and lead_config.get('min', 0) < len(text) < lead_config.get('max', 10 ** 6):
+                    lead = text
+                    break
+
+    content = ''
+    for step in config.get('content', []):
+        parts = _paragraphs(soup, step)
+        if parts:
+            content = ' '.join(parts)
+            if len(content) > 2000:
+                content = content[:2000] + "..."
+            break
+
+    return {'title': title, 'site_summary': site_summary, 'lead': lead, 'content': content}
+
+def extract_article_html(source, html):
+    """parse و استخراج HTML صفحه خبر (از شبکه یا snapshot ذخیره شده)"""
+    source = get_source(source)
+    parse_only = source.get('article', {}).get('parse_only')
+    article = extract_article(source, parse_html(html, parse_only))
+    if parse_only and not any(article.values()):
+        # ساختار صفحه با parse_only جور نیست؛ کل صفحه parse می‌شود
+        article = extract_article(source, parse_html(html))
+    return article
+
+def fetch_article(source, url):
+    """دریافت و استخراج صفحه خبر
+
+    برای صفحه خبر درخواست شرطی ارسال نمی‌شود: خبرهای ذخیره شده پیش از استخراج حذف
+    می‌شوند، پس 304 فقط برای خبری می‌آمد که دفعه قبل ذخیره نشده و آن را برای همیشه رد می‌کرد.
+    """
+    source = get_source(source)
+    response = http_get(url)
+    store_snapshot(url, response.text, source['agency'], 'article')
+    return extract_article_html(source, response.text)
+
+def summary_strategies(source, item):
+    """ترتیب منابع خلاصه برای یک خبر
+
+    برای خبرهای فید ابتدا توضیحات خود فید استفاده می‌شود و صفحه خبر فقط وقتی دریافت
+    می‌شود که فید توضیحات نداشته باشد.
+    """
+    strategies = source.get('summary_from', ['content'])
+    if item.get('from_feed'):
+        strategies = ['description'] + [s for s in strategies if s != 'description']
+    return strategies
+
+def summarize(source, item, article):
+    """انتخاب خلاصه بر اساس ترتیب summary_from منبع؛ article در صورت نیاز فقط یک بار دریافت می‌شود"""
+    summary, article, _ = _summarize(source, item, article)
+    return summary, article
+
+def _summarize(source, item, article, defer_llm=False):
+    """مثل summarize و روش انتخاب شده؛ با defer_llm خلاصه LLM به صف خلاصه‌سازی سپرده می‌شود
+
+    در این حالت اگر خلاصه در کش نباشد خلاصه موقت محلی برگردانده می‌شود و روش 'llm_pending' است.
+    """
+    source = get_source(source)
+    for strategy in summary_strategies(source, item):
+        if strategy == 'description':
+            summary = item.get('description', '')
+        else:
+            if article is None:
+                article = fetch_article(source, item['url'])
+            if strategy == 'site_summary':
+                summary = article['site_summary']
+            elif strategy == 'lead':
+                summary = article['lead']
+            elif strategy == 'content':
+                summary = article['content']
+            elif strategy == 'summary_and_content':
+                summary = article['content']
+                if summary and article['site_summary']:
+                    summary = f"خلاصه خبر: {article['site_summary']}\n\nمتن کامل: {summary}"
+                elif not summary:
+                    summary = article['site_summary']
+            elif strategy == 'llm':
+                if not article['content']:
+                    summary = ''
+                elif defer_llm:
+                    summary = cached_llm_summary(article['content'], item['title'])
+                    if summary is None:
+                        return local_summary(article['content']), article, 'llm_pending'
+                else:
+                    summary = get_chatgpt_summary(article['content'], item['title'])
+            else:
+                raise ValueError(f"روش خلاصه‌سازی ناشناخته: {strategy}")
+        if summary:
+            return summary, article, strategy
+    return '', article, None
+
+def needs_article(source, item):
+    """آیا برای این خبر دریافت صفحه خبر لازم است"""
+    source = get_source(source)
+    if source.get('use_article_title') and not item.get('from_feed'):
+        return True
+    for strategy in summary_strategies(source, item):
+        if strategy != 'description':
+            return True
+        if item.get('description'):
+            return False
+    return False
+
+def extract_item(source, item):
+    """مرحله استخراج: دریافت صفحه خبر در صورت نیاز (بدون نیاز None برگردانده می‌شود)"""
+    source = get_source(source)
+    if needs_article(source, item):
+        return fetch_article(source, item['url'])
+    return None
+
+def make_news(source, item, title, summary):
+    """ساخت dict قابل ذخیره با save_news"""
+    return {
+        'title': title,
+        'url': item['url'],
+        'agency': source['agency'],
+        'published_at': item.get('published_at') or datetime.datetime.now(timezone.utc),
+        'summary': summary
+    }
+
+def build_news(source, item, article=None):
+    """مرحله خلاصه‌سازی: ساخت dict قابل ذخیره با save_news از خبر و صفحه استخراج شده"""
+    source = get_source(source)
+    title = item['title']
+    summary = ''
+    strategy = None
+    try:
+        summary, article, strategy = _summarize(source, item, article, defer_llm=SUMMARY_DEFERRED)
+        # عنوان فید همان عنوان اصلی خبر است
+        if article and source.get('use_article_title') and article['title'] and not item.get('from_feed'):
+            title = article['title']
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        print(f"خطا در استخراج محتوای {source['agency']}: {e}")
+    news = make_news(source, item, title, summary)
+    if strategy == 'llm_pending':
+        # خبر همین حالا با خلاصه موقت ذخیره می‌شود و خلاصه LLM در صف تولید می‌شود
+        news['summary_status'] = 'pending'
+        news['summary_input'] = {'title': item['title'], 'text': article['content']}
+    return news
+
+def process_item(source, item):
+    """استخراج و خلاصه‌سازی یک خبر و ساخت dict قابل ذخیره با save_news
+
+    اگر خبر از ژورنال اجرای قبلی checkpoint داشته باشد مراحل انجام شده تکرار نمی‌شوند.
+    """
+    source = get_source(source)
+    checkpoint = item.get('checkpoint') or {}
+    if checkpoint.get('stage') == 'summarized' and checkpoint.get('news'):
+        return checkpoint['news']
+    if checkpoint.get('stage') == 'extracted':
+        article = checkpoint['article']
+    else:
+        try:
+            article = extract_item(source, item)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            print(f"خطا در استخراج محتوای {source['agency']}: {e}")
+            return make_news(source, item, item['title'], '')
+        mark_extracted(item, article)
+    news = build_news(source, item, article)
+    mark_summarized(item, news)
+    return news
+
+def load_listing(source, url=None):
+    """دریافت و parse صفحه فهرست (یا صفحه آرشیو url) و برگرداندن (html, soup, response)
+
+    فقط زیردرخت‌های listing_parse_only ساخته می‌شوند. برای transport=http در صورت 304
+    خطای NotModified بالا داده می‌شود.
+    """
+    source = get_source(source)
+    url = url or source['listing_url']
+    parse_only = source.get('listing_parse_only')
+    if source.get('transport') == 'browser':
+        # ابتدا با HTTP ساده و کوکی‌های Cloudflare قبلی؛ فقط در صورت چالش با مرورگر
+        html, soup = fetch_protected_page(url, source['wait_selector'], parse_only)
+        store_snapshot(url, html, source['agency'], 'listing')
+        return html, soup, None
+    response = conditional_get(url)
+    store_snapshot(url, response.text, source['agency'], 'listing')
+    return response.text, parse_html(response.text, parse_only), response
+
+def read_listing(source, html, soup):
+    """استخراج فهرست از soup جزئی؛ اگر چیزی پیدا نشد (تغییر ساختار سایت) کل صفحه parse می‌شود"""
+    source = get_source(source)
+    items = parse_listing(source, soup)
+    if not items and source.get('listing_parse_only'):
+        items = parse_listing(source, parse_html(html))
+    return items
+
+def load_feed(source):
+    """دریافت فید RSS/Atom منبع و برگرداندن (items, response)؛ در صورت 304 خطای NotModified"""
+    source = get_source(source)
+    response = conditional_get(source['feed_url'])
+    response.raise_for_status()
+    store_snapshot(source['feed_url'], response.content, source['agency'], 'feed')
+    items = parse_feed(response.content, source.get('max_items', 15))
+    for item in items:
+        item['url'] = _absolute(item['url'], source['base_url'])
+        item['from_feed'] = True
+    return items, response
+
+def discover_items(source):
+    """فهرست خبرهای منبع و پاسخ HTTP آن (برای ذخیره validatorها)
+
+    اگر منبع feed_url داشته باشد ابتدا فید خوانده می‌شود (یک درخواست XML کوچک به جای
+    مرورگر) و فقط اگر فید در دسترس نبود یا خالی بود صفحه HTML فهرست دریافت می‌شود.
+    """
+    source = get_source(source)
+    if source.get('feed_url'):
+        try:
+            items, response = load_feed(source)
+            if items:
+                print(f"📰 فید {source['agency']}: {len(items)} خبر")
+                return items, response
+            print(f"فید {source['agency']} خالی بود، استفاده از صفحه HTML")
+        except NotModified:
+            raise
+        except Exception as e:
+            print(f"خطا در دریافت فید {source['agency']}: {e}، استفاده از صفحه HTML")
+    html, soup, response = load_listing(source)
+    return read_listing(source, html, soup), response
+
+def scrape_source(source):
+    """دریافت اخبار جدید یک منبع و برگرداندن فهرست قابل ذخیره با save_news"""
+    source = get_source(source)
+    agency = source['agency']
+    try:
+        items, response = discover_items(source)
+        print(f"تعداد آیتم‌های یافت شده در {agency}: {len(items)}")
+
+        # حذف خبرهایی که قبلاً ذخیره شده‌اند، پیش از ثبت در ژورنال، استخراج و خلاصه‌سازی
+        items = resume_items(agency, filter_known_items(items, agency))
+        print(f"تعداد کل اخبار {agency}: {len(items)}")
+
+        skipped = []
+
+        def process(i, item):
+            print(f"\nپردازش خبر {agency} {i+1}/{len(items)}: {item['title'][:50]}...")
+            try:
+                news = process_item(source, item)
+            except CircuitOpenError as e:
+                # ذخیره نمی‌شود تا در دریافت بعدی دوباره تلاش شود
+                print(f"خبر {agency} {i+1} رد شد: {e}")
+                skipped.append(item)
+                return None
+            print(f"خبر {agency} {i+1} پردازش شد")
+            return news
+
+        # استخراج هم‌زمان محتوای خبرها با حفظ ترتیب لیست
+        news_list = [news for news in map_in_order(process, items) if news]
+        if response is not None and not skipped:
+            # صفحه فهرست با موفقیت پردازش شد؛ دفعه بعد درخواست شرطی ارسال می‌شود
+            remember_validators(response)
+        print(f"\n{agency} news count: {len(news_list)}")
+        return news_list
+    except NotModified:
+        print(f"صفحه اخبار {agency} تغییری نکرده است (304)، پردازش رد شد")
+        return []
+    except CircuitOpenError as e:
+        print(f"⛔ دریافت اخبار {agency} رد شد: {e}")
+        return []
+    except Exception as e:
+        print(f"خطا در دریافت اخبار {agency}: {e}")
+        return []
@@ -0,0 +1,78 @@
+import time
+from urllib.parse import urlparse
+from html_parsing import parse_html
+from http_client import get_session, http_get, set_host_user_agent
+from host_guard import reset_host
+from browser_pool import get_browser_pool, wait_for_selector
+import http_replay
+
+# پل بین مرورگر و کلاینت HTTP:
+# پس از اینکه مرورگر از چالش Cloudflare عبور کرد، کوکی‌ها (از جمله cf_clearance) و
+# User-Agent آن به Session مشترک منتقل می‌شوند تا درخواست‌های بعدی بدون مرورگر انجام شوند
+
+def export_browser_session(driver):
+    """انتقال کوکی‌ها و User-Agent مرورگر به Session مشترک HTTP"""
+    session = get_session()
+    host = urlparse(driver.current_url).netloc.lower()
+    count = 0
+    for cookie in driver.get_cookies():
+        expires = cookie.get('expiry')
+        if expires is not None and expires <= time.time():
+            continue
+        session.cookies.set(
+            cookie['name'],
+            cookie['value'],
+            domain=cookie.get('domain', host),
+            path=cookie.get('path', '/'),
+            secure=cookie.get('secure', False),
+            expires=expires
+        )
+        count += 1
+    # کوکی cf_clearance فقط همراه همان User-Agent مرورگر معتبر است
+    set_host_user_agent(host, driver.execute_script('return navigator.userAgent'))
+    # با کوکی جدید درخواست‌های HTTP دوباره امتحان می‌شوند
+    reset_host(host)
+    print(f"🍪 {count} کوکی مرورگر برای {host} به کلاینت HTTP منتقل شد")
+
+def is_challenge_response(response):
+    """تشخیص صفحه چالش Cloudflare"""
+    if response.headers.get('cf-mitigated', '').lower() == 'challenge':
+        return True
+    if response.status_code in (403, 429, 503):
+        server = response.headers.get('Server', '').lower()
+        text = response.text[:5000]
+        return 'cloudflare' in server or 'cf-chl' in text or 'Just a moment' in text
+    return False
+
+def fetch_protected_page(url, wait_selector, parse_only=None):
+    """دریافت صفحه‌ای که پشت Cloudflare است و برگرداندن (html, soup)
+
+    ابتدا با HTTP ساده (با کوکی‌های قبلی مرورگر) تلاش می‌شود؛ فقط اگر پاسخ صفحه چالش
+    بود یا فهرست اخبار در آن نبود، صفحه با مرورگر باز شده و کوکی‌های جدید ذخیره می‌شوند.
+    """
+    try:
+        response = http_get(url)
+        if response.status_code == 200 and not is_challenge_response(response):
+            soup = parse_html(response.text, parse_only)
+            if soup.select_one(wait_selector):
+                print(f"⚡ صفحه {url} بدون مرورگر دریافت شد")
+                return response.text, soup
+        print(f"🛡️ چالش Cloudflare برای {url}، استفاده از مرورگر")
+    except Exception as e:
+        print(f"خطا در دریافت مستقیم {url}: {e}، استفاده از مرورگر")
+
+    if http_replay.is_replaying():
+        # صفحه ضبط شده مرورگر بدون اجرای Chrome
+        page_source = http_replay.replay_page(url)
+        return page_source, parse_html(page_source, parse_only)
+
+    # گرفتن یک tab از pool مرورگرهای گرم
+    with get_browser_pool().tab() as driver:
+        driver.get(url)
+        # انتظار تا عبور از Cloudflare و ظاهر شدن فهرست اخبار
+        wait_for_selector(driver, wait_selector)
+        export_browser_session(driver)
+        page_source = driver.page_source
+    if http_replay.is_recording():
+        http_replay.record_page(url, page_source)
+    return page_source, parse_html(page_source, parse_only)
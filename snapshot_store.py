@@ -0,0 +1,190 @@
+import os
+import zlib
+import hashlib
+import time
+import datetime
+from database import SessionLocal, PageSnapshot
+from news_fetcher import normalize_url
+
+# نگهداری HTML خام صفحه‌های فهرست و خبر برای استخراج دوباره بدون اینترنت
+# (مثلاً وقتی کلاس‌های صفحه BBC تغییر می‌کند و selectorها باید اصلاح شوند)
+# هر صفحه با hash محتوا ذخیره می‌شود تا صفحه تکراری فقط یک بار نوشته شود؛
+# فشرده‌سازی با zstd اگر پکیج zstandard نصب باشد و در غیر این صورت zlib
+
+SNAPSHOT_ENABLED = os.getenv('SNAPSHOT_ENABLED', '0') == '1'
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', 'snapshots')
+# snapshotهای قدیمی‌تر از این تعداد روز با prune_snapshots پاک می‌شوند
+SNAPSHOT_RETENTION_DAYS = int(os.getenv('SNAPSHOT_RETENTION_DAYS', '30'))
+# فاصله بین دو پاک‌سازی (ساعت)؛ پیمایش همه فایل‌ها در هر اجرای خط لوله لازم نیست
+SNAPSHOT_PRUNE_INTERVAL_HOURS = float(os.getenv('SNAPSHOT_PRUNE_INTERVAL_HOURS', '24'))
+# فایل‌های جوان‌تر از این مدت (ثانیه) پاک نمی‌شوند؛ ممکن است ردیف آن‌ها هنوز commit نشده باشد
+SNAPSHOT_PRUNE_MIN_AGE = float(os.getenv('SNAPSHOT_PRUNE_MIN_AGE', '3600'))
+_PRUNE_MARKER = '.last_prune'
+
+try:
+    import zstandard
+    _CODEC = 'zst'
+    _compressor = zstandard.ZstdCompressor(level=int(os.getenv('SNAPSHOT_ZSTD_LEVEL', '10')))
+    _decompressor = zstandard.ZstdDecompressor()
+except ImportError:
+    zstandard = None
+    _CODEC = 'zlib'
+
+def _compress(data):
+    if _CODEC == 'zst':
+        return _compressor.compress(data)
+    return zlib.compress(data, 9)
+
+def _decompress(data, codec):
+    if codec == 'zst':
+        if zstandard is None:
+            raise RuntimeError("برای خواندن snapshotهای zstd پکیج zstandard لازم است")
+        return _decompressor.decompress(data)
+    return zlib.decompress(data)
+
+def _blob_path(content_hash, codec):
+    return os.path.join(SNAPSHOT_DIR, content_hash[:2], f'{content_hash}.{codec}')
+
+def _find_blob(content_hash):
+    for codec in ('zst', 'zlib'):
+        path = _blob_path(content_hash, codec)
+        if os.path.exists(path):
+            return path, codec
+    return None, None
+
+def store_snapshot(url, html, agency, kind):
+    """ذخیره HTML خام صفحه (kind: listing / feed / article) و برگرداندن hash آن"""
+    if not SNAPSHOT_ENABLED or not html:
+        return None
+    try:
+        data = html.encode('utf-8') if isinstance(html, str) else html
+        content_hash = hashlib.sha256(data).hexdigest()
+        path, _ = _find_blob(content_hash)
+        if path is None:
+            path = _blob_path(content_hash, _CODEC)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # نوشتن در فایل موقت و جابه‌جایی اتمی تا فایل نیمه‌کاره باقی نماند
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(_compress(data))
+            os.replace(tmp_path, path)
+        else:
+            # فایل تکراری تازه می‌شود تا prune_snapshots پیش از commit ردیف آن را پاک نکند
+            os.utime(path)
+        stored_size = os.path.getsize(path)
+    except Exception as e:
+        print(f"خطا در ذخیره snapshot {url}: {e}")
+        return None
+
+    db = SessionLocal()
+    try:
+        db.add(PageSnapshot(
+            url=url,
+            url_normalized=normalize_url(url),
+            agency=agency,
+            kind=kind,
+            content_hash=content_hash,
+            raw_size=len(data),
+            stored_size=stored_size
+        ))
+        db.commit()
+    except Exception as e:
+        print(f"خطا در ثبت snapshot {url}: {e}")
+        db.rollback()
+    finally:
+        db.close()
+    return content_hash
+
+def load_snapshot(content_hash):
+    """خواندن HTML یک snapshot از روی hash"""
+    path, codec = _find_blob(content_hash)
+    if path is None:
+        raise FileNotFoundError(f"snapshot {content_hash} پیدا نشد")
+    with open(path, 'rb') as f:
+        return _decompress(f.read(), codec).decode('utf-8', errors='replace')
+
+def latest_snapshot(url, kind=None):
+    """آخرین snapshot ذخیره شده برای url (یا None)"""
+    db = SessionLocal()
+    try:
+        query = db.query(PageSnapshot).filter(PageSnapshot.url_normalized == normalize_url(url))
+        if kind:
+            query = query.filter(PageSnapshot.kind == kind)
+        return query.order_by(PageSnapshot.fetched_at.desc()).first()
+    finally:
+        db.close()
+
+def prune_snapshots(days=None, force=False):
+    """حذف snapshotهای قدیمی و فایل‌هایی که دیگر به آن‌ها ارجاعی نیست
+
+    حداکثر یک بار در SNAPSHOT_PRUNE_INTERVAL_HOURS اجرا می‌شود (مگر با force). فایل‌های موقت
+    و فایل‌های جوان‌تر از SNAPSHOT_PRUNE_MIN_AGE (در حال نوشتن در پروسه دیگر) پاک نمی‌شوند.
+    """
+    marker = os.path.join(SNAPSHOT_DIR, _PRUNE_MARKER)
+    now = time.time()
+    if not force:
+        try:
+            if now - os.path.getmtime(marker) < SNAPSHOT_PRUNE_INTERVAL_HOURS * 3600:
+                return 0, 0
+        except OSError:
+            pass
+    if os.path.isdir(SNAPSHOT_DIR):
+        with open(marker, 'w'):
+            pass
+    days = days if days is not None else SNAPSHOT_RETENTION_DAYS
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+    db = SessionLocal()
+    try:
+        removed_rows = db.query(PageSnapshot).filter(PageSnapshot.fetched_at < cutoff).delete(synchronize_session=False)
+        db.commit()
+        referenced = {content_hash for (content_hash,) in db.query(PageSnapshot.content_hash).distinct()}
+    finally:
+        db.close()
+
+    removed_files = 0
+    if os.path.isdir(SNAPSHOT_DIR):
+        for root, _, files in os.walk(SNAPSHOT_DIR):
+            for name in files:
+                if name.startswith('.') or name.endswith('.tmp'):
+                    continue
+                content_hash = name.split('.', 1)[0]
+                if content_hash in referenced:
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    if now - os.path.getmtime(path) < SNAPSHOT_PRUNE_MIN_AGE:
+                        continue
+                    os.remove(path)
+                    removed_files += 1
+                except OSError:
+                    pass
+    if removed_rows or removed_files:
+        print(f"🧹 {removed_rows} snapshot قدیمی و {removed_files} فایل بدون ارجاع پاک شد")
+    return removed_rows, removed_files
+
+def snapshot_stats():
+    """حجم خام snapshotها در برابر حجم واقعی روی دیسک"""
+    db = SessionLocal()
+    try:
+        rows = db.query(PageSnapshot.content_hash, PageSnapshot.raw_size, PageSnapshot.stored_size).all()
+    finally:
+        db.close()
+    raw_total = sum(raw for _, raw, _ in rows)
+    unique = {content_hash: stored for content_hash, _, stored in rows}
+    stored_total = sum(unique.values())
+    return {
+        'snapshots': len(rows),
+        'unique_pages': len(unique),
+        'raw_bytes': raw_total,
+        'stored_bytes': stored_total,
+        'ratio': stored_total / raw_total if raw_total else 0.0,
+        'codec': _CODEC
+    }
+
+if __name__ == "__main__":
+    stats = snapshot_stats()
+    print(
+        f"📦 {stats['snapshots']} snapshot ({stats['unique_pages']} صفحه یکتا، {stats['codec']}): "
+        f"{stats['raw_bytes'] / 1024 / 1024:.1f} MB خام، {stats['stored_bytes'] / 1024 / 1024:.1f} MB روی دیسک "
+        f"({stats['ratio']:.1%})"
+    )
@@ -0,0 +1,238 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import requests
+from requests.adapters import HTTPAdapter
+from host_guard import parse_retry_after
+from token_budget import estimate_tokens, fit_to_budget, record_usage
+
+# سرویس خلاصه‌سازی هم‌زمان با LLM
+# چند درخواست هم‌زمان به API (سازگار با OpenAI chat/completions) ارسال می‌شود و بودجه
+# درخواست در دقیقه (RPM) و توکن در دقیقه (TPM) رعایت می‌شود. هر درخواست مهلت دارد و اگر
+# در مهلت پاسخی نیامد متن کوتاه شده (مثل قبل text[:500]) برگردانده می‌شود.
+# با OPENAI_API_BASE می‌توان سرور آزمایشی محلی (mock_llm_server) را جایگزین API کرد.
+
+# موتور خلاصه‌سازی: llm (API) یا textrank (خلاصه‌ساز محلی local_summarizer بدون شبکه)
+SUMMARY_ENGINE = os.getenv('SUMMARY_ENGINE', 'llm')
+OPENAI_API_BASE = os.getenv('OPENAI_API_BASE', 'https://api.openai.com/v1').rstrip('/')
+# مدل خلاصه‌سازی؛ با تغییر متن prompt نسخه آن را بالا ببرید تا خلاصه‌های کش شده قبلی استفاده نشوند
+OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+# نسخه 2: متن خبر با بودجه توکن (token_budget) کوتاه می‌شود
+SUMMARY_PROMPT_VERSION = 2
+SUMMARY_MAX_TOKENS = int(os.getenv('SUMMARY_MAX_TOKENS', '300'))
+
+# تعداد درخواست هم‌زمان و بودجه دقیقه‌ای حساب API
+SUMMARY_CONCURRENCY = int(os.getenv('SUMMARY_CONCURRENCY', '8'))
+SUMMARY_RPM = float(os.getenv('SUMMARY_RPM', '60'))
+SUMMARY_TPM = float(os.getenv('SUMMARY_TPM', '90000'))
+# مهلت هر خلاصه (ثانیه، شامل انتظار در صف و تلاش دوباره)
+SUMMARY_DEADLINE = float(os.getenv('SUMMARY_DEADLINE', '30'))
+SUMMARY_MAX_RETRIES = int(os.getenv('SUMMARY_MAX_RETRIES', '3'))
+
+_SYSTEM_PROMPT = "شما یک خبرنگار حرفه‌ای هستید که اخبار را خلاصه می‌کند."
+
+def build_prompt(text, title):
+    return f"""
+        عنوان خبر: {title}
+
+        متن کامل خبر:
+        {text}
+
+        لطفاً این خبر را در یک پاراگراف کوتاه و معنادار خلاصه کنید.
+        خلاصه باید شامل نکات اصلی و مهم خبر باشد و به زبان فارسی نوشته شود.
+        حداکثر 200 کلمه باشد.
+        """
+
+def truncate_summary(text):
+    """خلاصه جایگزین وقتی LLM در دسترس نیست"""
+    return text[:500] + "..." if len(text) > 500 else text
+
+class RateBudget:
+    """بودجه درخواست و توکن در دقیقه (دو token bucket با ظرفیت یک دقیقه)"""
+
+    def __init__(self, rpm, tpm):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = rpm
+        self.tokens = tpm
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.condition = threading.Condition()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60)
+        self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60)
+        self.updated = now
+
+    def acquire(self, tokens, deadline):
+        """گرفتن یک درخواست و tokens توکن از بودجه؛ اگر تا deadline ممکن نباشد False"""
+        tokens = min(tokens, self.tpm)
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.paused_until - now
+                if wait <= 0:
+                    missing_requests = 1 - self.requests
+                    missing_tokens = tokens - self.tokens
+                    if missing_requests <= 0 and missing_tokens <= 0:
+                        self.requests -= 1
+                        self.tokens -= tokens
+                        return True
+                    wait = max(missing_requests * 60 / self.rpm, missing_tokens * 60 / self.tpm)
+                if now + wait > deadline:
+                    return False
+                self.condition.wait(wait)
+
+    def settle(self, estimated, actual):
+        """اصلاح بودجه با تعداد واقعی توکن‌های مصرف شده"""
+        with self.condition:
+            self.tokens = min(self.tpm, self.tokens + estimated - actual)
+            self.condition.notify_all()
+
+    def pause(self, seconds):
+        """توقف همه درخواست‌ها (پاسخ 429 با Retry-After)"""
+        with self.condition:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+class SummaryService:
+    """ارسال هم‌زمان درخواست‌های خلاصه‌سازی با رعایت بودجه RPM/TPM و مهلت هر درخواست"""
+
+    def __init__(self, api_base=None, api_key=None, model=None, concurrency=None, rpm=None, tpm=None, deadline=None):
+        self.api_base = (api_base or OPENAI_API_BASE).rstrip('/')
+        self.api_key = api_key if api_key is not None else os.getenv('OPENAI_API_KEY')
+        self.model = model or OPENAI_MODEL
+        self.concurrency = concurrency or SUMMARY_CONCURRENCY
+        self.deadline = deadline or SUMMARY_DEADLINE
+        self.budget = RateBudget(rpm or SUMMARY_RPM, tpm or SUMMARY_TPM)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='summarizer')
+        self.stats = {'requests': 0, 'llm': 0, 'fallback': 0, 'retries': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _fallback(self, text, reason, started):
+        self._count('fallback')
+        print(f"خطا در دریافت خلاصه از ChatGPT: {reason}")
+        return {'summary': truncate_summary(text), 'source': 'fallback', 'error': reason, 'elapsed': time.monotonic() - started}
+
+    def _request(self, text, title, deadline_at):
+        started = time.monotonic()
+        self._count('requests')
+        if not self.api_key and self.api_base == 'https://api.openai.com/v1':
+            print("⚠️ OPENAI_API_KEY تنظیم نشده است. از متن کامل استفاده می‌شود.")
+            self._count('fallback')
+            return {'summary': truncate_summary(text), 'source': 'fallback', 'error': 'no api key', 'elapsed': 0.0}
+
+        # متن خبرهای بلند تا بودجه توکن کوتاه می‌شود (لید و جمله‌های پراطلاعات حفظ می‌شوند)
+        fitted = fit_to_budget(text, model=self.model)
+        messages = [
+            {"role": "system", "content": _SYSTEM_PROMPT},
+            {"role": "user", "content": build_prompt(fitted, title)}
+        ]
+        prompt_tokens = estimate_tokens(_SYSTEM_PROMPT + messages[1]['content'], self.model)
+        # توکن‌های prompt اگر متن کامل خبر ارسال می‌شد
+        original_tokens = prompt_tokens
+        if fitted is not text:
+            original_tokens += estimate_tokens(text, self.model) - estimate_tokens(fitted, self.model)
+        estimated = prompt_tokens + SUMMARY_MAX_TOKENS
+        headers = {'Authorization': f'Bearer {self.api_key}'} if self.api_key else {}
+        payload = {'model': self.model, 'messages': messages, 'max_tokens': SUMMARY_MAX_TOKENS, 'temperature': 0.7}
+
+        for attempt in range(SUMMARY_MAX_RETRIES + 1):
+            if not self.budget.acquire(estimated, deadline_at):
+                return self._fallback(text, 'بودجه RPM/TPM تا پایان مهلت آزاد نشد', started)
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                return self._fallback(text, 'مهلت تمام شد', started)
+            try:
+                response = self.session.post(
+                    f'{self.api_base}/chat/completions',
+                    json=payload,
+                    headers=headers,
+                    timeout=(min(5.0, remaining), remaining)
+                )
+            except requests.Timeout:
+                return self._fallback(text, 'مهلت تمام شد', started)
+            except requests.RequestException as e:
+                error = str(e)
+                retry_after = min(2 ** attempt, 30)
+            else:
+                if response.status_code == 200:
+                    data = response.json()
+                    usage = data.get('usage') or {}
+                    self.budget.settle(estimated, usage.get('total_tokens', estimated))
+                    self._count('llm')
+                    record_usage(
+                        self.model,
+                        usage.get('prompt_tokens', prompt_tokens),
+                        usage.get('completion_tokens'),
+                        original_tokens=original_tokens,
+                        elapsed=time.monotonic() - started
+                    )
+                    return {
+                        'summary': data['choices'][0]['message']['content'].strip(),
+                        'source': 'llm',
+                        'error': None,
+                        'elapsed': time.monotonic() - started
+                    }
+                if response.status_code not in (429, 500, 502, 503, 504):
+                    return self._fallback(text, f'HTTP {response.status_code}: {response.text[:200]}', started)
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if retry_after is None:
+                    retry_after = min(2 ** attempt, 30)
+                if response.status_code == 429:
+                    # محدودیت حساب است نه این درخواست؛ بقیه درخواست‌ها هم صبر می‌کنند
+                    self.budget.pause(retry_after)
+                error = f'HTTP {response.status_code}'
+            if attempt == SUMMARY_MAX_RETRIES:
+                return self._fallback(text, f'{error} (پس از {attempt + 1} تلاش)', started)
+            if time.monotonic() + retry_after >= deadline_at:
+                return self._fallback(text, f'{error}؛ Retry-After {retry_after:.0f} ثانیه از مهلت بیشتر است', started)
+            self._count('retries')
+            time.sleep(retry_after)
+
+    def submit(self, text, title, deadline=None):
+        """ارسال درخواست خلاصه در پس‌زمینه؛ خروجی Future با dict {'summary', 'source', 'error', 'elapsed'}"""
+        deadline_at = time.monotonic() + (deadline or self.deadline)
+        return self.executor.submit(self._request, text, title, deadline_at)
+
+    def summarize(self, text, title, deadline=None):
+        """خلاصه یک خبر (منتظر پاسخ یا پایان مهلت می‌ماند)"""
+        deadline = deadline or self.deadline
+        started = time.monotonic()
+        future = self.submit(text, title, deadline)
+        try:
+            # کمی بیشتر از مهلت خود درخواست تا fallback داخلی فرصت برگشتن داشته باشد
+            return future.result(timeout=deadline + 1)
+        except FutureTimeoutError:
+            return self._fallback(text, 'مهلت تمام شد', started)
+
+    def summarize_many(self, articles, deadline=None):
+        """خلاصه هم‌زمان فهرستی از (text, title) با حفظ ترتیب"""
+        futures = [self.submit(text, title, deadline) for text, title in articles]
+        return [future.result() for future in futures]
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_summary_service():
+    """سرویس خلاصه‌سازی مشترک (در اولین فراخوانی ساخته می‌شود)"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = SummaryService()
+    return _service
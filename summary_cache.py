@@ -0,0 +1,186 @@
+import os
+import time
+import hashlib
+import datetime
+import threading
+from collections import OrderedDict
+from sqlalchemy import func
+from database import SessionLocal, SummaryCache
+from news_fetcher import normalize_text
+
+# کش دائمی خلاصه‌های LLM با کلید hash متن نرمال شده، عنوان، نسخه prompt و مدل
+# خبری که دوباره دریافت می‌شود یا متن یکسان خبرگزاری‌های مختلف دوباره به API ارسال نمی‌شود
+# لایه حافظه (LRU) جلوی جدول summary_cache است تا خلاصه‌های پرتکرار بدون query برگردانده شوند
+
+SUMMARY_CACHE_ENABLED = os.getenv('SUMMARY_CACHE_ENABLED', '1') == '1'
+# حداکثر تعداد خلاصه در جدول و در حافظه
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv('SUMMARY_CACHE_MAX_ENTRIES', '50000'))
+SUMMARY_CACHE_MEMORY_ENTRIES = int(os.getenv('SUMMARY_CACHE_MEMORY_ENTRIES', '2000'))
+# خلاصه‌هایی که در این تعداد روز استفاده نشده‌اند پاک می‌شوند
+SUMMARY_CACHE_MAX_AGE_DAYS = int(os.getenv('SUMMARY_CACHE_MAX_AGE_DAYS', '30'))
+# hitهای لایه حافظه حداکثر یک بار در این فاصله (ثانیه) برای هر کلید در جدول ثبت می‌شوند
+# تا خلاصه‌های پرتکرار در prune_summary_cache قدیمی به نظر نرسند
+SUMMARY_CACHE_TOUCH_INTERVAL = float(os.getenv('SUMMARY_CACHE_TOUCH_INTERVAL', '3600'))
+
+_memory = OrderedDict()
+# زمان آخرین ثبت هر کلید حافظه در جدول و hitهای ثبت نشده آن
+_touched = {}
+_pending_hits = {}
+_lock = threading.Lock()
+_stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0, 'stores': 0}
+
+def _normalize(text):
+    # ی و ک عربی در متن خبرگزاری‌های مختلف
+    return normalize_text((text or '').replace('ي', 'ی').replace('ك', 'ک'))
+
+def summary_key(text, title, model, prompt_version):
+    """کلید کش برای (متن، عنوان، مدل، نسخه prompt)"""
+    raw = '\x00'.join((_normalize(text), _normalize(title), model, str(prompt_version)))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def _write_hits(counts):
+    """ثبت hitهای لایه حافظه ({key: تعداد}) و زمان آخرین استفاده در جدول"""
+    if not counts:
+        return
+    now = datetime.datetime.utcnow()
+    db = SessionLocal()
+    try:
+        for key, count in counts.items():
+            db.query(SummaryCache).filter(SummaryCache.key == key).update(
+                {'hits': func.coalesce(SummaryCache.hits, 0) + count, 'last_used_at': now},
+                synchronize_session=False
+            )
+        db.commit()
+    except Exception as e:
+        print(f"خطا در ثبت استفاده از کش خلاصه: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+def _remember(key, summary):
+    evicted = {}
+    with _lock:
+        _memory[key] = summary
+        _memory.move_to_end(key)
+        _touched[key] = time.monotonic()
+        while len(_memory) > SUMMARY_CACHE_MEMORY_ENTRIES:
+            old_key, _ = _memory.popitem(last=False)
+            _touched.pop(old_key, None)
+            if old_key in _pending_hits:
+                evicted[old_key] = _pending_hits.pop(old_key)
+    _write_hits(evicted)
+
+def flush_cache_hits():
+    """ثبت همه hitهای ثبت نشده لایه حافظه در جدول"""
+    with _lock:
+        counts = dict(_pending_hits)
+        _pending_hits.clear()
+        now = time.monotonic()
+        for key in counts:
+            if key in _touched:
+                _touched[key] = now
+    _write_hits(counts)
+
+def get_cached_summary(key):
+    """خلاصه ذخیره شده برای key (یا None)"""
+    if not SUMMARY_CACHE_ENABLED:
+        return None
+    touch = None
+    with _lock:
+        summary = _memory.get(key)
+        if summary is not None:
+            _memory.move_to_end(key)
+            _stats['memory_hits'] += 1
+            _pending_hits[key] = _pending_hits.get(key, 0) + 1
+            now = time.monotonic()
+            if now - _touched.get(key, 0.0) >= SUMMARY_CACHE_TOUCH_INTERVAL:
+                _touched[key] = now
+                touch = {key: _pending_hits.pop(key)}
+    if summary is not None:
+        _write_hits(touch)
+        return summary
+
+    db = SessionLocal()
+    try:
+        row = db.query(SummaryCache).filter(SummaryCache.key == key).first()
+        if row is None:
+            with _lock:
+                _stats['misses'] += 1
+            return None
+        row.hits = (row.hits or 0) + 1
+        row.last_used_at = datetime.datetime.utcnow()
+        db.commit()
+        summary = row.summary
+    except Exception as e:
+        print(f"خطا در خواندن کش خلاصه: {e}")
+        db.rollback()
+        return None
+    finally:
+        db.close()
+    with _lock:
+        _stats['db_hits'] += 1
+    _remember(key, summary)
+    return summary
+
+def store_summary(key, summary, model, prompt_version):
+    """ذخیره خلاصه LLM در کش"""
+    if not SUMMARY_CACHE_ENABLED or not summary:
+        return
+    _remember(key, summary)
+    db = SessionLocal()
+    try:
+        row = db.query(SummaryCache).filter(SummaryCache.key == key).first()
+        if row is None:
+            row = SummaryCache(key=key, hits=0)
+            db.add(row)
+        row.summary = summary
+        row.model = model
+        row.prompt_version = str(prompt_version)
+        row.last_used_at = datetime.datetime.utcnow()
+        db.commit()
+        with _lock:
+            _stats['stores'] += 1
+    except Exception as e:
+        # ممکن است worker دیگری هم‌زمان همین خلاصه را ذخیره کرده باشد
+        print(f"خطا در ذخیره کش خلاصه: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+def prune_summary_cache(days=None, max_entries=None):
+    """حذف خلاصه‌های استفاده نشده قدیمی و نگه داشتن حداکثر max_entries خلاصه اخیر"""
+    if not SUMMARY_CACHE_ENABLED:
+        return 0
+    days = days if days is not None else SUMMARY_CACHE_MAX_AGE_DAYS
+    max_entries = max_entries if max_entries is not None else SUMMARY_CACHE_MAX_ENTRIES
+    # زمان آخرین استفاده خلاصه‌هایی که فقط از حافظه خوانده شده‌اند پیش از حذف بر اساس سن
+    flush_cache_hits()
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+    db = SessionLocal()
+    try:
+        removed = db.query(SummaryCache).filter(SummaryCache.last_used_at < cutoff).delete(synchronize_session=False)
+        extra = db.query(SummaryCache).count() - max_entries
+        if extra > 0:
+            oldest = db.query(SummaryCache.id).order_by(SummaryCache.last_used_at).limit(extra).subquery()
+            removed += db.query(SummaryCache).filter(SummaryCache.id.in_(oldest.select())).delete(synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        print(f"خطا در پاک‌سازی کش خلاصه: {e}")
+        db.rollback()
+        return 0
+    finally:
+        db.close()
+    if removed:
+        with _lock:
+            _memory.clear()
+            _touched.clear()
+    return removed
+
+def get_summary_cache_stats():
+    """تعداد hit/miss کش خلاصه از شروع برنامه"""
+    with _lock:
+        stats = dict(_stats)
+        stats['memory_entries'] = len(_memory)
+    lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses']
+    stats['hit_rate'] = (stats['memory_hits'] + stats['db_hits']) / lookups if lookups else 0.0
+    return stats
@@ -0,0 +1,247 @@
+import os
+import time
+import datetime
+import threading
+from sqlalchemy import update
+from database import SessionLocal, News, SummaryTask
+from news_fetcher import request_llm_summary
+from summarizer_service import SUMMARY_ENGINE, SUMMARY_CONCURRENCY
+
+# صف خلاصه‌سازی جدا از دریافت اخبار
+# خبرهایی که خلاصه آن‌ها با LLM تولید می‌شود همان لحظه با خلاصه موقت (TextRank محلی) و
+# summary_status='pending' ذخیره می‌شوند تا در /news و /highlights دیده شوند؛ workerهای این
+# ماژول خلاصه LLM را به ترتیب اولویت (خبرهای دارای کلمات filters.txt اول) تولید و جایگزین می‌کنند
+
+SUMMARY_DEFERRED = os.getenv('SUMMARY_DEFERRED', '1') == '1' and SUMMARY_ENGINE == 'llm'
+SUMMARY_QUEUE_WORKERS = int(os.getenv('SUMMARY_QUEUE_WORKERS', str(SUMMARY_CONCURRENCY)))
+# فاصله بررسی صف وقتی کاری در آن نیست (ثانیه)
+SUMMARY_QUEUE_POLL = float(os.getenv('SUMMARY_QUEUE_POLL', '2'))
+# پس از این تعداد تلاش ناموفق خلاصه موقت باقی می‌ماند (summary_status='failed')
+SUMMARY_QUEUE_MAX_ATTEMPTS = int(os.getenv('SUMMARY_QUEUE_MAX_ATTEMPTS', '3'))
+# کار running که این مدت (ثانیه) تغییری نکرده از پروسه متوقف شده‌ای مانده است
+SUMMARY_QUEUE_STALE = float(os.getenv('SUMMARY_QUEUE_STALE', '600'))
+FILTERS_FILE = os.getenv('FILTERS_FILE', 'filters.txt')
+
+_filters_cache = {'mtime': None, 'keywords': []}
+
+def _filter_keywords():
+    """کلمات filters.txt (با تغییر فایل دوباره خوانده می‌شود)"""
+    try:
+        mtime = os.path.getmtime(FILTERS_FILE)
+    except OSError:
+        return []
+    if _filters_cache['mtime'] != mtime:
+        with open(FILTERS_FILE, 'r', encoding='utf-8') as f:
+            _filters_cache['keywords'] = [line.strip() for line in f if line.strip()]
+        _filters_cache['mtime'] = mtime
+    return _filters_cache['keywords']
+
+def keyword_priority(title, text):
+    """اولویت خلاصه‌سازی: هر کلمه فیلتر در عنوان 2 و در متن 1 امتیاز"""
+    priority = 0
+    for keyword in _filter_keywords():
+        if keyword in (title or ''):
+            priority += 2
+        elif keyword in (text or ''):
+            priority += 1
+    return priority
+
+def enqueue_summaries(entries):
+    """اضافه کردن (news_id, title, text) به صف خلاصه‌سازی"""
+    db = SessionLocal()
+    try:
+        for news_id, title, text in entries:
+            db.add(SummaryTask(news_id=news_id, title=title, text=text, priority=keyword_priority(title, text)))
+        db.commit()
+        print(f"📝 {len(entries)} خبر به صف خلاصه‌سازی اضافه شد")
+    except Exception as e:
+        print(f"خطا در اضافه کردن به صف خلاصه‌سازی: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+def _claim():
+    """برداشتن کار با بیشترین اولویت (با update شرطی تا دو worker یک کار را برندارند)"""
+    db = SessionLocal()
+    try:
+        candidates = db.query(SummaryTask.id).filter(SummaryTask.status == 'pending').order_by(
+            SummaryTask.priority.desc(), SummaryTask.id
+        ).limit(SUMMARY_QUEUE_WORKERS + 1).all()
+        for (task_id,) in candidates:
+            claimed = db.execute(
+                update(SummaryTask)
+                .where(SummaryTask.id == task_id, SummaryTask.status == 'pending')
+                .values(status='running', updated_at=datetime.datetime.utcnow())
+            ).rowcount
+            db.commit()
+            if claimed:
+                task = db.query(SummaryTask).filter(SummaryTask.id == task_id).first()
+                return {'id': task.id, 'news_id': task.news_id, 'title': task.title, 'text': task.text, 'attempts': task.attempts or 0}
+        return None
+    finally:
+        db.close()
+
+def _finish(task, summary, ok):
+    db = SessionLocal()
+    try:
+        news = db.query(News).filter(News.id == task['news_id']).first()
+        row = db.query(SummaryTask).filter(SummaryTask.id == task['id']).first()
+        if ok:
+            if news is not None:
+                news.summary = summary
+                news.summary_status = 'ready'
+            db.delete(row)
+        elif task['attempts'] + 1 >= SUMMARY_QUEUE_MAX_ATTEMPTS:
+            # خلاصه موقت محلی باقی می‌ماند
+            if news is not None:
+                news.summary_status = 'failed'
+            db.delete(row)
+        else:
+            row.status = 'pending'
+            row.attempts = task['attempts'] + 1
+        db.commit()
+    except Exception as e:
+        print(f"خطا در ثبت خلاصه خبر {task['news_id']}: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+def reset_stale_tasks():
+    """بازگرداندن کارهای running پروسه‌های متوقف شده به صف"""
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(seconds=SUMMARY_QUEUE_STALE)
+    db = SessionLocal()
+    try:
+        count = db.query(SummaryTask).filter(
+            SummaryTask.status == 'running',
+            SummaryTask.updated_at < cutoff
+        ).update({'status': 'pending'}, synchronize_session=False)
+        db.commit()
+        return count
+    finally:
+        db.close()
+
+class SummaryWorkers:
+    """threadهایی که کارهای صف را یکی یکی خلاصه می‌کنند"""
+
+    def __init__(self, workers=None):
+        self.workers = workers or SUMMARY_QUEUE_WORKERS
+        self.threads = []
+        self.stop_event = threading.Event()
+        self.done = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._next_reset = 0.0
+
+    def _reset_stale(self):
+        """بازگرداندن کارهای گیر کرده به صف، حداکثر هر SUMMARY_QUEUE_STALE/2 ثانیه یک بار برای همه workerها"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_reset:
+                return
+            self._next_reset = now + SUMMARY_QUEUE_STALE / 2
+        try:
+            count = reset_stale_tasks()
+        except Exception as e:
+            print(f"خطا در بازگرداندن کارهای گیر کرده صف خلاصه‌سازی: {e}")
+            return
+        if count:
+            print(f"♻️ {count} کار گیر کرده به صف خلاصه‌سازی برگشت")
+
+    def start(self):
+        self._reset_stale()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f'summary-worker-{i}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        print(f"📝 {self.workers} worker خلاصه‌سازی شروع به کار کرد")
+
+    def stop(self):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join(timeout=5)
+        self.threads = []
+
+    def run_once(self):
+        """خلاصه‌سازی یک کار صف؛ False اگر صف خالی بود"""
+        try:
+            task = _claim()
+        except Exception as e:
+            print(f"خطا در خواندن صف خلاصه‌سازی: {e}")
+            return False
+        if task is None:
+            return False
+        summary, ok = request_llm_summary(task['text'], task['title'])
+        _finish(task, summary, ok)
+        with self._lock:
+            if ok:
+                self.done += 1
+            else:
+                self.failed += 1
+        if not ok:
+            # API در دسترس نیست یا محدودیت نرخ دارد؛ کمی صبر پیش از کار بعدی
+            self.stop_event.wait(SUMMARY_QUEUE_POLL)
+        return True
+
+    def _loop(self):
+        while not self.stop_event.is_set():
+            # کارهای running پروسه‌هایی که در حین کار سرور متوقف شده‌اند (مثلاً worker kill شده)
+            self._reset_stale()
+            if not self.run_once():
+                self.stop_event.wait(SUMMARY_QUEUE_POLL)
+
+    def status(self):
+        db = SessionLocal()
+        try:
+            pending = db.query(SummaryTask).filter(SummaryTask.status == 'pending').count()
+            running = db.query(SummaryTask).filter(SummaryTask.status == 'running').count()
+        finally:
+            db.close()
+        return {
+            'enabled': SUMMARY_DEFERRED,
+            'workers': len(self.threads),
+            'pending': pending,
+            'running': running,
+            'done': self.done,
+            'failed': self.failed
+        }
+
+_workers = None
+
+def start_summary_workers():
+    """شروع workerهای صف خلاصه‌سازی (در صورت فعال بودن SUMMARY_DEFERRED)"""
+    global _workers
+    if not SUMMARY_DEFERRED or _workers is not None:
+        return _workers
+    _workers = SummaryWorkers()
+    _workers.start()
+    return _workers
+
+def stop_summary_workers():
+    global _workers
+    if _workers is not None:
+        _workers.stop()
+        _workers = None
+
+def get_summary_queue_status():
+    if _workers is None:
+        return SummaryWorkers(workers=0).status()
+    return _workers.status()
+
+def drain_queue():
+    """خلاصه‌سازی همه کارهای صف در همین پروسه (برای اجرای دستی بدون سرور)"""
+    workers = SummaryWorkers()
+    workers._reset_stale()
+
+    def drain():
+        while workers.run_once():
+            pass
+
+    threads = [threading.Thread(target=drain, name=f'summary-drain-{i}') for i in range(workers.workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"✅ {workers.done} خلاصه تولید شد، {workers.failed} ناموفق")
+
+if __name__ == "__main__":
+    drain_queue()
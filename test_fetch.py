@@ -1 +1,181 @@
- 
\ No newline at end of file
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+تست و benchmark دریافت اخبار بدون اینترنت با آرشیو record/replay (http_replay)
+
+تست‌ها آرشیو کوچک خودشان را می‌سازند. برای benchmark روی پاسخ‌های واقعی یک بار آرشیو ضبط کنید:
+    HTTP_REPLAY_MODE=record HTTP_REPLAY_ARCHIVE=fixtures/all.json.gz python test_fetch.py
+و سپس بدون شبکه اجرا کنید:
+    HTTP_REPLAY_MODE=replay HTTP_REPLAY_ARCHIVE=fixtures/all.json.gz python test_fetch.py [--repeat N] [--save]
+"""
+
+import sys
+import time
+import base64
+import statistics
+import requests
+import http_cache
+import fetch_journal
+import http_replay
+from http_replay import Cassette, use_cassette
+from scraper_engine import scrape_source
+
+def _entry(html, status=200, headers=None):
+    return {
+        'status': status,
+        'headers': headers or {'Content-Type': 'text/html; charset=utf-8'},
+        'body': base64.b64encode(html.encode('utf-8')).decode('ascii'),
+    }
+
+def _offline(monkeypatch):
+    # تست‌ها چیزی در ژورنال یا جدول validatorها نمی‌نویسند
+    monkeypatch.setattr(fetch_journal, 'FETCH_JOURNAL_ENABLED', False)
+    monkeypatch.setattr(http_cache, 'HTTP_CACHE_ENABLED', False)
+
+def _paragraphs(text):
+    return ''.join(f'<p>{text} - بند {i} با توضیحات کافی برای انتخاب شدن به عنوان متن خبر</p>' for i in range(3))
+
+def test_replay_http_source(tmp_path, monkeypatch):
+    """BBC: فهرست و صفحه‌های خبر از آرشیو خوانده می‌شوند"""
+    _offline(monkeypatch)
+    archive = str(tmp_path / 'bbc.json.gz')
+    cassette = Cassette(archive, 'record')
+    links = ''.join(
+        f'<article><h2><a href="/persian/articles/replay-test-{i}">خبر آزمایشی شماره {i}</a></h2></article>'
+        for i in range(3)
+    )
+    cassette.put('http', 'https://www.bbc.com/persian/topics/ckdxnwvwwjnt', _entry(f'<html><main>{links}</main></html>'))
+    for i in range(3):
+        cassette.put('http', f'https://www.bbc.com/persian/articles/replay-test-{i}',
+                     _entry(f'<html><main>{_paragraphs(f"متن خبر {i}")}</main></html>'))
+    cassette.save()
+
+    with use_cassette(archive):
+        news_list = scrape_source('BBC')
+    assert [news['title'] for news in news_list] == [f'خبر آزمایشی شماره {i}' for i in range(3)]
+    assert all(news['summary'].startswith(f'متن خبر {i}') for i, news in enumerate(news_list))
+
+def test_replay_browser_source(tmp_path, monkeypatch):
+    """IRNA: صفحه چالش Cloudflare و صفحه ضبط شده مرورگر بدون اجرای Chrome"""
+    _offline(monkeypatch)
+    archive = str(tmp_path / 'irna.json.gz')
+    cassette = Cassette(archive, 'record')
+    # فید ضبط نشده است؛ مثل خطای شبکه به صفحه HTML برمی‌گردد
+    cassette.put('http', 'https://www.irna.ir/archive',
+                 _entry('<html>Just a moment...</html>', 403, {'Server': 'cloudflare'}))
+    items = ''.join(
+        f'<li><div class="desc"><h3><a href="/news/9000{i}/">عنوان فهرست خبر ایرنا {i}</a></h3></div></li>'
+        for i in range(2)
+    )
+    cassette.put('browser', 'https://www.irna.ir/archive', {'page_source': f'<html><ul>{items}</ul></html>'})
+    for i in range(2):
+        cassette.put('http', f'https://www.irna.ir/news/9000{i}/', _entry(
+            f'<html><h1 class="title">عنوان کامل خبر ایرنا {i}</h1><p class="summary">خلاصه خبر ایرنا {i}</p></html>'
+        ))
+    cassette.save()
+
+    with use_cassette(archive):
+        news_list = scrape_source('IRNA')
+    assert [(news['title'], news['summary']) for news in news_list] == [
+        (f'عنوان کامل خبر ایرنا {i}', f'خلاصه خبر ایرنا {i}') for i in range(2)
+    ]
+
+def test_record_roundtrip(tmp_path):
+    """پاسخ ضبط شده با همان وضعیت، هدرها و بدنه پخش می‌شود"""
+    archive = str(tmp_path / 'roundtrip.json.gz')
+    response = requests.Response()
+    response.status_code = 200
+    response.headers = requests.structures.CaseInsensitiveDict({'ETag': '"abc"', 'Content-Encoding': 'gzip'})
+    response._content = 'خبر'.encode('utf-8')
+    response.url = 'https://example.com/a'
+    with use_cassette(archive, 'record'):
+        http_replay.record_response('https://example.com/a', response)
+    with use_cassette(archive):
+        replayed = http_replay.replay_response('https://example.com/a')
+        assert (replayed.status_code, replayed.text, replayed.headers['ETag']) == (200, 'خبر', '"abc"')
+        assert 'Content-Encoding' not in replayed.headers
+        try:
+            http_replay.replay_response('https://example.com/missing')
+            assert False, 'ReplayMissError expected'
+        except requests.ConnectionError:
+            pass
+
+def _offline_pipeline(monkeypatch):
+    import ingest_pipeline
+    _offline(monkeypatch)
+    for name in ('prune_journal', 'prune_summary_cache', 'prune_snapshots'):
+        monkeypatch.setattr(ingest_pipeline, name, lambda: None)
+    monkeypatch.setattr(ingest_pipeline, 'resume_items', lambda agency, items: items)
+    monkeypatch.setattr(ingest_pipeline, 'filter_known_items', lambda items, agency: items)
+    return ingest_pipeline
+
+def _wait_released(name, seconds=5):
+    from news_orchestrator import is_agency_running
+    deadline = time.monotonic() + seconds
+    while is_agency_running(name) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    return not is_agency_running(name)
+
+def test_pipeline_timeout_releases_lock(monkeypatch):
+    """اگر کشف بیشتر از مهلت طول بکشد، قفل خبرگزاری پس از پایان کشف آزاد می‌شود"""
+    ingest_pipeline = _offline_pipeline(monkeypatch)
+
+    def slow_discover(source):
+        time.sleep(3)
+        return [{'title': 'خبر دیرهنگام', 'url': 'https://www.bbc.com/persian/articles/late'}], None
+    monkeypatch.setattr(ingest_pipeline, 'discover_items', slow_discover)
+
+    pipeline = ingest_pipeline.IngestPipeline()
+    try:
+        results = pipeline.run(['BBC'], timeout=1)
+        assert results[0]['status'] == 'timeout'
+        assert _wait_released('BBC')
+    finally:
+        pipeline.stop()
+
+def test_pipeline_timeout_with_full_queue(monkeypatch):
+    """کشفی که پشت صف پر منتظر مانده با پایان مهلت متوقف می‌شود و قفل آزاد می‌شود"""
+    ingest_pipeline = _offline_pipeline(monkeypatch)
+    items = [{'title': f'خبر {i}', 'url': f'https://www.bbc.com/persian/articles/full-{i}'} for i in range(10)]
+    monkeypatch.setattr(ingest_pipeline, 'discover_items', lambda source: (items, None))
+    monkeypatch.setattr(ingest_pipeline, 'extract_item', lambda source, item: time.sleep(2))
+
+    pipeline = ingest_pipeline.IngestPipeline(extract_workers=1, summarize_workers=1, queue_size=1)
+    try:
+        results = pipeline.run(['BBC'], timeout=1)
+        assert results[0]['status'] == 'timeout'
+        assert _wait_released('BBC')
+        # threadهای مراحل در اجرای بعدی دوباره ساخته نمی‌شوند
+        threads = list(pipeline.threads)
+        pipeline.run(['BBC'], timeout=1)
+        assert pipeline.threads == threads
+    finally:
+        pipeline.stop()
+
+def main():
+    """benchmark همه خبرگزاری‌ها روی آرشیو HTTP_REPLAY_ARCHIVE"""
+    from news_sources import SOURCES
+    from news_fetcher import save_news
+    args = sys.argv[1:]
+    repeat = int(args[args.index('--repeat') + 1]) if '--repeat' in args else 3
+    save = '--save' in args
+    if http_replay.HTTP_REPLAY_MODE == 'record':
+        repeat = 1
+    elif http_replay.HTTP_REPLAY_MODE != 'replay':
+        print(__doc__)
+        sys.exit(1)
+
+    for name in SOURCES:
+        timings = []
+        count = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            news_list = scrape_source(name)
+            if save and news_list:
+                save_news(news_list)
+            timings.append(time.perf_counter() - start)
+            count = len(news_list)
+        print(f"⏱️ {name}: {count} خبر، میانه {statistics.median(timings) * 1000:.0f} ms در {repeat} اجرا")
+
+if __name__ == "__main__":
+    main()
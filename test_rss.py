@@ -1,4 +1,5 @@
 import requests
+from feed_reader import parse_feed
 
 url = "https://www.isna.ir/rss"
 try:
@@ -6,5 +7,7 @@ try:
     print("Status code:", response.status_code)
     print("Content (first 500 chars):")
     print(response.text[:500])
+    for item in parse_feed(response.content, max_items=5):
+        print(item['published_at'], item['title'], item['url'])
 except Exception as e:
-    print("خطا:", e) 
\ No newline at end of file
+    print("خطا:", e)
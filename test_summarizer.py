@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""تست سرویس خلاصه‌سازی روی سرور آزمایشی محلی (mock_llm_server)"""
+
+import sys
+import time
+import pytest
+import summarizer_service
+from mock_llm_server import start_mock_server
+from summarizer_service import SummaryService, truncate_summary
+from token_budget import fit_to_budget, estimate_tokens
+
+ARTICLE = 'متن خبر آزمایشی. ' * 60
+
+@pytest.fixture(autouse=True)
+def _no_usage_rows(monkeypatch):
+    # مصرف توکن سرور آزمایشی در جدول llm_usage ثبت نمی‌شود
+    usage = []
+    monkeypatch.setattr(summarizer_service, 'record_usage', lambda *args, **kwargs: usage.append((args, kwargs)))
+    return usage
+
+def test_concurrent_requests(_no_usage_rows):
+    """درخواست‌ها هم‌زمان ارسال می‌شوند نه یکی یکی"""
+    server, api_base = start_mock_server(latency=0.3)
+    service = SummaryService(api_base=api_base, api_key='', concurrency=8, rpm=600, tpm=10 ** 7, deadline=10)
+    try:
+        start = time.monotonic()
+        results = service.summarize_many([(ARTICLE, f'عنوان {i}') for i in range(8)])
+        elapsed = time.monotonic() - start
+    finally:
+        service.close()
+        server.shutdown()
+    assert all(result['source'] == 'llm' for result in results)
+    assert elapsed < 8 * 0.3
+    assert len(_no_usage_rows) == 8
+
+def test_deadline_fallback():
+    """پس از پایان مهلت متن کوتاه شده برگردانده می‌شود"""
+    server, api_base = start_mock_server(latency=2.0)
+    service = SummaryService(api_base=api_base, api_key='', concurrency=2, deadline=0.5)
+    try:
+        result = service.summarize(ARTICLE, 'عنوان')
+    finally:
+        service.close()
+        server.shutdown()
+    assert result['source'] == 'fallback'
+    assert result['summary'] == truncate_summary(ARTICLE)
+
+def test_retry_after():
+    """پاسخ 429 با Retry-After: صبر و تلاش دوباره، یا fallback اگر از مهلت بیشتر باشد"""
+    server, api_base = start_mock_server(latency=0.0, rpm=1)
+    service = SummaryService(api_base=api_base, api_key='', concurrency=2, deadline=5)
+    try:
+        first = service.summarize(ARTICLE, 'عنوان 1')
+        second = service.summarize(ARTICLE, 'عنوان 2')
+    finally:
+        service.close()
+        server.shutdown()
+    assert first['source'] == 'llm'
+    # Retry-After حدود 60 ثانیه است که از مهلت 5 ثانیه بیشتر است
+    assert second['source'] == 'fallback'
+    assert server.rejected == 1
+
+def test_fit_to_budget_without_numpy(monkeypatch):
+    """بدون NumPy (local_summarizer) متن بلند باز هم تا بودجه کوتاه می‌شود"""
+    monkeypatch.setitem(sys.modules, 'local_summarizer', None)
+    fitted = fit_to_budget(ARTICLE, budget=50)
+    assert ARTICLE.startswith(fitted)
+    assert estimate_tokens(fitted) <= 51
@@ -0,0 +1,144 @@
+import os
+import re
+import datetime
+import threading
+from sqlalchemy import func
+from database import SessionLocal, LlmUsage
+
+# بودجه توکن ورودی خلاصه‌سازی
+# متن خبرهای بلند پیش از ارسال به LLM کوتاه می‌شود: جمله‌های لید (ابتدای خبر) حفظ می‌شوند و
+# بقیه بودجه با جمله‌های پراطلاعات‌تر (امتیاز TextRank) پر می‌شود. تعداد توکن ورودی و خروجی
+# هر درخواست در جدول llm_usage ثبت می‌شود تا هزینه قابل پیش‌بینی باشد.
+
+# حداکثر توکن متن خبر در prompt (بدون دستورالعمل‌ها)
+SUMMARY_INPUT_TOKENS = int(os.getenv('SUMMARY_INPUT_TOKENS', '800'))
+# سهم بودجه برای جمله‌های ابتدای خبر
+SUMMARY_LEAD_SHARE = float(os.getenv('SUMMARY_LEAD_SHARE', '0.4'))
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+_encodings = {}
+_NON_ASCII = re.compile(r'[^\x00-\x7f]')
+
+def estimate_tokens(text, model=None):
+    """تعداد توکن متن؛ با tiktoken (در صورت نصب) یا تخمین بر اساس تعداد کاراکتر
+
+    در tokenizerهای OpenAI متن فارسی حدود 2.5 کاراکتر و متن لاتین حدود 4 کاراکتر در هر توکن است.
+    """
+    if not text:
+        return 0
+    if tiktoken is not None:
+        key = model or 'cl100k_base'
+        if key not in _encodings:
+            try:
+                _encodings[key] = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding(key)
+            except KeyError:
+                _encodings[key] = tiktoken.get_encoding('cl100k_base')
+        return len(_encodings[key].encode(text))
+    non_ascii = len(_NON_ASCII.findall(text))
+    return int(non_ascii / 2.5 + (len(text) - non_ascii) / 4) + 1
+
+def _scores(sentences):
+    try:
+        from local_summarizer import similarity_matrix, rank_sentences
+    except ImportError:
+        # بدون NumPy: جمله‌های اول مهم‌تر هستند
+        return [1.0 / (i + 1) for i in range(len(sentences))]
+    return list(rank_sentences(similarity_matrix(sentences), lead_weight=0.0))
+
+def fit_to_budget(text, budget=None, model=None):
+    """کوتاه کردن متن خبر تا بودجه توکن با حفظ لید و جمله‌های پراطلاعات (به ترتیب متن اصلی)"""
+    budget = budget or SUMMARY_INPUT_TOKENS
+    if estimate_tokens(text, model) <= budget:
+        return text
+    try:
+        from local_summarizer import split_sentences
+    except ImportError:
+        # بدون NumPy مثل یک جمله طولانی برش داده می‌شود
+        sentences = []
+    else:
+        sentences = split_sentences(text)
+    if len(sentences) < 2:
+        # یک جمله طولانی (بدون نقطه‌گذاری): برش ساده به نسبت بودجه
+        ratio = budget / estimate_tokens(text, model)
+        return text[:int(len(text) * ratio)]
+
+    costs = [estimate_tokens(s, model) + 1 for s in sentences]
+    chosen = set()
+    used = 0
+    # لید: جمله‌های ابتدای خبر تا سهم SUMMARY_LEAD_SHARE از بودجه
+    for i, cost in enumerate(costs):
+        if used + cost > budget * SUMMARY_LEAD_SHARE and chosen:
+            break
+        if used + cost > budget:
+            break
+        chosen.add(i)
+        used += cost
+    # بقیه بودجه با جمله‌های با بیشترین امتیاز
+    scores = _scores(sentences)
+    for i in sorted(range(len(sentences)), key=lambda i: -scores[i]):
+        if i in chosen or used + costs[i] > budget:
+            continue
+        chosen.add(i)
+        used += costs[i]
+    if not chosen:
+        ratio = budget / costs[0]
+        return sentences[0][:int(len(sentences[0]) * ratio)]
+    return ' '.join(sentences[i] for i in sorted(chosen))
+
+# آمار حافظه‌ای از شروع برنامه
+_totals = {'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'trimmed_calls': 0, 'trimmed_tokens': 0}
+_totals_lock = threading.Lock()
+
+def record_usage(model, prompt_tokens, completion_tokens, original_tokens=None, elapsed=None):
+    """ثبت توکن‌های ورودی و خروجی یک درخواست LLM"""
+    with _totals_lock:
+        _totals['calls'] += 1
+        _totals['prompt_tokens'] += prompt_tokens or 0
+        _totals['completion_tokens'] += completion_tokens or 0
+        if original_tokens and original_tokens > (prompt_tokens or 0):
+            _totals['trimmed_calls'] += 1
+            _totals['trimmed_tokens'] += original_tokens - prompt_tokens
+    db = SessionLocal()
+    try:
+        db.add(LlmUsage(
+            model=model,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            original_tokens=original_tokens,
+            elapsed=elapsed
+        ))
+        db.commit()
+    except Exception as e:
+        print(f"خطا در ثبت مصرف توکن: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+def get_token_usage(days=1):
+    """مجموع توکن‌های مصرف شده در days روز اخیر و از شروع برنامه"""
+    since = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+    db = SessionLocal()
+    try:
+        calls, prompt_tokens, completion_tokens, elapsed = db.query(
+            func.count(LlmUsage.id),
+            func.coalesce(func.sum(LlmUsage.prompt_tokens), 0),
+            func.coalesce(func.sum(LlmUsage.completion_tokens), 0),
+            func.avg(LlmUsage.elapsed)
+        ).filter(LlmUsage.created_at >= since).one()
+    finally:
+        db.close()
+    with _totals_lock:
+        process = dict(_totals)
+    return {
+        'days': days,
+        'calls': calls,
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'avg_latency': round(elapsed or 0.0, 2),
+        'input_budget': SUMMARY_INPUT_TOKENS,
+        'process': process
+    }